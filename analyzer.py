@@ -0,0 +1,156 @@
+import time
+import base64
+import threading
+import numpy
+
+from numpy.lib.stride_tricks import sliding_window_view
+
+INPUT = 0
+OUTPUT = 1
+
+
+class Analyzer:
+    """Spectrum and waveform of the box input and output for the UI.
+
+    The process callback only calls write(), which copies every
+    `decimation`-th sample of the port buffers into a preallocated ring
+    (no filtering, the cab already rolls the top end off). A worker thread
+    wakes `rate` times a second and, only while someone asked for a frame
+    recently, runs one batched STFT over all the audio since its previous
+    run: windowed frames of both sources and every hop go through a single
+    rfft call. Power is averaged into `bands` log-spaced bands and
+    quantized to uint8 over `floor_db`..0 dBFS; the waveform is a min/max
+    envelope of the last `waveform_seconds` in `width` points, as int8.
+    Each source comes out as a few hundred bytes of base64.
+    """
+
+    def __init__(self, channels=2, decimation=2, rate=20, fft_size=1024, overlap=0.5, bands=48, width=64, waveform_seconds=0.1, floor_db=-90.0, min_frequency=30.0, ring_seconds=2.0):
+        self.channels = channels
+        self.decimation = decimation
+        self.rate = rate
+        self.fft_size = fft_size
+        self.hop = max(1, int(fft_size * (1 - overlap)))
+        self.bands = bands
+        self.width = width
+        self.waveform_seconds = waveform_seconds
+        self.floor_db = floor_db
+        self.min_frequency = min_frequency
+        self.ring_seconds = ring_seconds
+
+        self.sample_rate = 0
+        self.ring = None
+        self.capacity = 0
+        self.written = 0
+        self.phase = 0
+        self.analyzed = 0
+        self.wanted = 0.0
+        self.frames = 0
+        self.latest = {'input': None, 'output': None}
+        self.thread = None
+
+    def prepare(self, sample_rate):
+        """Allocates the ring and the band map; never called from the audio thread."""
+        if sample_rate == self.sample_rate:
+            return
+        rate = sample_rate / self.decimation
+        self.capacity = int(self.ring_seconds * rate)
+        self.ring = numpy.zeros((2, self.channels, self.capacity), dtype=numpy.float32)
+        self.written = 0
+        self.analyzed = 0
+
+        self.window = numpy.hanning(self.fft_size).astype(numpy.float32)
+        # Power of a full scale sine in its bin, the 0 dBFS reference
+        self.reference = (self.window.sum() / 2) ** 2
+        frequencies = numpy.fft.rfftfreq(self.fft_size, 1 / rate)
+        edges = numpy.geomspace(self.min_frequency, rate / 2, self.bands + 1)
+        self.starts = numpy.searchsorted(frequencies, edges[:-1]).clip(max=len(frequencies) - 1)
+        # Low bands narrower than a bin repeat a start, reduceat then gives them that one bin
+        self.counts = numpy.diff(numpy.append(self.starts, len(frequencies))).clip(min=1)
+        self.sample_rate = sample_rate
+
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.serve, name='analyzer', daemon=True)
+            self.thread.start()
+
+    # Audio thread side
+
+    def write(self, inputs, outputs):
+        """Copies the decimated port buffers (lists of per-channel arrays) into the ring."""
+        ring = self.ring
+        if ring is None:
+            return
+        frames = len(inputs[0])
+        phase = self.phase
+        count = (frames - phase + self.decimation - 1) // self.decimation
+        start = self.written % self.capacity
+        first = min(count, self.capacity - start)
+        for source, buffers in ((INPUT, inputs), (OUTPUT, outputs)):
+            for channel, buffer in enumerate(buffers):
+                samples = buffer[phase::self.decimation]
+                ring[source, channel, start:start + first] = samples[:first]
+                if first < count:
+                    ring[source, channel, :count - first] = samples[first:]
+        self.phase = (phase - frames) % self.decimation
+        self.written += count
+
+    # Worker side
+
+    def request(self):
+        """The latest frame; also keeps the worker running for a while."""
+        self.wanted = time.monotonic()
+        return self.latest
+
+    def serve(self):
+        while True:
+            time.sleep(1 / self.rate)
+            if time.monotonic() - self.wanted < 1.0:
+                self.analyze()
+
+    def recent(self, count):
+        """The last `count` samples of both sources, mixed to mono, oldest first."""
+        end = self.written
+        count = min(count, end, self.capacity // 2)
+        start = (end - count) % self.capacity
+        if start + count <= self.capacity:
+            block = self.ring[:, :, start:start + count]
+        else:
+            block = numpy.concatenate((self.ring[:, :, start:], self.ring[:, :, :start + count - self.capacity]), axis=-1)
+        return block.mean(axis=1)
+
+    def spectrum(self, mono):
+        # Every hop since the previous run, both sources, in one rfft call
+        frames = sliding_window_view(mono, self.fft_size, axis=-1)[:, ::self.hop]
+        power = numpy.abs(numpy.fft.rfft(frames * self.window, axis=-1)) ** 2
+        power = power.mean(axis=1)
+        bands = numpy.add.reduceat(power, self.starts, axis=-1) / self.counts
+        decibels = 10 * numpy.log10(numpy.maximum(bands / self.reference, 1e-12))
+        scaled = (decibels - self.floor_db) / -self.floor_db * 255
+        return scaled.clip(0, 255).astype(numpy.uint8)
+
+    def waveform(self, mono):
+        per_point = max(1, mono.shape[-1] // self.width)
+        points = mono[:, -per_point * self.width:].reshape(2, -1, per_point)
+        envelope = numpy.stack((points.min(axis=-1), points.max(axis=-1)), axis=-1)
+        return (envelope.clip(-1, 1) * 127).astype(numpy.int8)
+
+    def analyze(self):
+        if self.ring is None or self.written < self.fft_size:
+            return
+        written = self.written
+        new = written - self.analyzed
+        self.analyzed = written
+        # Enough for every hop that started since the previous run
+        analyzed_span = min(max(self.fft_size, new + self.fft_size - self.hop), self.capacity // 2)
+        waveform_span = int(self.waveform_seconds * self.sample_rate / self.decimation)
+        mono = self.recent(max(analyzed_span, waveform_span))
+
+        spectrum = self.spectrum(mono[:, -analyzed_span:])
+        waveform = self.waveform(mono[:, -waveform_span:])
+        self.frames += 1
+        self.latest = {
+            name: {
+                'spectrum': base64.b64encode(spectrum[source].tobytes()).decode(),
+                'waveform': base64.b64encode(waveform[source].tobytes()).decode(),
+            }
+            for name, source in (('input', INPUT), ('output', OUTPUT))
+        }
@@ -1,14 +1,320 @@
-import os
-import jack
+import time
 import numpy
 import asyncio
+import threading
 
 import config
-import utils
+import backends
+import telemetry
+import pipeline
+import instances
+
+# Set by the process callback once the first block has been written out
+first_sound = threading.Event()
+
+def internal_block(frames):
+    """Frames the board runs on per call for a period of `frames`.
+
+    The period itself in 'live' mode. In 'efficient' mode, the smallest
+    whole number of periods holding config.efficient_block_size frames.
+    """
+    if config.latency_mode != 'efficient':
+        return frames
+    return max(1, -(-config.efficient_block_size // frames)) * frames
+
+
+class Processor:
+    """Runs the board over buffers that are allocated once per block size.
+
+    `instance` is where the board, controller and meters come from: the
+    config module for the main port group, an instances.Instance for the
+    others. Profiling and load shedding only follow the main one.
+
+    In 'efficient' latency mode the periods go through a FIFO and the board
+    runs once per internal block of several periods. The block is run in
+    the period that completes it and played out over the following ones,
+    which adds `latency` frames, the internal block less one period.
+    """
+
+    def __init__(self, channels=2, segment=None, instance=None):
+        self.instance = instance or config
+        self.main = self.instance is config
+        self.channels = channels
+        self.frames = 0
+        self.block = 0
+        self.latency = 0
+        self.position = 0
+        self.sample_rate = 0
+        self.input = None
+        self.board = None
+        self.dsp_load = 0.0
+        self.segment = segment
+        self.effects_version = -1
+        self.settled = -1
+
+    def prepare(self, frames, sample_rate):
+        # Called from the JACK buffer size and sample rate callbacks, never once per block
+        block = internal_block(frames)
+        if frames == self.frames and block == self.block and sample_rate == self.sample_rate:
+            return
+
+        self.instance.controller.prepare(block, sample_rate)
+        self.latency = block - frames
+        if self.main:
+            config.sample_rate = sample_rate
+            config.block_size = frames
+            config.processing_block = block
+        self.sample_rate = sample_rate
+        if frames == self.frames and block == self.block:
+            return
+
+        self.frames = frames
+        self.block = block
+        self.position = 0
+        self.input = numpy.zeros((self.channels, frames), dtype=numpy.float32)
+        self.mixed = numpy.zeros((self.channels, block), dtype=numpy.float32)
+        self.faded = numpy.zeros((self.channels, block), dtype=numpy.float32)
+        self.fade_in = numpy.linspace(0, 1, block, dtype=numpy.float32)
+        self.fade_out = 1 - self.fade_in
+        # The FIFO of the efficient mode: periods gathered for the next
+        # internal block, and the processed block being played out
+        self.pending = numpy.zeros((self.channels, block), dtype=numpy.float32)
+        self.ready = numpy.zeros((self.channels, block), dtype=numpy.float32)
+
+    def process(self, inputs, outputs, sample_rate=None):
+        started = time.perf_counter()
+        frames = len(inputs[0])
+        if sample_rate is None:
+            # The rate the callbacks prepared for, rather than asking the backend every block
+            sample_rate = self.sample_rate
+        if frames != self.frames or sample_rate != self.sample_rate:
+            # Backends without a buffer size callback end up here once
+            self.prepare(frames, sample_rate)
+
+        instance = self.instance
+
+        # Parameter changes land here, between two runs of the board
+        instance.controller.apply()
+
+        # Channels-first layout keeps every port buffer a contiguous row
+        for channel, buffer in enumerate(inputs):
+            numpy.copyto(self.input[channel], buffer)
+
+        if self.block == frames:
+            processed = self.run(self.input, sample_rate)
+        else:
+            processed = self.queue(frames, sample_rate)
+
+        profiler = config.profiler
+        shedder = config.shedder
+        main = self.main
+        if main:
+            # Plays and overdubs the loop on top of the processed signal
+            processed = config.looper.process(processed)
+
+        instance.input_meter.update(self.input)
+        instance.output_meter.update(processed)
+        instance.input_rms = instance.input_meter.level
+        instance.output_rms = instance.output_meter.level
+
+        # Output processed audio straight into the port buffers
+        latency = frames - processed.shape[-1]
+        for channel, buffer in enumerate(outputs):
+            if latency > 0:
+                # The board is still buffering, pad the head with silence
+                buffer[:latency] = 0
+            numpy.copyto(buffer[latency:], processed[channel], casting='same_kind')
+
+        if main and (config.load_injector.fraction or config.load_injector.jitter):
+            config.load_injector.burn(frames / sample_rate)
+
+        elapsed = time.perf_counter() - started
+        self.dsp_load = elapsed * sample_rate / frames
+        if main and profiler.enabled:
+            profiler.record_block(elapsed, self.dsp_load)
+        if main and shedder.enabled and shedder.observe(self.dsp_load) and self.segment is not None:
+            self.segment.publish_shedding(shedder.level, shedder.transitions)
+        self.publish()
+
+    def run(self, audio, sample_rate):
+        """One call of the board over `audio`, a period or an internal block."""
+        # A new board is picked up here, with one reference read per block
+        board = self.instance.board
+        if board is not self.board:
+            return self.swap(board, audio, sample_rate)
+        if self.main and config.shedder.enabled:
+            # Same plugins, with the sheddable ones behind crossfading stand-ins
+            board = config.shedder.board(board)
+        if self.main and config.profiler.per_plugin:
+            # Same plugins, run one by one so each of them is timed
+            board = config.profiler.board(board)
+        # Process audio through the pedalboard, its buffer size matched to the block
+        return board(audio, sample_rate, self.block, False)
+
+    def queue(self, frames, sample_rate):
+        """Efficient mode: adds the period to the FIFO and returns the period to play."""
+        position = self.position
+        numpy.copyto(self.pending[:, position:position + frames], self.input)
+        position += frames
+        if position == self.block:
+            processed = self.run(self.pending, sample_rate)
+            # A board that is still buffering returns fewer frames, pad the head
+            latency = self.block - processed.shape[-1]
+            self.ready[:, :latency] = 0
+            numpy.copyto(self.ready[:, latency:], processed, casting='same_kind')
+            position = 0
+        self.position = position
+        # The period completing a block plays the block's first period
+        return self.ready[:, position:position + frames]
+
+    def swap(self, board, audio, sample_rate):
+        previous = self.board
+        self.board = board
+        # Published before either board runs, so the preset bank leaves both alone
+        self.instance.live_boards = (board, previous)
+        processed = board(audio, sample_rate, self.block, False)
+        if previous is None or not self.instance.preset_crossfade:
+            return processed
+
+        # Run the old board for one more block and crossfade into the new one
+        faded = previous(audio, sample_rate, self.block, False)
+        if faded.shape != processed.shape:
+            return processed
+        numpy.multiply(processed, self.fade_in, out=self.mixed)
+        numpy.multiply(faded, self.fade_out, out=self.faded)
+        numpy.add(self.mixed, self.faded, out=self.mixed)
+        return self.mixed
+
+    def publish(self):
+        segment = self.segment
+        if segment is None:
+            return
+
+        instance = self.instance
+        segment.publish_levels(instance.input_meter, instance.output_meter, self.dsp_load)
+        if self.effects_version != instance.effects_version or self.settled != instance.controller.settled:
+            # Effect states only change from the control plane, so this is rare
+            self.effects_version = instance.effects_version
+            self.settled = instance.controller.settled
+            segment.publish_effects(telemetry.effect_states(instance.board))
+
+
+def start_pipeline(frames, sample_rate):
+    engine = pipeline.Pipeline(2, frames, sample_rate, config.pipeline_periods, block=internal_block(frames))
+    engine.start()
+    print(f"🎚 Pipelined engine: {engine.latency} frames ({engine.latency / sample_rate * 1000:.1f} ms) of extra latency")
+    return engine
+
+
+# Serialises pipeline replacements, never taken by the audio thread
+replacing = threading.Lock()
+
+
+def replace_pipeline(processor):
+    """Swaps in a pipeline for the processor's new period or rate, or for a failed one.
+
+    The new DSP process is started and waited for on a thread of its own,
+    since JACK holds processing while its callbacks run. The process
+    callback runs the board itself until the swap.
+    """
+    def replace():
+        with replacing:
+            previous = config.pipeline
+            frames, sample_rate = processor.frames, processor.sample_rate
+            if previous is None or (not previous.failed and (previous.frames, previous.sample_rate) == (frames, sample_rate)):
+                return
+            config.pipeline = start_pipeline(frames, sample_rate)
+            previous.stop()
+
+    threading.Thread(target=replace, name='pipeline', daemon=True).start()
+
+
+def follow_rate(sample_rate):
+    """Builds the preset again if the active board was built for another rate."""
+    # Boards are built for one rate, with impulse responses resampled to it
+    built = getattr(config.board, 'sample_rate', None)
+    if built is None or built == sample_rate:
+        return
+    print(f"🎚 Board was built for {built} Hz, building it again for {sample_rate} Hz")
+    config.preset_bank.clear()
+    config.preset_bank.switch(config.preset, crossfade=False)
+
+
+def open_instance(instance):
+    """Runs an extra port group on a JACK client of its own.
+
+    JACK2 runs independent clients in parallel, so every group gets its own
+    process thread and core, and a heavy board in one group cannot make
+    another one miss its deadline.
+    """
+    client = backends.open_client(f"ResoBox-{instance.name}", main=False)
+    processor = Processor(channels=instance.channels, segment=instance.open_telemetry(), instance=instance)
+    processor.prepare(client.blocksize, client.samplerate)
+
+    def follow_instance_rate(sample_rate):
+        # Built for this client's rate, the main client's callback may not have run yet
+        if getattr(instance.board, 'sample_rate', sample_rate) != sample_rate:
+            config.preset_bank.switch(instance.preset, False, target=instance, sample_rate=sample_rate)
+
+    follow_instance_rate(client.samplerate)
+
+    input_ports = [client.inports.register(f"input_{channel + 1}") for channel in range(instance.channels)]
+    output_ports = [client.outports.register(f"output_{channel + 1}") for channel in range(instance.channels)]
+    inputs = [None] * instance.channels
+    outputs = [None] * instance.channels
+
+    @client.set_process_callback
+    def process(frames):
+        for channel in range(instance.channels):
+            inputs[channel] = input_ports[channel].get_array()
+            outputs[channel] = output_ports[channel].get_array()
+        processor.process(inputs, outputs)
+
+    @client.set_blocksize_callback
+    def blocksize(frames):
+        processor.prepare(frames, processor.sample_rate)
+
+    @client.set_samplerate_callback
+    def samplerate(sample_rate):
+        processor.prepare(processor.frames, sample_rate)
+        follow_instance_rate(sample_rate)
+
+    @client.set_xrun_callback
+    def xrun(delay):
+        processor.segment.publish_xrun(delay)
+        print(f"🔮 XRUN in {instance.name}: Delay of {delay} microseconds")
+
+    client.activate()
+
+    capture_ports = client.get_ports(is_physical=True, is_output=True)
+    playback_ports = client.get_ports(is_physical=True, is_input=True)
+    for port, index in zip(input_ports, instance.capture):
+        if index < len(capture_ports):
+            client.connect(capture_ports[index], port.name)
+    for port, index in zip(output_ports, instance.playback):
+        if index < len(playback_ports):
+            client.connect(port.name, playback_ports[index])
+
+    print(f"🎸 Instance {instance.name}: {instance.channels} channels, preset {instance.preset}")
+    return client
+
 
 async def audio_server():
     global config
-    client = jack.Client("ResoBox")
+
+    loop = asyncio.get_running_loop()
+    lost = asyncio.Event()
+
+    client = backends.open_client("ResoBox")
+    processor = Processor(channels=2, segment=telemetry.segment())
+    processor.prepare(client.blocksize, client.samplerate)
+    config.analyzer.prepare(client.samplerate)
+    follow_rate(client.samplerate)
+    if config.engine == 'pipelined':
+        config.pipeline = start_pipeline(client.blocksize, client.samplerate)
+    elif processor.latency:
+        print(f"🎚 Efficient mode: the board runs on {processor.block} frames, "
+              f"{processor.latency} frames ({processor.latency / client.samplerate * 1000:.1f} ms) of extra latency")
 
     # Create two ports for stereo input and output
     input_port_l = client.inports.register("input_1")
@@ -16,39 +322,62 @@ async def audio_server():
     output_port_l = client.outports.register("output_1")
     output_port_r = client.outports.register("output_2")
 
-    @client.set_process_callback
-    def process(buffer):
-        sampleRate = client.samplerate
-
-        # Convert input buffer to numpy array with appropriate type
-        input_l = numpy.frombuffer(input_port_l.get_buffer(), dtype=numpy.float32)
-        input_r = numpy.frombuffer(input_port_r.get_buffer(), dtype=numpy.float32)
-
-        stereo_audio = numpy.stack([input_l, input_r], axis=-1)
+    inputs = [None, None]
+    outputs = [None, None]
 
-        # Process audio through the pedalboard
-        processed_audio = config.board(stereo_audio, sampleRate, 8192, False).astype(numpy.float32)
-
-        config.input_rms_values.append(numpy.sqrt(numpy.mean(numpy.square(stereo_audio))))
-        config.output_rms_values.append(numpy.sqrt(numpy.mean(numpy.square(processed_audio))))
-        config.input_rms = utils.moving_average(config.input_rms_values, config.window_size)
-        config.output_rms = utils.moving_average(config.output_rms_values, config.window_size)
-
-        # Output processed audio
-        output_port_l.get_buffer()[:] = processed_audio[:, 0].tobytes()
-        output_port_r.get_buffer()[:] = processed_audio[:, 1].tobytes()
+    @client.set_process_callback
+    def process(frames):
+        # Port buffers are viewed and written in place, no tobytes round trip
+        inputs[0] = input_port_l.get_array()
+        inputs[1] = input_port_r.get_array()
+        outputs[0] = output_port_l.get_array()
+        outputs[1] = output_port_r.get_array()
+
+        engine = config.pipeline
+        if engine is not None and not engine.failed and engine.frames == frames and engine.sample_rate == processor.sample_rate:
+            # The board runs in the DSP process, this side only moves blocks
+            config.controller.apply()
+            engine.exchange(inputs, outputs)
+        else:
+            # Also while a pipeline for a new period or rate, or after a
+            # crash of the DSP process, is starting
+            processor.process(inputs, outputs)
+        config.recorder.write(outputs)
+        config.analyzer.write(inputs, outputs)
+        if not first_sound.is_set():
+            first_sound.set()
+
+
+    # JACK calls these from a non-realtime thread with the process cycle
+    # suspended, so buffers are allocated here and anything slow (DSP
+    # process, board builds) is handed to other threads
+    @client.set_blocksize_callback
+    def blocksize(frames):
+        processor.prepare(frames, processor.sample_rate)
+        replace_pipeline(processor)
+
+    @client.set_samplerate_callback
+    def samplerate(sample_rate):
+        processor.prepare(processor.frames, sample_rate)
+        config.analyzer.prepare(sample_rate)
+        replace_pipeline(processor)
+        follow_rate(sample_rate)
 
 
     @client.set_xrun_callback
     def xrun(delay):
 
+        processor.segment.publish_xrun(delay)
+        config.profiler.record_xrun(delay)
         print(f"🔮 XRUN: Delay of {delay} microseconds")
 
 
     @client.set_shutdown_callback
     def shutdown(status, reason):
 
-        print(f"🚽 JACK shutdown: {reason}, status: {status}")
+        print(f"🚽 {config.backend} shutdown: {reason}, status: {status}")
+        # Ends audio_server, the supervisor then reconnects with backoff
+        loop.call_soon_threadsafe(lost.set)
 
 
     # Activate the client
@@ -62,6 +391,7 @@ async def audio_server():
 
     # and the output ports to the system playback ports, if available.
 
+    extra_clients = []
     try:
 
         capture_ports = client.get_ports(is_physical=True, is_output=True)
@@ -82,15 +412,31 @@ async def audio_server():
         else:
 
             print("🛑 Not enough capture or playback ports available")
+
+        # Extra port groups, each with its own board and client
+        for instance in instances.build().values():
+            extra_clients.append(open_instance(instance))
     
-        await asyncio.Future()
+        while not lost.is_set():
+            try:
+                await asyncio.wait_for(lost.wait(), 1.0)
+            except asyncio.TimeoutError:
+                # A dead DSP process would otherwise leave the rings empty for good
+                engine = config.pipeline
+                if engine is not None and not engine.failed and not engine.check():
+                    replace_pipeline(processor)
+        raise RuntimeError(f"{config.backend} backend went away")
 
     finally:
         # Deactivate and close the client properly
         client.deactivate()
         client.close()
-        os._exit(1)
-    
+        for extra_client in extra_clients:
+            extra_client.deactivate()
+            extra_client.close()
+        for instance in instances.registry.values():
+            instance.close_telemetry()
+        if config.pipeline is not None:
+            config.pipeline.stop()
+            config.pipeline = None
 
-def start_audio_server():
-    asyncio.run(audio_server())
@@ -0,0 +1,293 @@
+import time
+import threading
+import numpy
+import soundfile
+
+class Port:
+    """A port buffer that stays the same array from block to block."""
+
+    def __init__(self, name, frames):
+        self.name = name
+        self.shortname = name.split(':', 1)[-1]
+        self.buffer = numpy.zeros(frames, dtype=numpy.float32)
+
+    def get_array(self):
+        return self.buffer
+
+
+class Ports(list):
+    def __init__(self, client):
+        super().__init__()
+        self.client = client
+
+    def register(self, shortname):
+        port = Port(f"{self.client.name}:{shortname}", self.client.blocksize)
+        self.append(port)
+        return port
+
+
+class Client:
+    """The part of jack.Client the audio server uses, for other backends.
+
+    Port buffers in, port buffers out, one process callback per block, plus
+    block size, xrun and shutdown callbacks. The device channels show up as
+    physical 'system:capture_N' and 'system:playback_N' ports, and connect()
+    routes them to the registered ports the way JACK would. Subclasses move
+    the device audio with cycle().
+    """
+
+    def __init__(self, name, blocksize, samplerate, capture_channels=2, playback_channels=2):
+        self.name = name
+        self.blocksize = blocksize
+        self.samplerate = samplerate
+        self.inports = Ports(self)
+        self.outports = Ports(self)
+        self.capture = [f"system:capture_{channel + 1}" for channel in range(capture_channels)]
+        self.playback = [f"system:playback_{channel + 1}" for channel in range(playback_channels)]
+        # (port buffer, device channel) pairs, replaced whole so the audio thread never sees half a change
+        self.capture_routes = []
+        self.playback_routes = []
+        self.active = False
+        self._process = None
+        self._blocksize = None
+        self._samplerate = None
+        self._xrun = None
+        self._shutdown = None
+
+    def set_process_callback(self, callback):
+        self._process = callback
+        return callback
+
+    def set_blocksize_callback(self, callback):
+        self._blocksize = callback
+        return callback
+
+    def set_samplerate_callback(self, callback):
+        # The rate is fixed once the client exists, so this is never called
+        self._samplerate = callback
+        return callback
+
+    def set_xrun_callback(self, callback):
+        self._xrun = callback
+        return callback
+
+    def set_shutdown_callback(self, callback):
+        self._shutdown = callback
+        return callback
+
+    def get_ports(self, name_pattern='', is_physical=False, is_input=False, is_output=False, **kwargs):
+        # Like JACK, capture ports are outputs and playback ports are inputs
+        if is_output:
+            return list(self.capture)
+        if is_input:
+            return list(self.playback)
+        return self.capture + self.playback
+
+    def connect(self, source, destination):
+        source = getattr(source, 'name', source)
+        destination = getattr(destination, 'name', destination)
+        if source in self.capture:
+            port = self.port(self.inports, destination)
+            self.capture_routes = self.capture_routes + [(port.buffer, self.capture.index(source))]
+        elif destination in self.playback:
+            port = self.port(self.outports, source)
+            self.playback_routes = self.playback_routes + [(port.buffer, self.playback.index(destination))]
+        else:
+            raise ValueError(f"Cannot connect {source} to {destination}")
+
+    def port(self, ports, name):
+        for port in ports:
+            if port.name == name:
+                return port
+        raise ValueError(f"No port {name}")
+
+    def cycle(self, captured, played):
+        """One block: device input (frames, channels) to ports, process, ports to device output."""
+        for buffer, channel in self.capture_routes:
+            buffer[:] = captured[:, channel]
+        self._process(self.blocksize)
+        played.fill(0)
+        for buffer, channel in self.playback_routes:
+            played[:, channel] += buffer
+
+    def activate(self):
+        # JACK reports the block size on activation, so the others do too
+        if self._blocksize is not None:
+            self._blocksize(self.blocksize)
+        self.active = True
+
+    def deactivate(self):
+        self.active = False
+
+    def close(self):
+        pass
+
+
+class SoundDeviceClient(Client):
+    """Runs the box on any PortAudio device through sounddevice."""
+
+    def __init__(self, name, blocksize, samplerate, device=None, capture_channels=2, playback_channels=2, latency='low'):
+        super().__init__(name, blocksize, samplerate, capture_channels, playback_channels)
+        self.device = device
+        self.latency = latency
+        self.stream = None
+
+    def activate(self):
+        import sounddevice
+
+        super().activate()
+        self.stream = sounddevice.Stream(
+            samplerate=self.samplerate,
+            blocksize=self.blocksize,
+            device=self.device,
+            channels=(len(self.capture), len(self.playback)),
+            dtype='float32',
+            latency=self.latency,
+            callback=self.callback,
+            finished_callback=self.finished,
+        )
+        self.stream.start()
+
+    def callback(self, indata, outdata, frames, time, status):
+        if (status.input_overflow or status.output_underflow) and self._xrun is not None:
+            # PortAudio does not say by how much
+            self._xrun(0.0)
+        self.cycle(indata, outdata)
+
+    def finished(self):
+        if self.active and self._shutdown is not None:
+            self._shutdown(0, "PortAudio stream stopped")
+
+    def deactivate(self):
+        self.active = False
+        if self.stream is not None:
+            self.stream.stop()
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+
+
+class NullClient(Client):
+    """Deterministic backend without any audio hardware.
+
+    Reads the capture channels from a sound file (silence without one) and
+    writes the playback channels to another, through soundfile. Once
+    activated it runs on its own thread, paced to the wall clock with
+    `realtime` (falling a whole period behind is an xrun) or as fast as
+    possible. run() drives it on the calling thread instead, for tests
+    and benchmarks. At the end of the input it starts over with `loop`,
+    otherwise it stops and reports a shutdown.
+    """
+
+    def __init__(self, name, blocksize, samplerate, input_path=None, output_path=None, realtime=True, loop=True, capture_channels=2, playback_channels=2, subtype='FLOAT'):
+        self.input = None
+        if input_path is not None:
+            self.input = soundfile.SoundFile(input_path)
+            samplerate = self.input.samplerate
+            capture_channels = self.input.channels
+        super().__init__(name, blocksize, samplerate, capture_channels, playback_channels)
+        self.output = None
+        if output_path is not None:
+            self.output = soundfile.SoundFile(output_path, 'w', samplerate=samplerate, channels=playback_channels, subtype=subtype)
+        self.realtime = realtime
+        self.loop = loop
+        self.captured = numpy.zeros((blocksize, capture_channels), dtype=numpy.float32)
+        self.played = numpy.zeros((blocksize, playback_channels), dtype=numpy.float32)
+        self.blocks = 0
+        self.finished = threading.Event()
+        self.thread = None
+
+    def read(self):
+        """Fills the capture buffer; False once a non-looping input is used up."""
+        if self.input is None:
+            return True
+        count = len(self.input.read(out=self.captured))
+        while count < self.blocksize:
+            if not self.loop:
+                if count == 0:
+                    return False
+                self.captured[count:] = 0
+                return True
+            self.input.seek(0)
+            count += len(self.input.read(out=self.captured[count:]))
+        return True
+
+    def step(self):
+        if not self.read():
+            return False
+        self.cycle(self.captured, self.played)
+        if self.output is not None:
+            self.output.write(self.played)
+        self.blocks += 1
+        return True
+
+    def run(self, blocks=None):
+        """Processes blocks on the calling thread as fast as possible; returns how many."""
+        Client.activate(self)
+        done = 0
+        while (blocks is None or done < blocks) and self.step():
+            done += 1
+        self.active = False
+        return done
+
+    def serve(self):
+        period = self.blocksize / self.samplerate
+        deadline = time.perf_counter()
+        while self.active:
+            if not self.step():
+                self.finished.set()
+                if self._shutdown is not None:
+                    self._shutdown(0, "End of input")
+                return
+            if self.realtime:
+                deadline += period
+                late = time.perf_counter() - deadline
+                if late > period:
+                    # Like a device with two periods of buffering, one late
+                    # block is absorbed and a whole missed period is an xrun
+                    if self._xrun is not None:
+                        self._xrun(late * 1e6)
+                    deadline = time.perf_counter()
+                elif late < 0:
+                    time.sleep(-late)
+
+    def activate(self):
+        super().activate()
+        self.thread = threading.Thread(target=self.serve, name=f'{self.name}-null', daemon=True)
+        self.thread.start()
+
+    def deactivate(self):
+        self.active = False
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.thread = None
+
+    def close(self):
+        if self.input is not None:
+            self.input.close()
+            self.input = None
+        if self.output is not None:
+            self.output.close()
+            self.output = None
+
+
+def open_client(name, main=True):
+    """An audio client for config.backend; only the main group gets the null backend files."""
+    import config
+
+    if config.backend == 'jack':
+        import jack
+        return jack.Client(name)
+    if config.backend == 'sounddevice':
+        return SoundDeviceClient(name, config.block_size, config.sample_rate, config.sounddevice_device)
+    if config.backend == 'null':
+        return NullClient(
+            name, config.block_size, config.sample_rate,
+            input_path=config.null_input if main else None,
+            output_path=config.null_output if main else None,
+            realtime=config.null_realtime,
+            loop=config.null_loop,
+        )
+    raise ValueError(f"Unknown audio backend: {config.backend}")
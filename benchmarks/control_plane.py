@@ -0,0 +1,169 @@
+import time
+import asyncio
+import argparse
+import resource
+import threading
+import multiprocessing
+import numpy
+
+import audio
+import telemetry
+import supervisor
+
+from realtime import websocket_server
+from webhost import http_server
+
+LAYOUTS = ['threads', 'single']
+
+
+def serve_threads(services):
+    """The old layout: one thread and one event loop per service."""
+    running = []
+    for service in services:
+        loop = asyncio.new_event_loop()
+        task = loop.create_task(service())
+
+        def target(loop=loop, task=task):
+            try:
+                loop.run_until_complete(task)
+            except asyncio.CancelledError:
+                pass
+            loop.close()
+
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        running.append((thread, loop, task))
+
+    def stop():
+        for thread, loop, task in running:
+            loop.call_soon_threadsafe(task.cancel)
+            thread.join()
+    return stop
+
+
+def serve_single(services, use_uvloop=True):
+    """The supervised layout: every service on one loop."""
+    plane = supervisor.Supervisor()
+
+    async def main(plane):
+        for index, service in enumerate(services):
+            plane.start(f'service{index}', service)
+
+    thread = threading.Thread(target=supervisor.run, args=(main, use_uvloop, plane, False), daemon=True)
+    thread.start()
+
+    def stop():
+        while plane.stopping is None:
+            time.sleep(0.01)
+        plane.stop()
+        thread.join()
+    return stop
+
+
+def clients(seconds, sockets, poll_interval):
+    """Runs in its own process: WebSocket subscribers plus an HTTP poller."""
+    import aiohttp
+    import websockets
+
+    async def subscriber():
+        async with websockets.connect('ws://127.0.0.1:8765/') as websocket:
+            while True:
+                await websocket.recv()
+
+    async def poller():
+        async with aiohttp.ClientSession() as session:
+            while True:
+                async with session.get('http://127.0.0.1:8766/metrics') as response:
+                    await response.read()
+                await asyncio.sleep(poll_interval)
+
+    async def main():
+        await asyncio.sleep(0.5)  # Lets the servers bind
+        tasks = [asyncio.create_task(subscriber()) for _ in range(sockets)] + [asyncio.create_task(poller())]
+        await asyncio.sleep(seconds)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run(main())
+
+
+def run_audio(frames, sample_rate, seconds, results):
+    """Paces the Processor like a period-driven callback and records when
+    each block actually started and how long it took."""
+    processor = audio.Processor(channels=2, segment=telemetry.segment())
+    processor.prepare(frames, sample_rate)
+    signal = numpy.random.uniform(-0.3, 0.3, (2, frames)).astype(numpy.float32)
+    inputs = [signal[0], signal[1]]
+    outputs = [numpy.zeros(frames, dtype=numpy.float32) for _ in range(2)]
+
+    period = frames / sample_rate
+    blocks = int(seconds / period)
+    lateness = numpy.zeros(blocks)
+    durations = numpy.zeros(blocks)
+
+    before = resource.getrusage(resource.RUSAGE_THREAD)
+    deadline = time.perf_counter()
+    for block in range(blocks):
+        deadline += period
+        delay = deadline - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        # Time past the deadline is mostly waiting for the GIL after the sleep
+        woke = time.perf_counter()
+        processor.process(inputs, outputs, sample_rate)
+        lateness[block] = max(0.0, woke - deadline)
+        durations[block] = time.perf_counter() - woke
+    after = resource.getrusage(resource.RUSAGE_THREAD)
+
+    results['lateness'] = lateness
+    results['durations'] = durations
+    results['voluntary'] = after.ru_nvcsw - before.ru_nvcsw
+    results['involuntary'] = after.ru_nivcsw - before.ru_nivcsw
+
+
+def run(layout, frames=128, sample_rate=44100, seconds=10.0, sockets=4, poll_interval=0.02, use_uvloop=True):
+    services = [websocket_server, http_server]
+    stop = serve_threads(services) if layout == 'threads' else serve_single(services, use_uvloop)
+
+    # Spawned, so the clients share nothing with the loops running here
+    load = multiprocessing.get_context('spawn').Process(target=clients, args=(seconds + 1.0, sockets, poll_interval))
+    load.start()
+    time.sleep(1.0)
+
+    results = {}
+    process_before = resource.getrusage(resource.RUSAGE_SELF)
+    worker = threading.Thread(target=run_audio, args=(frames, sample_rate, seconds, results))
+    worker.start()
+    worker.join()
+    process_after = resource.getrusage(resource.RUSAGE_SELF)
+
+    load.join()
+    stop()
+    time.sleep(0.5)  # Ports are free again before the next layout
+
+    results['threads'] = threading.active_count()
+    results['process_switches'] = (process_after.ru_nvcsw - process_before.ru_nvcsw) + (process_after.ru_nivcsw - process_before.ru_nivcsw)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="🎛 ResoBox control plane layout benchmark")
+    parser.add_argument('--frames', type=int, default=128)
+    parser.add_argument('--sample-rate', type=int, default=44100)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--sockets', type=int, default=4, help="WebSocket subscribers")
+    parser.add_argument('--no-uvloop', action='store_true')
+    args = parser.parse_args()
+
+    telemetry.segment(create=True)
+    try:
+        print(f"{'layout':>8} {'audio ctx vol':>13} {'audio ctx invol':>15} {'process ctx':>11} {'late p50 µs':>11} {'late p99 µs':>11} {'late max µs':>11} {'block p99 µs':>12}")
+        for layout in LAYOUTS:
+            results = run(layout, args.frames, args.sample_rate, args.seconds, args.sockets, use_uvloop=not args.no_uvloop)
+            lateness = results['lateness'] * 1e6
+            print(f"{layout:>8} {results['voluntary']:>13} {results['involuntary']:>15} {results['process_switches']:>11} "
+                  f"{numpy.percentile(lateness, 50):>11.1f} {numpy.percentile(lateness, 99):>11.1f} {lateness.max():>11.1f} "
+                  f"{numpy.percentile(results['durations'], 99) * 1e6:>12.1f}")
+    finally:
+        telemetry.release()
@@ -0,0 +1,77 @@
+import time
+import argparse
+import threading
+import numpy
+
+import audio
+
+from instances import Instance
+
+COUNTS = [1, 2, 3, 4, 5, 6, 7, 8]
+
+
+def run_cycle(count, frames, sample_rate, cycles, preset='default'):
+    """Runs `count` groups side by side, one thread each like one JACK client
+    each, in lockstep cycles. Returns per-block and per-cycle times."""
+    groups = [Instance(f'bench{index}', preset) for index in range(count)]
+    processors = [audio.Processor(channels=group.channels, instance=group) for group in groups]
+    for processor in processors:
+        processor.prepare(frames, sample_rate)
+
+    signal = numpy.random.uniform(-0.3, 0.3, (2, frames)).astype(numpy.float32)
+    block_times = numpy.zeros((count, cycles))
+    cycle_times = numpy.zeros(cycles)
+    barrier = threading.Barrier(count + 1)
+
+    def worker(index):
+        inputs = [signal[0], signal[1]]
+        outputs = [numpy.zeros(frames, dtype=numpy.float32) for _ in range(2)]
+        processor = processors[index]
+        for cycle in range(cycles):
+            barrier.wait()
+            started = time.perf_counter()
+            processor.process(inputs, outputs, sample_rate)
+            block_times[index, cycle] = time.perf_counter() - started
+            barrier.wait()
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for cycle in range(cycles):
+        started = time.perf_counter()
+        barrier.wait()
+        barrier.wait()
+        cycle_times[cycle] = time.perf_counter() - started
+    for thread in threads:
+        thread.join()
+
+    # The first blocks pay for lazy plugin setup
+    skip = min(cycles // 10, 100)
+    return block_times[:, skip:], cycle_times[skip:]
+
+
+def run(frames=128, sample_rate=44100, cycles=1000):
+    period = frames / sample_rate
+    rows = []
+    for count in COUNTS:
+        block_times, cycle_times = run_cycle(count, frames, sample_rate, cycles)
+        rows.append((
+            count,
+            numpy.percentile(block_times, 50) * 1e6,
+            numpy.percentile(block_times, 99) * 1e6,
+            numpy.percentile(cycle_times, 50) / period,
+            numpy.percentile(cycle_times, 99) / period,
+        ))
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="🎛 ResoBox multi-instance scaling benchmark")
+    parser.add_argument('--frames', type=int, default=128)
+    parser.add_argument('--sample-rate', type=int, default=44100)
+    parser.add_argument('--cycles', type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"{'groups':>6} {'block p50 µs':>13} {'block p99 µs':>13} {'cycle p50':>10} {'cycle p99':>10}  (cycle as share of the period)")
+    for count, block_median, block_tail, cycle_median, cycle_tail in run(args.frames, args.sample_rate, args.cycles):
+        print(f"{count:>6} {block_median:>13.1f} {block_tail:>13.1f} {cycle_median:>10.1%} {cycle_tail:>10.1%}")
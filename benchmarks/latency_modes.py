@@ -0,0 +1,59 @@
+import argparse
+import numpy
+
+import audio
+import config
+import presets
+
+from benchmarks.suite import time_engine
+
+FRAMES = [32, 64, 128, 256]
+BLOCK_SIZES = [256, 512, 1024]
+
+
+def run(preset='default', frames_list=FRAMES, block_sizes=BLOCK_SIZES, sample_rate=48000, seconds=2.0, warmup=50):
+    """Throughput and latency of the live mode and the efficient mode at
+    every internal block size, on the null backend.
+
+    Throughput is the realtime multiple over all blocks. The worst periods
+    of the efficient mode are the ones that run a whole internal block, so
+    their p99 load is what has to stay under the deadline.
+    """
+    description = presets.load(preset)
+    modes = [('live', None)] + [('efficient', block_size) for block_size in block_sizes]
+    rows = []
+    for frames in frames_list:
+        period = frames / sample_rate
+        for mode, block_size in modes:
+            config.latency_mode = mode
+            config.efficient_block_size = block_size or config.efficient_block_size
+            block = audio.internal_block(frames)
+            if mode == 'efficient' and block == frames:
+                continue
+            board = presets.warm(presets.build(description, sample_rate, config.parallel_mix), sample_rate, block)
+            # Whole internal blocks only, so every block run is counted once
+            blocks = max(200, int(seconds / period)) // (block // frames) * (block // frames)
+            loads = time_engine(board, frames, sample_rate, blocks, warmup) / period
+            rows.append((
+                frames,
+                mode if block_size is None else f"{mode} {block}",
+                (block - frames) / sample_rate * 1000,
+                1 / loads.mean(),
+                numpy.percentile(loads, 99),
+            ))
+    config.latency_mode = 'live'
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="🎛 ResoBox latency mode benchmark: throughput against added latency")
+    parser.add_argument('--preset', default='default')
+    parser.add_argument('--frames', type=int, nargs='+', default=FRAMES)
+    parser.add_argument('--block-sizes', type=int, nargs='+', default=BLOCK_SIZES)
+    parser.add_argument('--sample-rate', type=int, default=48000)
+    parser.add_argument('--seconds', type=float, default=2.0, help="Audio processed per measurement")
+    args = parser.parse_args()
+
+    print(f"{'period':>6} {'mode':<16} {'added ms':>9} {'realtime x':>11} {'p99 load':>9}")
+    for frames, mode, latency, throughput, tail in run(args.preset, args.frames, args.block_sizes, args.sample_rate, args.seconds):
+        print(f"{frames:>6} {mode:<16} {latency:>9.2f} {throughput:>11.1f} {tail:>9.1%}")
@@ -0,0 +1,57 @@
+import time
+import argparse
+import numpy
+
+import presets
+
+from shedding import LoadShedder, LoadInjector
+
+# (seconds, injected share of the period): calm, overload, calm again
+SCHEDULE = [(1.0, 0.0), (2.0, 0.75), (3.0, 0.1)]
+
+
+def run(preset='default', frames=128, sample_rate=44100, schedule=SCHEDULE):
+    """Runs a board offline under a synthetic load schedule, block by block,
+    and returns the shed level over time.
+
+    Blocks are not paced to the wall clock: the load of a block is its own
+    time divided by the period, exactly as the process callback measures it.
+    """
+    board = presets.warm(presets.build(presets.load(preset), sample_rate), sample_rate, frames)
+    shedder = LoadShedder(release_blocks=int(0.5 * sample_rate / frames))
+    shedder.configure(True, board, sample_rate)
+    injector = LoadInjector()
+
+    period = frames / sample_rate
+    audio = numpy.random.uniform(-0.3, 0.3, (2, frames)).astype(numpy.float32)
+    timeline = []
+    block = 0
+    for duration, fraction in schedule:
+        injector.configure(fraction)
+        loads = []
+        for _ in range(int(duration / period)):
+            started = time.perf_counter()
+            output = shedder.board(board)(audio, sample_rate, frames, False)
+            if not numpy.isfinite(output).all():
+                raise RuntimeError("Board produced non-finite samples")
+            injector.burn(period)
+            load = (time.perf_counter() - started) / period
+            loads.append(load)
+            if shedder.observe(load):
+                timeline.append((block * period, shedder.level, list(shedder.shed_steps)))
+            block += 1
+        yield fraction, numpy.percentile(loads, 50), max(loads), shedder.level, timeline
+        timeline = []
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="🎛 ResoBox load shedding simulation")
+    parser.add_argument('--preset', default='default')
+    parser.add_argument('--frames', type=int, default=128)
+    parser.add_argument('--sample-rate', type=int, default=44100)
+    args = parser.parse_args()
+
+    for fraction, median, worst, level, timeline in run(args.preset, args.frames, args.sample_rate):
+        print(f"injected {fraction:4.0%}: load p50 {median:6.1%}, max {worst:6.1%}, level at end {level}")
+        for at, level, steps in timeline:
+            print(f"    {at:6.3f}s -> level {level} {steps}")
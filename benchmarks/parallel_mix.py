@@ -0,0 +1,62 @@
+import os
+import time
+import argparse
+import numpy
+
+import presets
+
+from plugins.parallel import ParallelMix, Pool
+
+FRAMES = [128, 256, 512, 1024]
+
+# The default board has no Mix with more than one non-empty branch, so
+# parallel_mix leaves it serial; 'parallel' runs an amp, a clean and an
+# ambience branch side by side, the shape where parallel branches pay off
+PRESETS = ('default', 'parallel')
+
+
+def measure(board, frames, sample_rate, blocks):
+    """Per-block times in microseconds, after a warm-up long enough for the mix to plan."""
+    audio = numpy.random.uniform(-0.3, 0.3, (2, frames)).astype(numpy.float32)
+    for _ in range(256):
+        board(audio, sample_rate, frames, False)
+    times = numpy.zeros(blocks)
+    for index in range(blocks):
+        started = time.perf_counter()
+        board(audio, sample_rate, frames, False)
+        times[index] = time.perf_counter() - started
+    return numpy.percentile(times, 50) * 1e6, numpy.percentile(times, 99) * 1e6
+
+
+def run(sample_rate=44100, blocks=2000, workers=None):
+    pool = Pool(workers)
+    rows = []
+    for name in PRESETS:
+        description = presets.load(name)
+        for frames in FRAMES:
+            serial = presets.build(description, sample_rate)
+            parallel = presets.build(description, sample_rate, parallel=True)
+            for plugin in parallel:
+                if hasattr(plugin, 'pool'):
+                    plugin.pool = pool
+            serial_times = measure(serial, frames, sample_rate, blocks)
+            parallel_times = measure(parallel, frames, sample_rate, blocks)
+            # With a core per branch only the costliest branch of a mix is on
+            # the critical path, which is what more cores can bring this board down to
+            hidden = sum(sum(plugin.costs) - max(plugin.costs) for plugin in parallel if isinstance(plugin, ParallelMix))
+            rows.append((name, frames, *serial_times, *parallel_times, serial_times[0] - hidden * 1e6))
+    return len(pool.workers), rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="🎛 ResoBox parallel Mix benchmark")
+    parser.add_argument('--sample-rate', type=int, default=44100)
+    parser.add_argument('--blocks', type=int, default=2000)
+    parser.add_argument('--workers', type=int, help="Mix workers, one per core but the first by default")
+    args = parser.parse_args()
+
+    workers, rows = run(args.sample_rate, args.blocks, args.workers)
+    print(f"{len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()} cores, {workers} mix workers, µs per block")
+    print(f"{'board':>9} {'frames':>7} {'serial p50':>11} {'p99':>8} {'parallel p50':>13} {'p99':>8} {'speedup':>8} {'critical path':>14}")
+    for name, frames, serial_median, serial_tail, parallel_median, parallel_tail, critical in rows:
+        print(f"{name:>9} {frames:>7} {serial_median:>11.1f} {serial_tail:>8.1f} {parallel_median:>13.1f} {parallel_tail:>8.1f} {serial_median / parallel_median:>7.2f}x {critical:>14.1f}")
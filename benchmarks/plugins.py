@@ -0,0 +1,73 @@
+import time
+import argparse
+import numpy
+
+from plugins.base import FusedChain
+from plugins.pan import Pan
+from plugins.gain import Gain
+from plugins.balance import Balance
+from plugins.width import Width
+
+FRAMES = [64, 128, 256, 512, 1024]
+
+
+class LegacyPan():
+    """The Pan plugin as it was before plugins.base, kept as the baseline."""
+
+    def __init__(self, balance=0.5):
+        self.balance = balance
+
+    def process(self, audio, sample_rate):
+        center_attenuation = numpy.sqrt(1/2)
+        left_gain = numpy.cos(self.balance * numpy.pi / 2) * center_attenuation
+        right_gain = numpy.sin(self.balance * numpy.pi / 2) * center_attenuation
+        audio[:, 0] *= left_gain
+        audio[:, 1] *= right_gain
+        return audio
+
+
+def measure(call, repeats):
+    # Best of several runs of `repeats` calls, in microseconds per call
+    best = float('inf')
+    for _ in range(5):
+        started = time.perf_counter()
+        for _ in range(repeats):
+            call()
+        best = min(best, (time.perf_counter() - started) / repeats)
+    return best * 1e6
+
+
+def run(sample_rate=44100, repeats=2000):
+    rows = []
+    for frames in FRAMES:
+        interleaved = numpy.random.uniform(-1, 1, (frames, 2)).astype(numpy.float32)
+        planar = numpy.ascontiguousarray(interleaved.T)
+
+        legacy = LegacyPan(0.3)
+        pan = Pan(0.3)
+        separate = [Gain(-3), Pan(0.3), Width(1.2), Balance(0.6)]
+        fused = FusedChain([Gain(-3), Pan(0.3), Width(1.2), Balance(0.6)])
+
+        def run_separate():
+            audio = planar
+            for plugin in separate:
+                audio = plugin.render(audio, sample_rate)
+
+        rows.append((
+            frames,
+            measure(lambda: legacy.process(interleaved, sample_rate), repeats),
+            measure(lambda: pan.render(planar, sample_rate), repeats),
+            measure(run_separate, repeats),
+            measure(lambda: fused.render(planar, sample_rate), repeats),
+        ))
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="🎛 ResoBox NumPy plugin microbenchmark")
+    parser.add_argument('--repeats', type=int, default=2000, help="Calls per measurement")
+    args = parser.parse_args()
+
+    print(f"{'frames':>7} {'legacy pan':>11} {'pan':>8} {'4 plugins':>10} {'fused':>8}   (µs per block)")
+    for frames, legacy, pan, separate, fused in run(repeats=args.repeats):
+        print(f"{frames:>7} {legacy:>11.2f} {pan:>8.2f} {separate:>10.2f} {fused:>8.2f}")
@@ -0,0 +1,200 @@
+import sys
+import json
+import time
+import argparse
+import platform
+import numpy
+import pedalboard
+
+import audio
+import config
+import effects
+import presets
+import backends
+
+FRAMES = [32, 64, 128, 256, 512, 1024]
+SAMPLE_RATES = [44100, 48000, 96000]
+
+
+def summary(times, period):
+    """Per-block times as shares of the period deadline."""
+    loads = numpy.asarray(times) / period
+    return {
+        'p50': float(numpy.percentile(loads, 50)),
+        'p99': float(numpy.percentile(loads, 99)),
+        'max': float(loads.max()),
+        'blocks': len(loads),
+    }
+
+
+def time_engine(board, frames, sample_rate, blocks, warmup):
+    """Times the whole process callback on the null backend: port routing,
+    the Processor copy into its planar buffer, the board, metering and the
+    copy into the output ports."""
+    config.board = board
+    client = backends.NullClient('ResoBox', frames, sample_rate, realtime=False)
+    processor = audio.Processor(channels=2)
+    ports = [client.inports.register('input_1'), client.inports.register('input_2')]
+    outputs = [client.outports.register('output_1'), client.outports.register('output_2')]
+    inputs = [port.get_array() for port in ports]
+    output_buffers = [port.get_array() for port in outputs]
+
+    @client.set_process_callback
+    def process(count):
+        processor.process(inputs, output_buffers, client.samplerate)
+
+    @client.set_blocksize_callback
+    def blocksize(count):
+        processor.prepare(count, client.samplerate)
+
+    capture = client.get_ports(is_physical=True, is_output=True)
+    playback = client.get_ports(is_physical=True, is_input=True)
+    for source, port in zip(capture, ports):
+        client.connect(source, port.name)
+    for port, destination in zip(outputs, playback):
+        client.connect(port.name, destination)
+
+    # Without an input file the capture buffer is never overwritten
+    client.captured[:] = numpy.random.uniform(-0.3, 0.3, client.captured.shape)
+    client.run(warmup)
+    times = numpy.zeros(blocks)
+    for block in range(blocks):
+        started = time.perf_counter()
+        client.step()
+        times[block] = time.perf_counter() - started
+    client.close()
+    return times
+
+
+def time_plugin(plugin, frames, sample_rate, blocks, warmup):
+    audio_block = numpy.random.uniform(-0.3, 0.3, (2, frames)).astype(numpy.float32)
+    for _ in range(warmup):
+        plugin(audio_block, sample_rate, frames, False)
+    times = numpy.zeros(blocks)
+    for block in range(blocks):
+        started = time.perf_counter()
+        plugin(audio_block, sample_rate, frames, False)
+        times[block] = time.perf_counter() - started
+    return times
+
+
+def run(preset='default', frames_list=FRAMES, sample_rates=SAMPLE_RATES, seconds=1.0, plugin_blocks=500, warmup=50, plugins=True, report=print):
+    """Runs every buffer size at every sample rate; returns the results by key.
+
+    Keys are 'engine/<rate>/<frames>' for the whole callback and
+    'plugin/<effect id>/<rate>/<frames>' for every plugin and container of
+    the board on its own.
+    """
+    results = {}
+    description = presets.load(preset)
+    for sample_rate in sample_rates:
+        for frames in frames_list:
+            period = frames / sample_rate
+            board = presets.warm(presets.build(description, sample_rate, config.parallel_mix), sample_rate, frames)
+            blocks = max(200, int(seconds / period))
+
+            key = f"engine/{sample_rate}/{frames}"
+            results[key] = summary(time_engine(board, frames, sample_rate, blocks, warmup), period)
+            report(key, results[key])
+
+            if not plugins:
+                continue
+            # Containers too, a Mix can blow the budget when none of its plugins does
+            for entry in effects.Registry(board).entries:
+                key = f"plugin/{entry.id}/{sample_rate}/{frames}"
+                results[key] = summary(time_plugin(entry.plugin, frames, sample_rate, plugin_blocks, warmup), period)
+                report(key, results[key])
+    return results
+
+
+def metadata(preset):
+    return {
+        'preset': preset,
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'python': platform.python_version(),
+        'numpy': numpy.__version__,
+        'pedalboard': pedalboard.__version__,
+    }
+
+
+def compare(baseline, current, metric='p99', threshold=0.1):
+    """Rows (key, baseline, current, change, flag) for the keys both runs have.
+
+    A key regresses when `metric` grew by more than `threshold` of the
+    baseline; anything at or over 1.0 misses the deadline regardless.
+    """
+    rows = []
+    for key, before in baseline['results'].items():
+        after = current['results'].get(key)
+        if after is None:
+            continue
+        change = after[metric] / before[metric] - 1 if before[metric] else 0.0
+        flag = ''
+        if after[metric] >= 1.0:
+            flag = 'OVER BUDGET'
+        elif change > threshold:
+            flag = 'REGRESSION'
+        elif change < -threshold:
+            flag = 'faster'
+        rows.append((key, before[metric], after[metric], change, flag))
+    return rows
+
+
+def print_result(key, result):
+    flag = '  ⚠ over budget' if result['p99'] >= 1.0 else ''
+    print(f"{key:<56} {result['p50']:>7.1%} {result['p99']:>7.1%} {result['max']:>8.1%}{flag}")
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="🎛 ResoBox benchmark suite, no audio hardware needed")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help="Time the engine and every plugin")
+    run_parser.add_argument('--preset', default='default')
+    run_parser.add_argument('--frames', type=int, nargs='+', default=FRAMES)
+    run_parser.add_argument('--sample-rates', type=int, nargs='+', default=SAMPLE_RATES)
+    run_parser.add_argument('--seconds', type=float, default=1.0, help="Audio processed per engine measurement")
+    run_parser.add_argument('--plugin-blocks', type=int, default=500)
+    run_parser.add_argument('--no-plugins', action='store_true', help="Only time the whole engine")
+    run_parser.add_argument('--save', help="Write the results as a JSON baseline")
+    run_parser.add_argument('--baseline', help="Compare against this baseline when done")
+    run_parser.add_argument('--threshold', type=float, default=0.1)
+
+    compare_parser = commands.add_parser('compare', help="Flag regressions between two saved runs")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--metric', choices=['p50', 'p99', 'max'], default='p99')
+    compare_parser.add_argument('--threshold', type=float, default=0.1, help="Allowed growth, 0.1 is 10%%")
+
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        print(f"{'block time as share of the period':<56} {'p50':>7} {'p99':>7} {'max':>8}")
+        current = {'meta': metadata(args.preset), 'results': run(args.preset, args.frames, args.sample_rates, args.seconds, args.plugin_blocks, plugins=not args.no_plugins, report=print_result)}
+        if args.save:
+            with open(args.save, 'w') as f:
+                json.dump(current, f, indent=2)
+            print(f"\n💾 Saved to {args.save}")
+        if not args.baseline:
+            sys.exit(0)
+        baseline = load(args.baseline)
+        metric = 'p99'
+    else:
+        baseline = load(args.baseline)
+        current = load(args.current)
+        metric = args.metric
+
+    rows = compare(baseline, current, metric, args.threshold)
+    print(f"\n{'key':<56} {'before':>8} {'after':>8} {'change':>8}   ({metric})")
+    for key, before, after, change, flag in rows:
+        print(f"{key:<56} {before:>8.1%} {after:>8.1%} {change:>+8.1%}  {flag}")
+    failed = [row for row in rows if row[4] in ('REGRESSION', 'OVER BUDGET')]
+    print(f"\n{'🛑' if failed else '✅'} {len(failed)} of {len(rows)} measurements regressed or missed the deadline")
+    sys.exit(1 if failed else 0)
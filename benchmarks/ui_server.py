@@ -0,0 +1,115 @@
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+import aiohttp
+
+from aiohttp import web
+
+from ui import server
+from ui.assets import AssetTable
+
+# A build directory shaped like the React production build
+FILES = {
+    'index.html': b'<!doctype html><html><head><title>ResoBox</title></head><body><div id="root"></div></body></html>' * 8,
+    'static/js/main.3f2a9c1b.js': b'function resobox(){return "pedal"}\n' * 6000,
+    'static/css/main.8d1e4f20.css': b'.knob{border-radius:50%;background:#222}\n' * 1500,
+    'static/media/logo.5c9a7e31.png': os.urandom(40000),
+}
+
+
+async def legacy_static(request):
+    """The handler as it was before the in-memory table, kept as the baseline."""
+    file_path = request.match_info['filename']
+    full_path = os.path.join(request.app['root'], file_path)
+
+    content_type = 'application/octet-stream'
+    if full_path.endswith('.css'):
+        content_type = 'text/css'
+    elif full_path.endswith('.js'):
+        content_type = 'application/javascript'
+    elif full_path.endswith('.html'):
+        content_type = 'text/html'
+    elif full_path.endswith('.png'):
+        content_type = 'image/png'
+
+    if os.path.exists(full_path) and os.path.isfile(full_path):
+        with open(full_path, 'rb') as f:
+            return web.Response(body=f.read(), content_type=content_type)
+    return web.Response(status=404)
+
+
+async def serve(app, port):
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', port).start()
+    return runner
+
+
+async def hammer(url_paths, port, duration, concurrency, headers=None):
+    done = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(session, offset):
+        nonlocal done
+        index = offset
+        while time.perf_counter() < deadline:
+            path = url_paths[index % len(url_paths)]
+            async with session.get(f'http://127.0.0.1:{port}/{path}', headers=headers) as response:
+                await response.read()
+            done += 1
+            index += 1
+
+    async with aiohttp.ClientSession(auto_decompress=False) as session:
+        await asyncio.gather(*(worker(session, offset) for offset in range(concurrency)))
+    return done / duration
+
+
+async def run(duration, concurrency, port=28111):
+    with tempfile.TemporaryDirectory() as root:
+        for path, body in FILES.items():
+            full_path = os.path.join(root, path)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            with open(full_path, 'wb') as f:
+                f.write(body)
+
+        legacy = web.Application()
+        legacy['root'] = root
+        legacy.router.add_get('/{filename:.*}', legacy_static)
+
+        cached = web.Application()
+        cached['assets'] = AssetTable.load(root)
+        cached.router.add_get('/{filename:.*}', server.handle_static)
+
+        paths = list(FILES)
+        results = {}
+        for name, app, headers in (
+            ('disk (before)', legacy, None),
+            ('memory', cached, None),
+            ('memory + gzip', cached, {'Accept-Encoding': 'gzip'}),
+        ):
+            runner = await serve(app, port)
+            try:
+                results[name] = await hammer(paths, port, duration, concurrency, headers)
+            finally:
+                await runner.cleanup()
+
+        # Revalidation of an unchanged asset, the common case on relaunch
+        runner = await serve(cached, port)
+        try:
+            etag = cached['assets'].lookup(paths[1]).etag
+            results['memory, 304'] = await hammer(paths[1:2], port, duration, concurrency, {'If-None-Match': etag})
+        finally:
+            await runner.cleanup()
+        return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="🎛 ResoBox UI static server benchmark")
+    parser.add_argument('--duration', type=float, default=3.0, help="Seconds per scenario")
+    parser.add_argument('--concurrency', type=int, default=16, help="Parallel client connections")
+    args = parser.parse_args()
+
+    for name, rps in asyncio.run(run(args.duration, args.concurrency)).items():
+        print(f"{name:>16}: {rps:8.0f} requests/s")
@@ -1,55 +1,85 @@
-import json
-
 import config
+import effects
+import presets
 
-from pedalboard import Pedalboard, Gain, Convolution, Chorus, Reverb, Delay, Compressor, Distortion, LowpassFilter, Limiter, Chain, HighpassFilter, Mix, NoiseGate
-from utils import create_effect, serialize
-
-from plugins.pan import Pan
+from meter import Meter
+from control import Controller
+from profiling import Profiler
+from shedding import LoadShedder, LoadInjector
+from recorder import Recorder
+from looper import Looper
+from analyzer import Analyzer
 
 # Global variables
 effects_status = []
+effects_version = 0  # Bumped whenever an effect state changes
+effect_registry = None  # effects.Registry of the active board, built on first use
 input_rms = 0
 output_rms = 0
 
 window_size = 50  # Window size for RMS moving average
+sample_rate = 44100  # Updated by the audio engine once JACK is running
+block_size = 128
+
+# The active board, replaced by presets.PresetBank.switch with a single assignment
+preset = 'default'
+preset_crossfade = True
+parallel_mix = False  # Run the branches of every Mix on worker threads
+board = presets.build(presets.load(preset), sample_rate, parallel_mix)
+live_boards = ()  # The boards the audio thread ran at its last swap, the new one and the fading one
+preset_bank = presets.PresetBank()
+preset_bank.remember(preset, board)
+
+controller = Controller()
+profiler = Profiler()  # Switched on at runtime through the HTTP API
+shedder = LoadShedder()  # Degrades the board under sustained load once enabled
+load_injector = LoadInjector()  # Synthetic callback load, for testing the shedder
+
+input_meter = Meter(channels=2, window_size=window_size)
+output_meter = Meter(channels=2, window_size=window_size)
+
+# Output recording, streamed to disk by a writer thread
+recordings_path = 'recordings'
+recorder = Recorder(channels=2, directory=recordings_path)
+
+# Loop layers are allocated once, for this many seconds at the configured rate
+looper_seconds = 30
+looper = Looper(channels=2, max_seconds=looper_seconds, sample_rate=sample_rate)
+
+# Spectrum and waveform for the UI, worked out off the audio thread
+analyzer_rate = 20  # Frames per second while a client subscribes to 'audio'
+analyzer = Analyzer(channels=2, rate=analyzer_rate)
+
+# Extra port groups next to the main one, each with its own board, e.g.
+# {'name': 'bass', 'preset': 'default', 'channels': 1, 'capture': [2], 'playback': [0]}
+instances = []
+
+# Where the audio comes from: 'jack', 'sounddevice' (PortAudio) or 'null',
+# which reads and writes sound files without any audio hardware
+backend = 'jack'
+sounddevice_device = None  # PortAudio device name or index, None for the default
+null_input = None  # Sound file the null backend plays into the box, silence if None
+null_output = None  # Sound file the null backend records the box output to
+null_realtime = True  # Pace the null backend to the wall clock, or run as fast as possible
+null_loop = True  # Start the input over when it ends
+
+# 'live' runs the board once per JACK period, 'efficient' on internal blocks of at
+# least efficient_block_size frames through a FIFO, for less per-call overhead on
+# heavy chains at the cost of the internal block less one period of latency
+latency_mode = 'live'
+efficient_block_size = 512
+processing_block = block_size  # Frames per board call, set by the audio engine
 
-# fxchain = [
-#    create_effect(Distortion),
-#    create_effect(Convolution, 'assets/impulses/masonic.wav', 0.5),
-#    create_effect(Delay, delay_seconds=0.5, feedback=0.5, mix=0),
-#    create_effect(Reverb, room_size=1, wet_level=0.1)
-#]
-fxchain_ids = []
-board = Pedalboard([
-    NoiseGate(),
-    Mix(
-        [
-            Chain([
-                HighpassFilter(cutoff_frequency_hz=1000), # Обрезает частоты ниже 1000 Гц
-                LowpassFilter(cutoff_frequency_hz=5000), # Обрезает частоты выше 5000 Гц
-                Distortion(80),
-                Gain(-20)
-            ])
-        ]
-    ),
-    Convolution('assets/impulses/cab.wav', 1),
-    Mix([
-        Chain([
-            Delay(0.5, 0.1, 1),
-            LowpassFilter(cutoff_frequency_hz=500),
-            Reverb(1, 1, 0.1),
-        ]),
-        Chain()
-    ]),
-    Limiter(),
-])
-
-input_rms_values = []
-output_rms_values = []
+# 'direct' runs the board in the JACK callback, 'pipelined' in a separate DSP process
+engine = 'direct'
+pipeline_periods = 2  # Periods the DSP process may run behind, added to the latency
+pipeline = None  # The running pipeline.Pipeline in pipelined mode
 
 # Global constants
+telemetry_name = 'resobox_telemetry'
+pipeline_name = 'resobox_pipeline'
 websocket_sleep_time = 0.02
+websocket_keyframe_interval = 50  # Ticks between full frames for delta subscribers
 screen_fps = 40
 screen_width = 128
 screen_height = 32
@@ -57,9 +87,8 @@ screen_height = 32
 
 # Main Flow and Entry Point
 def update_effects_status():
-    global board, fxchain_ids, effects_status
+    global effects_version
 
-    config.effects_status = []
-    #for index, effect in enumerate(board):
-    #    #id = fxchain_ids[index]
-    #    #effects_status.append({'id': id, 'type': type(effect).__name__, 'state': json.loads(serialize(effect))} )
+    # Only plugins whose parameters changed are serialized again
+    effects.refresh(config)
+    effects_version += 1
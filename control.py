@@ -0,0 +1,180 @@
+import threading
+import numpy
+
+import effects
+
+
+class CommandQueue:
+    """Lock-free single-producer/single-consumer ring of parameter commands.
+
+    Slots live in preallocated arrays. The producer only moves `tail`, the
+    consumer only moves `head`, and a slot is published by moving `tail`
+    after it has been written.
+    """
+
+    def __init__(self, capacity=1024):
+        self.capacity = capacity
+        self.parameters = numpy.zeros(capacity, dtype=numpy.int64)
+        self.values = numpy.zeros(capacity, dtype=numpy.float64)
+        self.head = 0
+        self.tail = 0
+
+    def __len__(self):
+        return self.tail - self.head
+
+    def push(self, parameter, value):
+        tail = self.tail
+        if tail - self.head >= self.capacity:
+            return False
+
+        slot = tail % self.capacity
+        self.parameters[slot] = parameter
+        self.values[slot] = value
+        self.tail = tail + 1
+        return True
+
+
+class Controller:
+    """Parameter changes from the control plane, applied by the audio thread.
+
+    HTTP, WebSocket (and later MIDI) handlers call `set`, which only registers
+    the parameter and pushes a command, so it never waits for the audio
+    thread. The process callback calls `apply` once per block: it drains the
+    queue and moves every parameter towards its target with a linear ramp, so
+    values change at block boundaries and without zipper noise.
+
+    Slots of a board that was swapped out are freed with `prune` and reused.
+    Commands carry the generation of their slot, so one still queued for a
+    freed slot is dropped instead of landing on the slot's next parameter.
+    """
+
+    def __init__(self, capacity=256, queue_size=1024, ramp_time=0.02):
+        self.capacity = capacity
+        self.ramp_time = ramp_time
+        self.queue = CommandQueue(queue_size)
+
+        self.targets = [None] * capacity  # (plugin, attribute) per parameter index
+        self.indexes = {}
+        self.free = []
+        self.count = 0
+        self.generations = numpy.zeros(capacity, dtype=numpy.int64)
+        self.current = numpy.zeros(capacity, dtype=numpy.float64)
+        self.target = numpy.zeros(capacity, dtype=numpy.float64)
+        self.step = numpy.zeros(capacity, dtype=numpy.float64)
+        self.smooth = numpy.ones(capacity, dtype=bool)
+        self.settled = 0  # Bumped whenever a ramp reaches its target
+
+        self._delta = numpy.zeros(capacity, dtype=numpy.float64)
+        self._floor = numpy.zeros(capacity, dtype=numpy.float64)
+        self._moving = numpy.zeros(capacity, dtype=bool)
+        self._ramp_blocks = 1.0
+
+        # Called with ('set', plugin, attribute, value, smooth) and
+        # ('preset', name, crossfade) when the board runs in another process
+        self.forward = None
+
+        # Serialises producers and registration, never taken by the audio thread
+        self._lock = threading.Lock()
+
+    # Control plane side
+
+    def parameter(self, plugin, attribute, smooth=True):
+        key = (id(plugin), attribute)
+        with self._lock:
+            index = self.indexes.get(key)
+            if index is not None:
+                return index
+            if not self.free and self.count >= self.capacity:
+                raise OverflowError("Too many controlled parameters")
+
+            index = self.free.pop() if self.free else self.count
+            # A free slot has current == target, so it does not move while
+            # it is filled in, whatever the audio thread sees of it
+            value = float(getattr(plugin, attribute))
+            self.current[index] = value
+            self.target[index] = value
+            self.smooth[index] = smooth
+            self.targets[index] = (plugin, attribute)
+            self.indexes[key] = index
+            # Publish the slot last, the audio thread only reads below count
+            if index == self.count:
+                self.count = index + 1
+            return index
+
+    def prune(self, board):
+        """Frees the parameters of plugins that are not on `board`; returns how many.
+
+        Called once a board is swapped out, so a long run of preset
+        switches does not fill the table or keep old boards alive.
+        """
+        live = effects.Registry(board).plugins
+        with self._lock:
+            stale = [(key, index) for key, index in self.indexes.items() if key[0] not in live]
+            for key, index in stale:
+                del self.indexes[key]
+                self.generations[index] += 1
+                self.targets[index] = None
+                self.target[index] = self.current[index]
+                self.free.append(index)
+            return len(stale)
+
+    def set(self, plugin, attribute, value, smooth=True):
+        """Queues a parameter change; returns False if the queue is full."""
+        value = float(value)
+        index = self.parameter(plugin, attribute, smooth)
+        with self._lock:
+            pushed = self.queue.push(int(self.generations[index]) * self.capacity + index, value)
+        # Only a change this process applies is mirrored into the DSP process
+        if pushed and self.forward is not None:
+            self.forward('set', plugin, attribute, value, smooth)
+        return pushed
+
+    # Audio thread side
+
+    def prepare(self, frames, sample_rate):
+        # Ramp length in blocks for the current period
+        self._ramp_blocks = max(1.0, self.ramp_time * sample_rate / frames)
+
+    def apply(self):
+        queue = self.queue
+        count = self.count
+        current = self.current
+        target = self.target
+
+        while queue.head != queue.tail:
+            slot = queue.head % queue.capacity
+            generation, index = divmod(int(queue.parameters[slot]), self.capacity)
+            if generation == self.generations[index]:
+                target[index] = queue.values[slot]
+                if self.smooth[index]:
+                    self.step[index] = abs(target[index] - current[index]) / self._ramp_blocks
+                else:
+                    self.step[index] = numpy.inf
+            queue.head += 1
+
+        if count == 0:
+            return
+
+        delta = self._delta[:count]
+        moving = self._moving[:count]
+        numpy.subtract(target[:count], current[:count], out=delta)
+        numpy.not_equal(delta, 0, out=moving)
+        if not moving.any():
+            return
+
+        # One vectorized ramp step for every parameter
+        step = self.step[:count]
+        floor = self._floor[:count]
+        numpy.negative(step, out=floor)
+        numpy.minimum(delta, step, out=delta)
+        numpy.maximum(delta, floor, out=delta)
+        numpy.add(current[:count], delta, out=current[:count])
+
+        targets = self.targets
+        for index in range(count):
+            # A slot pruned in the middle of a ramp has no plugin any more
+            if moving[index] and targets[index] is not None:
+                plugin, attribute = targets[index]
+                setattr(plugin, attribute, current[index])
+                if current[index] == target[index]:
+                    self.settled += 1
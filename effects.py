@@ -0,0 +1,148 @@
+import inspect
+import threading
+import pedalboard
+
+from plugins import base
+
+CONTAINERS = (pedalboard.Chain, pedalboard.Mix, pedalboard.Pedalboard, base.Board)
+
+# Properties every pedalboard plugin has, which are not parameters
+IGNORED = ('is_effect', 'is_instrument')
+
+_schemas = {}
+
+
+def children(plugin):
+    return list(plugin) if isinstance(plugin, CONTAINERS) else None
+
+
+def schema(plugin):
+    """Parameters of the plugin's type, worked out once per type.
+
+    NumPy plugins declare theirs as base.Parameter; for pedalboard plugins
+    every public property holding a number is one.
+    """
+    kind = type(plugin)
+    cached = _schemas.get(kind)
+    if cached is not None:
+        return cached
+
+    parameters = []
+    if isinstance(plugin, base.Plugin):
+        for name in plugin.parameters():
+            parameter = getattr(kind, name)
+            parameters.append({'name': name, 'type': 'float', 'default': parameter.default, 'minimum': parameter.minimum, 'maximum': parameter.maximum})
+    else:
+        for name in dir(kind):
+            if name.startswith('_') or name in IGNORED or not isinstance(inspect.getattr_static(kind, name), property):
+                continue
+            value = getattr(plugin, name)
+            if isinstance(value, bool):
+                parameters.append({'name': name, 'type': 'bool'})
+            elif isinstance(value, (int, float)):
+                parameters.append({'name': name, 'type': 'float'})
+
+    cached = _schemas[kind] = tuple(parameters)
+    return cached
+
+
+class Entry:
+    """One plugin of a board and its last serialized state."""
+
+    def __init__(self, id, path, plugin):
+        self.id = id
+        self.path = path
+        self.plugin = plugin
+        self.schema = schema(plugin)
+        self.names = tuple(parameter['name'] for parameter in self.schema)
+        self.values = None
+        self.state = None
+
+
+class Registry:
+    """Every plugin of one board, at any nesting depth, by id.
+
+    Ids follow the plugin's position, '1:Mix/0:Chain/2:Distortion', the
+    same names the profiler uses, so they stay the same whenever a preset
+    is rebuilt. The registry is built once per board: lookups by id or by
+    plugin are dictionary hits, and refresh() only serializes again the
+    plugins whose parameter values changed since the previous call.
+    """
+
+    def __init__(self, board):
+        self.board = board
+        self.entries = []
+        self.ids = {}
+        self.plugins = {}
+        self.version = 0
+        self.status = []
+        self.lock = threading.Lock()
+        self.walk(board, (), '')
+
+    def walk(self, container, path, prefix):
+        for index, plugin in enumerate(container):
+            entry = Entry(f"{prefix}{index}:{type(plugin).__name__}", path + (index,), plugin)
+            self.entries.append(entry)
+            self.ids[entry.id] = entry
+            self.plugins[id(plugin)] = entry
+            nested = children(plugin)
+            if nested is not None:
+                self.walk(nested, entry.path, f"{entry.id}/")
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, effect_id):
+        """The plugin with this id, or None."""
+        entry = self.ids.get(effect_id)
+        return entry.plugin if entry is not None else None
+
+    def find(self, plugin):
+        """The entry of a plugin object of this board, or None."""
+        return self.plugins.get(id(plugin))
+
+    def refresh(self):
+        """Reads every parameter and rebuilds the states that changed; returns True if any did."""
+        with self.lock:
+            changed = False
+            for entry in self.entries:
+                plugin = entry.plugin
+                values = tuple(getattr(plugin, name) for name in entry.names)
+                if values == entry.values:
+                    continue
+                entry.values = values
+                entry.state = {
+                    'id': entry.id,
+                    'path': list(entry.path),
+                    'type': type(plugin).__name__,
+                    'state': dict(zip(entry.names, values)),
+                }
+                changed = True
+
+            if changed:
+                # A new list, so consumers can tell snapshots apart by identity
+                self.version += 1
+                self.status = [entry.state for entry in self.entries]
+            return changed
+
+    def describe(self):
+        """Ids, paths and parameter schemas of the whole board."""
+        return [{'id': entry.id, 'path': list(entry.path), 'type': type(entry.plugin).__name__, 'parameters': list(entry.schema)} for entry in self.entries]
+
+
+def current(group):
+    """The registry of a group's active board, rebuilt after a board swap.
+
+    `group` is the config module or an instances.Instance.
+    """
+    registry = group.effect_registry
+    if registry is None or registry.board is not group.board:
+        registry = group.effect_registry = Registry(group.board)
+    return registry
+
+
+def refresh(group):
+    registry = current(group)
+    registry.refresh()
+    group.effects_status = registry.status
+    return registry
@@ -1,89 +1,189 @@
 import asyncio
 import json
 import time
+import struct
+import numpy
 import websockets
+import math
 import config
+import telemetry
+import sprites
 import base64
-import Adafruit_SSD1306
-from PIL import Image, ImageDraw, ImageFont
-from concurrent.futures import ThreadPoolExecutor
+import threading
+from PIL import Image
+from urllib.parse import urlparse, parse_qs
 
 disp = None
 
-try:
-    disp = Adafruit_SSD1306.SSD1306_128_32(rst=None, i2c_address=0x3C) # Адрес дисплея - в конкретном случае 0x3C
-    disp.begin()
-    disp.clear()
-    disp.display()
-except:
-    print('🐦 Failed to connect display (shit)')
-
-displayImage = Image.new('1', (config.screen_width, config.screen_height), 0)
-displayDraw = ImageDraw.Draw(displayImage)
+# Packed 1 bit per pixel framebuffer, rows of MSB-first bytes (512 bytes for 128x32)
+ROW_BYTES = config.screen_width // 8
+FRAME_FULL = 0
+FRAME_RECT = 1
+RECT_HEADER = struct.Struct('<BBBBB')  # kind, x in bytes, y, width in bytes, height
 
 
 # Параметры
 text = "ResoBox"
-font_path = "assets/fonts/noto.ttf"
+font_name = "code"
 font_size = 16
 x, y = 0, 4  # Начальные координаты
 
-# Инициализация шрифта и создание изображения один раз
-font = ImageFont.truetype(font_path, font_size)
-image = Image.new('1', (config.screen_width, config.screen_height), 0)
-draw = ImageDraw.Draw(image)
+# Filled by init() in the graphics process, importing this module touches no hardware
+atlas = None
+compositor = None
+sprite = None
+logo_loop = None
+level_bars = None
 
+# Последний кадр и его номер, номер растёт только когда кадр изменился
+framebuffer = numpy.zeros((config.screen_height, ROW_BYTES), dtype=numpy.uint8)
+frame_version = 0
 
-spriteSource = Image.open('assets/sprites/logo.png')
-sprite = Image.new('1', (spriteSource.width, spriteSource.height), 0);
-spriteDraw = ImageDraw.Draw(sprite)
+imageOffset = 0
 
-# Глобальная переменная для хранения матрицы пикселей
-global_matrix = []
+def render_logo(canvas, index):
+    # Logo scrolls in from the left, leaves on the right and starts over
+    canvas.sprite('logo', index - sprite.shape[1], 0)
 
-for x in range(spriteSource.width):
-    for y in range(spriteSource.height):
-        pixel = spriteSource.getpixel((x, y))
-        
-        # Check if the pixel is black
-        # This checks for pure black, but you can adjust the threshold as needed
-        if pixel[3] == 255:
-            spriteDraw.point((x, y), fill=1)
+def init():
+    """Connects the display and prepares the sprites; runs once, in the graphics process."""
+    global disp, atlas, compositor, sprite, logo_loop, level_bars, imageOffset
+    if atlas is not None:
+        return
 
-imageOffset = 0
+    try:
+        import Adafruit_SSD1306
+        disp = Adafruit_SSD1306.SSD1306_128_32(rst=None, i2c_address=0x3C) # Адрес дисплея - в конкретном случае 0x3C
+        disp.begin()
+        disp.clear()
+        disp.display()
+    except:
+        disp = None
+        print('🐦 Failed to connect display (shit)')
+
+    # Спрайты и глифы конвертируются один раз и кешируются на диске
+    atlas = sprites.Atlas.load(font_size=font_size)
+    compositor = sprites.Compositor(atlas, config.screen_width, config.screen_height)
+    sprite = atlas.sprites['logo']
+
+    # Прокрутка логотипа детерминирована, так что все её кадры считаются заранее
+    logo_loop = sprites.FrameLoop(compositor, config.screen_width + sprite.shape[1] + 1, render_logo)
+    level_bars = sprites.level_rows(config.screen_width)
+    imageOffset = sprite.shape[1]  # Start with the logo in place
+
+def level_width(rms, floor_db=-60):
+    # Maps an RMS level onto the display width on a dBFS scale
+    if rms <= 0:
+        return 0
+    db = 20 * math.log10(rms)
+    return int(max(0, min(1, 1 - db / floor_db)) * config.screen_width)
+
+def attach_telemetry():
+    try:
+        return telemetry.segment()
+    except (FileNotFoundError, ValueError):
+        print('🐦 Telemetry segment not found, level meter disabled')
+        return None
+
+def ssd1306_pages(frame):
+    """Row-packed frame to the SSD1306 layout: pages of 8 rows, one byte per column, LSB on top."""
+    pixels = numpy.unpackbits(frame, axis=1)
+    pages = pixels.reshape(frame.shape[0] // 8, 8, -1)
+    return numpy.packbits(pages, axis=1, bitorder='little').reshape(-1)
+
+def show(frame):
+    """Sends a row-packed frame to the display.
+
+    The only place that touches the driver's page buffer: its public image()
+    walks every pixel, so the buffer is filled directly while it has the
+    layout image() itself writes, and image() is the fallback otherwise.
+    """
+    pages = ssd1306_pages(frame)
+    buffer = getattr(disp, '_buffer', None)
+    if isinstance(buffer, list) and len(buffer) == pages.size:
+        disp._buffer = pages.tolist()
+    else:
+        disp.image(Image.frombytes('1', (config.screen_width, config.screen_height), frame.tobytes()))
+    disp.display()
 
 def update_matrix():
-    global x, y, global_matrix, imageOffset
+    global x, y, framebuffer, frame_version, imageOffset
+    segment = attach_telemetry()
     while True:
         if disp != None:
             fps = config.screen_fps
         else:
             fps = config.screen_fps / 2
             
-        draw.rectangle((0, 0, image.width, image.height), fill=0)  # Очистка изображения
-        
-        draw.bitmap((imageOffset,0), sprite, 1)
-
-        if imageOffset > image.width:
-            imageOffset = -sprite.width
-
-
-        pixels = image.load()
-        global_matrix = [(x, y) for y in range(image.height) for x in range(image.width) if pixels[x, y] == 1]
+        frame = logo_loop.frame(imageOffset)
+        imageOffset = (imageOffset + 1) % logo_loop.period
+
+        if segment is not None:
+            # Output level on the bottom row, read without touching the audio thread
+            width = level_width(segment.snapshot()['output_rms'])
+            if width > 0:
+                frame = frame.copy()
+                frame[-1] |= level_bars[width]
+
+        changed = not numpy.array_equal(frame, framebuffer)
+        if changed:
+            # A new array each time, so readers never see a half-written frame
+            framebuffer = frame.copy()
+            frame_version += 1
 
         time.sleep(1 / fps)
 
-        if disp != None:
-            displayDraw.rectangle((0, 0, image.width, image.height), fill=0)
-            displayDraw.point(global_matrix, fill=255)
-            disp.image(displayImage)
-            disp.display()
-
-async def websocket_handler(websocket, path):
+        if disp != None and changed:
+            show(framebuffer)
+
+def encode_frame(frame, previous):
+    """Smallest binary frame turning `previous` into `frame`, or None if nothing changed."""
+    if previous is None:
+        return bytes((FRAME_FULL,)) + frame.tobytes()
+
+    dirty = numpy.bitwise_xor(frame, previous)
+    rows = numpy.flatnonzero(dirty.any(axis=1))
+    if len(rows) == 0:
+        return None
+    columns = numpy.flatnonzero(dirty.any(axis=0))
+
+    top, bottom = rows[0], rows[-1] + 1
+    left, right = columns[0], columns[-1] + 1
+    rect = frame[top:bottom, left:right]
+    if rect.size + RECT_HEADER.size >= frame.size:
+        return bytes((FRAME_FULL,)) + frame.tobytes()
+    return RECT_HEADER.pack(FRAME_RECT, left, top, right - left, bottom - top) + rect.tobytes()
+
+def frame_points(frame):
+    # The old JSON format: a list of [x, y] for every lit pixel
+    ys, xs = numpy.nonzero(numpy.unpackbits(frame, axis=1))
+    return json.dumps(numpy.stack([xs, ys], axis=1).tolist())
+
+def wants_binary(websocket, path):
+    if path is None:
+        request = getattr(websocket, 'request', None)
+        path = getattr(request, 'path', None) or getattr(websocket, 'path', '/')
+    # JSON stays the default, clients that predate the binary frames send no query
+    return parse_qs(urlparse(path).query).get('format', ['json'])[-1] == 'binary'
+
+async def websocket_handler(websocket, path=None):
+    as_binary = wants_binary(websocket, path)
+    sent = None
+    sent_version = -1
     try:
         while True:
-            # Отправка текущего состояния матрицы
-            await websocket.send(json.dumps(global_matrix))
+            # Отправка кадра, только если он изменился с прошлой отправки
+            version = frame_version
+            if version != sent_version:
+                frame = framebuffer
+                sent_version = version
+                if as_binary:
+                    message = encode_frame(frame, sent)
+                    if message is not None:
+                        await websocket.send(message)
+                else:
+                    await websocket.send(frame_points(frame))
+                sent = frame
             await asyncio.sleep(1/24)  # Ожидание для синхронизации с частотой обновления матрицы
     except websockets.exceptions.ConnectionClosedOK:
         print("🛑 WebSocket connection closed normally.")
@@ -91,18 +191,23 @@ async def websocket_handler(websocket, path):
         print(f"🛑 WebSocket error: {e}")
 
 def start_update_matrix_thread():
-    executor = ThreadPoolExecutor(max_workers=1)
-    executor.submit(update_matrix)
+    # A daemon, so the process exits as soon as the server stops
+    threading.Thread(target=update_matrix, name='matrix', daemon=True).start()
 
 async def graphics_server():
     print("\n📺 Graphics server started\n")
     start_update_matrix_thread()  # Запуск потока для обновления матрицы
 
+    # Only the preview needs the WebSocket, the process lives on either way
+    # because the matrix thread is a daemon
     if disp == None:
         async with websockets.serve(websocket_handler, '0.0.0.0', 8767):
             await asyncio.Future()  # Бесконечный цикл
+    else:
+        await asyncio.Future()
 
 def start_graphics_server():
+    init()
     try:
         asyncio.run(graphics_server())
     except KeyboardInterrupt:
@@ -0,0 +1,157 @@
+import os
+import glob
+import json
+import hashlib
+import argparse
+import tempfile
+import numpy
+
+from pedalboard.io import AudioFile
+
+IMPULSES_PATH = 'assets/impulses'
+CACHE_PATH = os.environ.get('RESOBOX_IR_CACHE', os.path.join(IMPULSES_PATH, '.cache'))
+FORMAT_VERSION = 1
+FADE_SAMPLES = 64  # Short fade after trimming, so the cut tail cannot click
+
+_digests = {}
+
+
+def file_digest(path):
+    # Content hash, memoized per (size, mtime) so unchanged files are hashed once per process
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    digest = _digests.get(key)
+    if digest is None:
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                sha.update(chunk)
+        digest = _digests[key] = sha.hexdigest()
+    return digest
+
+
+def cache_key(path, sample_rate, channels, normalize, trim_db):
+    settings = json.dumps({
+        'version': FORMAT_VERSION,
+        'content': file_digest(path),
+        'sample_rate': sample_rate,
+        'channels': channels,
+        'normalize': normalize,
+        'trim_db': trim_db,
+    }, sort_keys=True)
+    return hashlib.sha256(settings.encode()).hexdigest()[:24]
+
+
+def native_rate(path):
+    with AudioFile(path) as f:
+        return f.samplerate
+
+
+def decode(path, sample_rate):
+    """Decodes an IR as float32 (channels, frames) at the given sample rate."""
+    with AudioFile(path) as f:
+        if f.samplerate != sample_rate:
+            f = f.resampled_to(sample_rate)
+        return f.read(f.frames)
+
+
+def remix(audio, channels):
+    if channels is None or audio.shape[0] == channels:
+        return audio
+    if channels == 1:
+        return audio.mean(axis=0, keepdims=True)
+    if audio.shape[0] == 1:
+        return numpy.repeat(audio, channels, axis=0)
+    raise ValueError(f"Cannot turn {audio.shape[0]} IR channels into {channels}")
+
+
+def trim(audio, threshold_db):
+    """Cuts the trailing part of the IR that stays below threshold_db relative to its peak."""
+    peak = numpy.abs(audio).max()
+    if peak == 0:
+        return audio[:, :1]
+
+    threshold = peak * 10 ** (threshold_db / 20)
+    loud = numpy.flatnonzero(numpy.abs(audio).max(axis=0) > threshold)
+    end = min(audio.shape[1], loud[-1] + 1 + FADE_SAMPLES)
+    audio = audio[:, :end].copy()
+
+    fade = min(FADE_SAMPLES, end)
+    audio[:, end - fade:] *= numpy.linspace(1, 0, fade, dtype=numpy.float32)
+    return audio
+
+
+def normalized(audio, mode):
+    if mode is None:
+        return audio
+    if mode == 'peak':
+        scale = numpy.abs(audio).max()
+    elif mode == 'energy':
+        scale = numpy.sqrt(numpy.square(audio, dtype=numpy.float64).sum() / audio.shape[0])
+    else:
+        raise ValueError(f"Unknown IR normalization: {mode}")
+    return audio / scale if scale > 0 else audio
+
+
+def prepare(path, sample_rate, channels=None, normalize=None, trim_db=-80.0):
+    audio = remix(decode(path, sample_rate), channels)
+    if trim_db is not None:
+        audio = trim(audio, trim_db)
+    return numpy.ascontiguousarray(normalized(audio, normalize), dtype=numpy.float32)
+
+
+def load(path, sample_rate=None, channels=None, normalize=None, trim_db=-80.0, cache_path=None):
+    """Returns a preprocessed IR as a read-only memory map plus its sample rate.
+
+    The first load decodes, resamples, trims and normalizes the file and stores
+    the float32 result under the cache directory. Every later load, in any
+    process, maps that file directly, so it costs no decoding and the pages
+    are shared through the page cache.
+    """
+    cache_path = cache_path or CACHE_PATH
+    sample_rate = sample_rate or native_rate(path)
+    name = os.path.splitext(os.path.basename(path))[0]
+    key = cache_key(path, sample_rate, channels, normalize, trim_db)
+    cached = os.path.join(cache_path, f"{name}-{key}.npy")
+
+    if not os.path.exists(cached):
+        audio = prepare(path, sample_rate, channels, normalize, trim_db)
+        os.makedirs(cache_path, exist_ok=True)
+        # Written aside under a unique name and renamed, so concurrent loaders
+        # (processes, or preset bank threads) never see or clobber half a file
+        with tempfile.NamedTemporaryFile(dir=cache_path, prefix=f"{name}-{key}.", suffix='.tmp', delete=False) as f:
+            partial = f.name
+            try:
+                numpy.save(f, audio)
+            except BaseException:
+                f.close()
+                os.remove(partial)
+                raise
+        os.replace(partial, cached)
+
+    return numpy.load(cached, mmap_mode='r'), sample_rate
+
+
+def prewarm(sample_rates, channels=None, normalize=None, trim_db=-80.0, directory=IMPULSES_PATH):
+    paths = sorted(glob.glob(os.path.join(directory, '*.wav')))
+    for path in paths:
+        for sample_rate in sample_rates:
+            audio, rate = load(path, sample_rate, channels, normalize, trim_db)
+            print(f"🧊 {os.path.basename(path)} @ {rate:g} Hz: {audio.shape[1]} frames, {audio.shape[0]} channel(s)")
+    return len(paths)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="🎛 ResoBox impulse response cache")
+    parser.add_argument('--prewarm', action='store_true', help="Preprocess every IR in assets/impulses")
+    parser.add_argument('--sample-rate', type=int, nargs='+', default=[44100, 48000], help="Target sample rates")
+    parser.add_argument('--channels', type=int, default=None, help="Force the IR channel count")
+    parser.add_argument('--normalize', choices=['peak', 'energy'], default=None, help="IR normalization")
+    parser.add_argument('--trim-db', type=float, default=-80.0, help="Trim the tail below this level relative to the peak")
+    args = parser.parse_args()
+
+    if args.prewarm:
+        count = prewarm(args.sample_rate, args.channels, args.normalize, args.trim_db)
+        print(f"\n✅ {count} impulse responses cached in {CACHE_PATH}")
+    else:
+        parser.print_help()
@@ -0,0 +1,86 @@
+import config
+import effects
+import presets
+import telemetry
+
+from meter import Meter
+from control import Controller
+
+
+class Instance:
+    """One extra port group of the box, with its own board and state.
+
+    The attributes mirror the config module's (board, controller, meters,
+    levels, preset), so audio.Processor runs an Instance exactly like it
+    runs the main group from config.
+    """
+
+    def __init__(self, name, preset='default', channels=2, capture=None, playback=None):
+        self.name = name
+        self.channels = channels
+        self.capture = capture if capture is not None else list(range(channels))
+        self.playback = playback if playback is not None else list(range(channels))
+
+        self.preset = preset
+        self.preset_crossfade = True
+        self.live_boards = ()
+        self.board = presets.warm(presets.build(presets.load(preset), config.sample_rate, config.parallel_mix), config.sample_rate, config.processing_block, channels)
+        self.controller = Controller()
+        self.input_meter = Meter(channels=channels, window_size=config.window_size)
+        self.output_meter = Meter(channels=channels, window_size=config.window_size)
+        self.input_rms = 0
+        self.output_rms = 0
+        self.effects_version = 0
+        self.effects_status = []
+        self.effect_registry = None
+        self.segment = None
+
+    @property
+    def telemetry_name(self):
+        return f"{config.telemetry_name}_{self.name}"
+
+    def open_telemetry(self):
+        # Every group has its own segment, only the main group uses the shared one
+        self.segment = telemetry.Telemetry(self.telemetry_name, create=True)
+        return self.segment
+
+    def close_telemetry(self):
+        if self.segment is not None:
+            self.segment.unlink()
+            self.segment = None
+
+    def update_effects_status(self):
+        effects.refresh(self)
+        self.effects_version += 1
+
+
+# Extra groups by name, filled by the audio server from config.instances
+registry = {}
+
+
+def build(descriptions=None):
+    """Creates every configured group except 'main', which is config itself."""
+    for description in descriptions if descriptions is not None else config.instances:
+        description = dict(description)
+        name = description.pop('name')
+        if name == 'main' or name in registry:
+            continue
+        registry[name] = Instance(name, **description)
+    return registry
+
+
+def target(name=None):
+    """The object holding the board of a group: config for 'main' or None."""
+    if not name or name == 'main':
+        return config
+    return registry.get(name)
+
+
+def snapshot():
+    """Levels of every extra group, for the realtime stream."""
+    levels = {}
+    for name, instance in list(registry.items()):
+        if instance.segment is not None:
+            values = instance.segment.snapshot()
+            levels[name] = {field: values[field] for field in ('input_rms', 'output_rms', 'input_peak', 'output_peak', 'dsp_load', 'xruns')}
+    return levels
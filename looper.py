@@ -0,0 +1,159 @@
+import threading
+import numpy
+
+from control import CommandQueue
+
+IDLE = 'idle'
+RECORDING = 'recording'
+PLAYING = 'playing'
+OVERDUBBING = 'overdubbing'
+STOPPED = 'stopped'
+
+COMMANDS = ('record', 'play', 'overdub', 'stop', 'undo', 'redo', 'clear')
+
+
+class Looper:
+    """Memory-resident looper with overdub and one level of undo.
+
+    Two preallocated layers, optionally backed by a memory-mapped file:
+    the one being played and the previous take. Starting an overdub copies
+    the loop into the other layer off the audio thread and then plays and
+    overdubs that copy, so undo and redo only swap which layer is current.
+
+    The control plane only posts commands into a small lock-free queue; the
+    process callback applies all of them, in order, at the next block
+    boundary in process(), where every operation is a vectorized copy or
+    add over at most two slices of the loop.
+    """
+
+    def __init__(self, channels=2, max_seconds=60.0, sample_rate=44100, path=None):
+        self.channels = channels
+        frames = int(max_seconds * sample_rate)
+        if path is None:
+            self.layers = numpy.zeros((2, channels, frames), dtype=numpy.float32)
+        else:
+            self.layers = numpy.memmap(path, dtype=numpy.float32, mode='w+', shape=(2, channels, frames))
+        self.output = None
+        self.current = 0
+        self.undo_layer = None  # Layer holding the take before the last overdub
+        self.length = 0
+        self.position = 0
+        self.state = IDLE
+        self.prepared = None  # (layer, length) copied for the next overdub
+        self.commands = CommandQueue(16)
+        # Serialises producers, never taken by the audio thread
+        self._lock = threading.Lock()
+
+    @property
+    def max_frames(self):
+        return self.layers.shape[-1]
+
+    # Control plane side
+
+    def command(self, kind):
+        """Posts one of COMMANDS; returns False if the queue is full."""
+        with self._lock:
+            if kind == 'overdub' and self.state in (PLAYING, STOPPED):
+                # Prepare the other layer here, where a full copy is affordable;
+                # the audio thread does not write the loop while not overdubbing
+                other = 1 - self.current
+                numpy.copyto(self.layers[other, :, :self.length], self.layers[self.current, :, :self.length])
+                self.prepared = (other, self.length)
+            return self.commands.push(COMMANDS.index(kind), 0.0)
+
+    def status(self):
+        return {
+            'state': self.state,
+            'length': self.length,
+            'position': self.position,
+            'can_undo': self.undo_layer is not None,
+        }
+
+    # Audio thread side
+
+    def apply(self, kind):
+        state = self.state
+        if kind == 'record':
+            self.length = 0
+            self.position = 0
+            self.undo_layer = None
+            self.state = RECORDING
+        elif kind == 'play':
+            if state == RECORDING:
+                self.length = self.position
+            if self.length:
+                self.position = 0 if state in (RECORDING, STOPPED) else self.position
+                self.state = PLAYING
+        elif kind == 'overdub' and state in (PLAYING, STOPPED) and self.length:
+            if self.prepared == (1 - self.current, self.length):
+                self.undo_layer = self.current
+                self.current = 1 - self.current
+            else:
+                # Posted in the same block as the command closing the loop,
+                # so no copy was made: overdub in place, without undo
+                self.undo_layer = None
+            self.prepared = None
+            self.state = OVERDUBBING
+        elif kind == 'stop':
+            if state == RECORDING:
+                self.length = self.position
+            self.state = STOPPED if self.length else IDLE
+            self.position = 0
+        elif kind in ('undo', 'redo') and self.undo_layer is not None and state != RECORDING:
+            # Swapping back and forth between the two takes
+            self.current, self.undo_layer = self.undo_layer, self.current
+            if state == OVERDUBBING:
+                self.state = PLAYING
+        elif kind == 'clear':
+            self.length = 0
+            self.position = 0
+            self.undo_layer = None
+            self.state = IDLE
+
+    def process(self, audio):
+        """Adds the loop to `audio` (channels, frames) and records or overdubs it.
+
+        Returns `audio` itself when the looper is silent, otherwise a buffer
+        owned by the looper.
+        """
+        commands = self.commands
+        while commands.head != commands.tail:
+            self.apply(COMMANDS[commands.parameters[commands.head % commands.capacity]])
+            commands.head += 1
+
+        state = self.state
+        if state == IDLE or state == STOPPED:
+            return audio
+
+        frames = audio.shape[-1]
+        loop = self.layers[self.current]
+
+        if state == RECORDING:
+            room = min(frames, self.max_frames - self.position)
+            loop[:, self.position:self.position + room] = audio[:, :room]
+            self.position += room
+            if self.position >= self.max_frames:
+                # Out of room: the take so far becomes the loop
+                self.length = self.position
+                self.position = 0
+                self.state = PLAYING
+            return audio
+
+        if self.output is None or self.output.shape != audio.shape:
+            self.output = numpy.zeros(audio.shape, dtype=numpy.float32)
+        numpy.copyto(self.output, audio)
+
+        # The block may wrap around the loop end, so it is at most two slices
+        done = 0
+        position = self.position
+        length = self.length
+        while done < frames:
+            count = min(frames - done, length - position)
+            segment = loop[:, position:position + count]
+            self.output[:, done:done + count] += segment
+            if state == OVERDUBBING:
+                segment += audio[:, done:done + count]
+            done += count
+            position = (position + count) % length
+        self.position = position
+        return self.output
@@ -1,64 +1,148 @@
 import os
+import time
 import signal
-import threading
+import asyncio
 import argparse
-from multiprocessing import freeze_support, Process, current_process
+from multiprocessing import freeze_support, Process
 
-# Предполагаем, что эти модули у вас есть
-from ui.server import start_ui 
-from realtime import start_websocket_server
-from webhost import start_http_server_in_thread
-from graphics import start_graphics_server
-from audio import start_audio_server
+import supervisor
 
-threads = []
-servers = []
-stop_event = threading.Event()
-
-def controlled_start_thread(target):
-    def wrapper():
-        while not stop_event.is_set():
-            target()
-    t = threading.Thread(target=wrapper)
-    t.start()
-    threads.append(t)
-
-def start_servers(args):
-    global threads, servers
+# Everything heavy (config builds the board and loads impulses, graphics
+# talks to the display) is imported inside start_servers, so disabled
+# servers cost nothing and audio comes up before the rest
 
-    controlled_start_thread(start_audio_server)
-
-    if not args.no_ui:
-        ui_server = Process(target=start_ui)
-        servers.append(ui_server)
+servers = []
 
+class StartupProfile:
+    """Wall time of every startup phase, relative to process start."""
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.phases = []
+
+    def phase(self, name):
+        return _Phase(self, name)
+
+    def mark(self, name):
+        # A point in time rather than a span, like the first sound
+        self.phases.append((name, time.perf_counter() - self.origin, 0.0))
+
+    def report(self):
+        print("\n⏱ Startup profile")
+        print(f"{'phase':<28} {'at ms':>9} {'took ms':>9}")
+        for name, start, duration in self.phases:
+            print(f"{name:<28} {start * 1000:>9.1f} {duration * 1000:>9.1f}")
+
+class _Phase:
+    def __init__(self, profile, name):
+        self.profile = profile
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc):
+        finished = time.perf_counter()
+        self.profile.phases.append((self.name, self.started - self.profile.origin, finished - self.started))
+
+startup = StartupProfile()
+
+def child_signals():
+    # A forked child inherits the handlers of the supervisor's loop, which
+    # only wake the parent's loop, so SIGTERM and Ctrl+C would not stop it
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+def run_ui():
+    child_signals()
+    # Imported in the child, the main process never loads the UI stack
+    from ui.server import start_ui
+    start_ui()
+
+def run_graphics():
+    child_signals()
+    # Stays a process of its own: the I2C writes block and compositing runs
+    # at the display rate, neither of which should hold the GIL next to the
+    # audio callback. The display probe and the sprite atlas only happen here
+    from graphics import start_graphics_server
+    start_graphics_server()
+
+async def start_servers(plane, args, first_sound_timeout=5.0):
+    global servers
+
+    with startup.phase('import config'):
+        import config
+    if args.backend is not None:
+        config.backend = args.backend
+    if args.latency_mode is not None:
+        config.latency_mode = args.latency_mode
+    if args.efficient_block_size is not None:
+        config.efficient_block_size = args.efficient_block_size
+    with startup.phase('import telemetry'):
+        import telemetry
+    with startup.phase('import audio'):
+        import audio
+
+    # Shared with every child process, so it has to exist before they start
+    with startup.phase('telemetry segment'):
+        telemetry.segment(create=True)
+
+    with startup.phase('start audio'):
+        plane.start('audio', audio.audio_server)
+        # Lets audio_server open the client before anything else runs
+        await asyncio.sleep(0)
+
+    # Nothing else competes for the CPU until the first block is out
+    with startup.phase('wait for first sound'):
+        deadline = time.monotonic() + first_sound_timeout
+        while not audio.first_sound.is_set() and time.monotonic() < deadline:
+            await asyncio.sleep(0.005)
+    if audio.first_sound.is_set():
+        startup.mark('first sound')
+    else:
+        print("🔇 No sound yet, starting the rest anyway")
+
+    # Both endpoints share this loop with the audio server
     if not args.no_socket:
-        controlled_start_thread(start_websocket_server)
+        with startup.phase('import realtime'):
+            from realtime import websocket_server
+        plane.start('websocket', websocket_server)
 
     if not args.no_backend:
-        controlled_start_thread(start_http_server_in_thread)
+        with startup.phase('import webhost'):
+            from webhost import http_server
+        plane.start('http', http_server)
+
+    if not args.no_ui:
+        servers.append(Process(target=run_ui))
 
     if not args.no_graphics:
-        graphics_server = Process(target=start_graphics_server)
-        servers.append(graphics_server)
+        servers.append(Process(target=run_graphics))
 
-    for server in servers:
-        server.start()
+    with startup.phase('start processes'):
+        for server in servers:
+            server.start()
+    startup.mark('ready')
 
-def stop_servers():
-    stop_event.set() # Signal threads to stop
-    for thread in threads:
-        thread.join(timeout=0) # Wait a bit for threads to exit
+    if args.profile_startup:
+        startup.report()
+    print("\n🤍 Press Ctrl+C to stop...\n")
 
+def stop_servers(timeout=1.0):
     for server in servers:
         if server.is_alive():
             server.terminate()
-            server.join(timeout=0)
+    deadline = time.monotonic() + timeout
+    for server in servers:
+        server.join(timeout=max(0, deadline - time.monotonic()))
+        if server.is_alive():
+            print(f"🛑 {server.name} ignored SIGTERM, killing it")
+            server.kill()
+            server.join()
 
-def signal_handler(signum, frame):
-    print("\n💀 Closing...")
-    stop_servers()
-    os._exit(0)
+    import telemetry
+    telemetry.release()
 
 if __name__ == '__main__':
     freeze_support()
@@ -68,13 +152,17 @@ if __name__ == '__main__':
     parser.add_argument('--no-socket', action='store_true', help="Disable WebSocket backend startup")
     parser.add_argument('--no-backend', action='store_true', help="Disable HTTP backend startup")
     parser.add_argument('--no-graphics', action='store_true', help="Disable Graphics backend startup")
+    parser.add_argument('--backend', choices=['jack', 'sounddevice', 'null'], help="Audio backend, config.backend by default")
+    parser.add_argument('--latency-mode', choices=['live', 'efficient'], help="Board at the JACK period or on larger internal blocks, config.latency_mode by default")
+    parser.add_argument('--efficient-block-size', type=int, help="Smallest internal block of the efficient mode, in frames")
+    parser.add_argument('--no-uvloop', action='store_true', help="Use the stock asyncio loop even if uvloop is installed")
+    parser.add_argument('--profile-startup', action='store_true', help="Print per-phase import and init times")
     args = parser.parse_args()
 
-    signal.signal(signal.SIGINT, signal_handler)
-    signal.signal(signal.SIGTERM, signal_handler)
-
     os.environ['RESOBOX_MAIN_PID'] = str(os.getpid())
 
-    start_servers(args)
-    input("\n🤍 Press Ctrl+C to stop...\n")
-    stop_servers()
+    # One event loop for audio, WebSocket and HTTP; returns after SIGINT or SIGTERM
+    try:
+        supervisor.run(lambda plane: start_servers(plane, args), use_uvloop=not args.no_uvloop)
+    finally:
+        stop_servers()
@@ -0,0 +1,106 @@
+import numpy
+
+
+class Meter:
+    """Fixed-capacity level meter for the audio thread.
+
+    Keeps the last `window_size` block RMS values per channel in a ring with a
+    running sum, so memory stays flat and the moving average costs the same no
+    matter how long the box runs or how large the window is. The last column of
+    the ring holds the RMS of all channels together.
+    """
+
+    def __init__(self, channels=2, window_size=50, hold_blocks=100, clip_level=1.0):
+        self.channels = channels
+        self.window_size = window_size
+        self.hold_blocks = hold_blocks
+        self.clip_level = clip_level
+
+        self.values = numpy.zeros((window_size, channels + 1), dtype=numpy.float64)
+        self.sums = numpy.zeros(channels + 1, dtype=numpy.float64)
+        self.average = numpy.zeros(channels + 1, dtype=numpy.float64)
+        self.index = 0
+        self.count = 0
+
+        self.peak = numpy.zeros(channels, dtype=numpy.float32)
+        self.peak_hold = numpy.zeros(channels, dtype=numpy.float32)
+        self.hold_left = numpy.zeros(channels, dtype=numpy.int64)
+        self.clips = numpy.zeros(channels, dtype=numpy.int64)
+
+        # Scratch space reused by every update
+        self._power = numpy.zeros(channels, dtype=numpy.float32)
+        self._rms = numpy.zeros(channels + 1, dtype=numpy.float64)
+        self._low = numpy.zeros(channels, dtype=numpy.float32)
+        self._mask = numpy.zeros(channels, dtype=bool)
+        self._expired = numpy.zeros(channels, dtype=bool)
+
+    def update(self, block):
+        """Meters one (channels, frames) block without allocating arrays."""
+        frames = block.shape[-1]
+        if frames == 0:
+            return
+
+        numpy.einsum('ij,ij->i', block, block, out=self._power)
+        rms = self._rms
+        numpy.divide(self._power, frames, out=rms[:-1])
+        rms[-1] = rms[:-1].mean()
+        numpy.sqrt(rms, out=rms)
+
+        # Running sum over the ring, the oldest value leaves as the new one enters
+        slot = self.values[self.index]
+        self.sums -= slot
+        slot[:] = rms
+        self.sums += rms
+        self.index += 1
+        if self.index == self.window_size:
+            self.index = 0
+            # Resync once per lap so float error cannot accumulate
+            self.values.sum(axis=0, out=self.sums)
+        if self.count < self.window_size:
+            self.count += 1
+        numpy.divide(self.sums, self.count, out=self.average)
+
+        numpy.max(block, axis=1, out=self.peak)
+        numpy.min(block, axis=1, out=self._low)
+        numpy.negative(self._low, out=self._low)
+        numpy.maximum(self.peak, self._low, out=self.peak)
+
+        # Peak hold: a new maximum restarts the hold, otherwise it counts down
+        self.hold_left -= 1
+        numpy.greater_equal(self.peak, self.peak_hold, out=self._mask)
+        numpy.less_equal(self.hold_left, 0, out=self._expired)
+        numpy.logical_or(self._mask, self._expired, out=self._mask)
+        numpy.copyto(self.peak_hold, self.peak, where=self._mask)
+        numpy.copyto(self.hold_left, self.hold_blocks, where=self._mask)
+
+        numpy.greater_equal(self.peak, self.clip_level, out=self._mask)
+        numpy.add(self.clips, self._mask, out=self.clips)
+
+    @property
+    def level(self):
+        """Moving average RMS of all channels."""
+        return float(self.average[-1])
+
+    @property
+    def channel_levels(self):
+        return self.average[:-1]
+
+    def reset(self):
+        self.values.fill(0)
+        self.sums.fill(0)
+        self.average.fill(0)
+        self.index = 0
+        self.count = 0
+        self.peak.fill(0)
+        self.peak_hold.fill(0)
+        self.hold_left.fill(0)
+        self.clips.fill(0)
+
+    def snapshot(self):
+        return {
+            'rms': self.level,
+            'channels': self.channel_levels.tolist(),
+            'peak': self.peak.tolist(),
+            'peak_hold': self.peak_hold.tolist(),
+            'clips': self.clips.tolist(),
+        }
@@ -0,0 +1,280 @@
+import os
+import mmap
+import queue
+import multiprocessing
+import numpy
+import pedalboard
+
+import config
+import telemetry
+
+from plugins import base
+
+# Cache-line separated counters at the head of every ring file
+WRITE_INDEX = 0
+READ_INDEX = 64
+STATS = 128
+HEADER_SIZE = 192
+
+# Counters in the output ring's stats, written by the JACK side only
+UNDERRUNS = 0
+OVERRUNS = 1
+DROPPED = 2
+LATENCY = 3
+
+
+class BlockRing:
+    """Single-producer/single-consumer ring of audio blocks in shared memory.
+
+    Each side owns one monotonically increasing block index: the producer
+    writes a slot and then moves `write_index`, the consumer reads a slot and
+    then moves `read_index`. No locks, so the JACK side never blocks.
+    """
+
+    def __init__(self, name, slots, channels, frames, create=False):
+        self.path = telemetry.segment_path(name)
+        self.owner = create
+        self.slots = slots
+        size = HEADER_SIZE + slots * channels * frames * 4
+
+        with open(self.path, 'w+b' if create else 'r+b') as f:
+            if create:
+                f.truncate(size)
+            self.map = mmap.mmap(f.fileno(), size)
+
+        self.write_index = numpy.ndarray((), dtype=numpy.uint64, buffer=self.map, offset=WRITE_INDEX)
+        self.read_index = numpy.ndarray((), dtype=numpy.uint64, buffer=self.map, offset=READ_INDEX)
+        self.stats = numpy.ndarray((8,), dtype=numpy.uint64, buffer=self.map, offset=STATS)
+        self.blocks = numpy.ndarray((slots, channels, frames), dtype=numpy.float32, buffer=self.map, offset=HEADER_SIZE)
+        # Channel rows of every slot, so neither side builds views per block
+        self.rows = [[self.blocks[slot, channel] for channel in range(channels)] for slot in range(slots)]
+        if create:
+            self.map[:HEADER_SIZE] = bytes(HEADER_SIZE)
+
+    def available(self):
+        return int(self.write_index) - int(self.read_index)
+
+    def free(self):
+        return self.slots - self.available()
+
+    def write_rows(self):
+        return self.rows[int(self.write_index) % self.slots]
+
+    def read_rows(self):
+        return self.rows[int(self.read_index) % self.slots]
+
+    def commit_write(self, blocks=1):
+        self.write_index += blocks
+
+    def commit_read(self, blocks=1):
+        self.read_index += blocks
+
+    def close(self):
+        self.write_index = self.read_index = self.stats = self.blocks = self.rows = None
+        self.map.close()
+
+    def unlink(self):
+        self.close()
+        if self.owner and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def plugin_path(board, plugin):
+    """Index path of `plugin` inside a nested board, or None."""
+    for index, child in enumerate(board):
+        if child is plugin:
+            return (index,)
+        if isinstance(child, (pedalboard.Chain, pedalboard.Mix, pedalboard.Pedalboard, base.Board)):
+            nested = plugin_path(child, plugin)
+            if nested is not None:
+                return (index,) + nested
+    return None
+
+
+def resolve(board, path):
+    plugin = board
+    for index in path:
+        plugin = plugin[index]
+    return plugin
+
+
+class Pipeline:
+    """JACK side of the pipelined engine.
+
+    The process callback only copies the port buffers into the input ring
+    and the next processed block out of the output ring. A spawned DSP
+    process, which has none of the control-plane threads, runs the board
+    on the blocks in between. The output ring starts with `periods` blocks
+    of silence, which is the extra latency bought for the slack: the DSP
+    process may fall up to that many periods behind without a glitch.
+    `block` is the internal block of the DSP process in efficient latency
+    mode, which adds its own latency on top. Once the DSP process dies the
+    pipeline is `failed`, the process callback runs the board itself and
+    the audio server starts a new pipeline.
+    """
+
+    def __init__(self, channels, frames, sample_rate, periods=2, name=None, block=None):
+        self.name = name or config.pipeline_name
+        self.channels = channels
+        self.frames = frames
+        self.sample_rate = sample_rate
+        self.periods = periods
+        self.block = block or frames
+        self.failed = False
+        slots = periods + 4
+
+        self.input = BlockRing(self.name + '_in', slots, channels, frames, create=True)
+        self.output = BlockRing(self.name + '_out', slots, channels, frames, create=True)
+        self.output.commit_write(periods)
+        self.output.stats[LATENCY] = self.latency
+
+        context = multiprocessing.get_context('spawn')
+        self.ready = context.Semaphore(0)
+        self.running = context.Event()
+        self.started = context.Event()
+        self.control = context.Queue()
+        self.process = context.Process(
+            target=run_worker,
+            args=(self.name, channels, frames, sample_rate, slots, self.ready, self.running, self.started, self.control, config.preset, (config.latency_mode, config.efficient_block_size)),
+            name='resobox-dsp',
+            daemon=True,
+        )
+
+    @property
+    def latency(self):
+        """Extra frames of latency the pipeline adds to the JACK round trip."""
+        return self.periods * self.frames + self.block - self.frames
+
+    def start(self, timeout=30):
+        """Starts the DSP process and waits until its board is ready."""
+        self.running.set()
+        self.process.start()
+        if not self.started.wait(timeout):
+            print("🛑 DSP process is slow to start, output is silent until it catches up")
+        config.controller.forward = self.forward
+
+    def check(self):
+        """False once the DSP process has exited; never called from the audio thread."""
+        if not self.failed and self.process.exitcode is not None:
+            self.failed = True
+            print(f"🛑 DSP process exited with code {self.process.exitcode}, running the board in the JACK callback")
+        return not self.failed
+
+    def stop(self):
+        if config.controller.forward == self.forward:
+            config.controller.forward = None
+        self.running.clear()
+        self.ready.release()
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.input.unlink()
+        self.output.unlink()
+
+    # JACK process thread
+
+    def exchange(self, inputs, outputs):
+        ring = self.input
+        stats = self.output.stats
+        if ring.free() > 0:
+            for row, buffer in zip(ring.write_rows(), inputs):
+                numpy.copyto(row, buffer)
+            ring.commit_write()
+            self.ready.release()
+        else:
+            stats[OVERRUNS] += 1
+
+        ring = self.output
+        available = ring.available()
+        if available > self.periods:
+            # Blocks that arrived after an underrun would add latency for good
+            ring.commit_read(available - self.periods)
+            stats[DROPPED] += available - self.periods
+            available = self.periods
+
+        if available == 0:
+            for buffer in outputs:
+                buffer.fill(0)
+            stats[UNDERRUNS] += 1
+            return
+
+        for buffer, row in zip(outputs, ring.read_rows()):
+            numpy.copyto(buffer, row)
+        ring.commit_read()
+
+    # Control plane
+
+    def forward(self, kind, *args):
+        """Mirrors a control change of this process into the DSP process."""
+        if kind == 'set':
+            plugin, attribute, value, smooth = args
+            path = plugin_path(config.board, plugin)
+            if path is not None:
+                self.control.put(('set', path, attribute, value, smooth))
+        else:
+            self.control.put((kind, *args))
+
+    def stats(self):
+        stats = self.output.stats
+        return {
+            'mode': 'pipelined',
+            'alive': self.check(),
+            'latency_mode': config.latency_mode,
+            'latency_frames': int(stats[LATENCY]),
+            'underruns': int(stats[UNDERRUNS]),
+            'overruns': int(stats[OVERRUNS]),
+            'dropped': int(stats[DROPPED]),
+        }
+
+
+def apply_control(control):
+    # Between two blocks of the DSP process, never blocks
+    while True:
+        try:
+            message = control.get_nowait()
+        except queue.Empty:
+            return
+        kind = message[0]
+        if kind == 'set':
+            _, path, attribute, value, smooth = message
+            try:
+                config.controller.set(resolve(config.board, path), attribute, value, smooth)
+            except (IndexError, TypeError, AttributeError):
+                print(f"🛑 DSP process: no plugin at {path}")
+        elif kind == 'preset':
+            _, name, crossfade = message
+            config.preset_bank.switch(name, crossfade)
+
+
+def run_worker(name, channels, frames, sample_rate, slots, ready, running, started, control, preset, latency):
+    """Entry point of the DSP process."""
+    import audio
+    import presets
+
+    # The spawned process starts from the defaults, not the command line
+    config.latency_mode, config.efficient_block_size = latency
+
+    # The board built on import is for the default rate, the JACK one may differ
+    rebuild = preset != config.preset or sample_rate != config.sample_rate
+    processor = audio.Processor(channels=channels, segment=telemetry.segment())
+    processor.prepare(frames, sample_rate)
+    if rebuild:
+        config.preset_bank.switch(preset, False).result()
+    presets.warm(config.board, sample_rate, processor.block, channels)
+    source = BlockRing(name + '_in', slots, channels, frames)
+    sink = BlockRing(name + '_out', slots, channels, frames)
+    print(f"🎚 DSP process running {sink.stats[LATENCY]} frames ahead")
+    started.set()
+
+    try:
+        while running.is_set():
+            if not ready.acquire(timeout=0.1):
+                continue
+            apply_control(control)
+            while source.available() > 0 and sink.free() > 0:
+                processor.process(source.read_rows(), sink.write_rows())
+                source.commit_read()
+                sink.commit_write()
+    finally:
+        source.close()
+        sink.close()
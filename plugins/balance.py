@@ -0,0 +1,26 @@
+from plugins.base import MatrixPlugin, Parameter, Ramp
+
+
+class Balance(MatrixPlugin):
+    """Stereo balance: 0 keeps only the left channel, 1 only the right, 0.5 is unity."""
+
+    balance = Parameter(0.5, 0.0, 1.0)
+
+    def __init__(self, balance=0.5):
+        super().__init__()
+        self._left = Ramp(1.0)
+        self._right = Ramp(1.0)
+        self.balance = balance
+        self.reset()
+
+    def changed(self):
+        self._left.target = min(1.0, 2.0 * (1.0 - self.balance))
+        self._right.target = min(1.0, 2.0 * self.balance)
+
+    def reset(self):
+        super().reset()
+        self._left.jump()
+        self._right.jump()
+
+    def matrix(self, frames):
+        return (self._left.block(frames), 0.0, 0.0, self._right.block(frames))
@@ -0,0 +1,364 @@
+import numpy
+import pedalboard
+
+
+class Ramp:
+    """Block-wise linear ramp of one parameter.
+
+    Setting `target` does not change the sound immediately: the next rendered
+    block moves from the previous value to the target sample by sample.
+    """
+
+    def __init__(self, value):
+        self.target = value
+        self.current = value
+        self.buffer = None
+        self.unit = None
+
+    def block(self, frames):
+        """Returns the value for the next block, a float or a (frames,) ramp."""
+        if self.current == self.target:
+            return self.current
+
+        if self.buffer is None or len(self.buffer) != frames:
+            self.buffer = numpy.zeros(frames, dtype=numpy.float32)
+            self.unit = numpy.arange(1, frames + 1, dtype=numpy.float32) / frames
+
+        numpy.multiply(self.unit, self.target - self.current, out=self.buffer)
+        self.buffer += self.current
+        self.current = self.target
+        return self.buffer
+
+    def jump(self):
+        self.current = self.target
+
+
+class Parameter:
+    """Ramped, clipped plugin parameter, declared on the plugin class."""
+
+    def __init__(self, default, minimum, maximum):
+        self.default = default
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def ramp(self, instance):
+        ramp = instance.__dict__.get(self.name)
+        if ramp is None:
+            ramp = instance.__dict__[self.name] = Ramp(self.default)
+        return ramp
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return self.ramp(instance).target
+
+    def __set__(self, instance, value):
+        value = float(min(self.maximum, max(self.minimum, value)))
+        ramp = instance.__dict__.get(self.name)
+        if ramp is None:
+            # The first assignment is the initial value, not a ramp
+            instance.__dict__[self.name] = Ramp(value)
+        else:
+            ramp.target = value
+        instance.changed()
+
+
+class Plugin:
+    """Base class for custom DSP written with NumPy.
+
+    Audio is always float32 shaped (channels, frames). The in-place contract
+    is explicit: plugins with `in_place = True` overwrite and return the
+    buffer they are given, the others leave it alone and return a buffer they
+    own, which stays valid until their next call. Containers use this to copy
+    the caller's audio at most once.
+
+    Plugins with `fusable = True` can be merged with their neighbours into a
+    single FusedChain pass.
+    """
+
+    in_place = True
+    fusable = False
+    is_effect = True
+    is_instrument = False
+
+    def parameters(self):
+        return [name for name, value in vars(type(self)).items() if isinstance(value, Parameter)]
+
+    def changed(self):
+        """Called whenever a parameter target is set."""
+
+    def render(self, audio, sample_rate):
+        raise NotImplementedError
+
+    def reset(self):
+        for name in self.parameters():
+            getattr(type(self), name).ramp(self).jump()
+
+    def process(self, input_array, sample_rate, buffer_size=8192, reset=True):
+        """Same call signature as pedalboard, so the plugin can stand alone."""
+        if reset:
+            self.reset()
+        audio = numpy.array(input_array, dtype=numpy.float32, copy=True) if self.in_place else input_array
+        return self.render(audio, sample_rate)
+
+    __call__ = process
+
+    def __repr__(self):
+        values = ' '.join(f"{name}={getattr(self, name):g}" for name in self.parameters())
+        return f"<plugins.{type(self).__name__} {values}>"
+
+
+class MatrixPlugin(Plugin):
+    """Stereo plugin that is a 2x2 gain matrix per sample.
+
+    Subclasses only describe the matrix as (left<-left, left<-right,
+    right<-left, right<-right); each coefficient is a float or, while a
+    parameter ramps, a (frames,) array. Chains of matrix plugins collapse
+    into one matrix, applied in a single pass over the buffer.
+    """
+
+    fusable = True
+    in_place = False
+
+    def __init__(self):
+        self.output = None
+        self.scratch = None
+
+    def matrix(self, frames):
+        raise NotImplementedError
+
+    def render(self, audio, sample_rate):
+        if self.output is None or self.output.shape != audio.shape:
+            self.output = numpy.zeros_like(audio, dtype=numpy.float32)
+            self.scratch = numpy.zeros(audio.shape[-1], dtype=numpy.float32)
+        return apply_matrix(self.matrix(audio.shape[-1]), audio, self.output, self.scratch)
+
+
+IDENTITY = (1.0, 0.0, 0.0, 1.0)
+
+
+def compose(outer, inner):
+    a, b, c, d = outer
+    e, f, g, h = inner
+    return (a * e + b * g, a * f + b * h, c * e + d * g, c * f + d * h)
+
+
+def is_zero(coefficient):
+    return isinstance(coefficient, float) and coefficient == 0.0
+
+
+def apply_matrix(matrix, audio, output, scratch):
+    """output = matrix @ audio for stereo audio, without temporaries for float coefficients.
+
+    Mono audio is fed to both inputs of the matrix and gets the mean of its
+    two outputs, so a mono board keeps working and a pan or width only
+    changes its level.
+    """
+    if len(audio) == 1:
+        if all(isinstance(coefficient, float) for coefficient in matrix):
+            numpy.multiply(audio[0], sum(matrix) / 2, out=output[0])
+            return output
+        scratch.fill(0)
+        for coefficient in matrix:
+            scratch += coefficient
+        scratch *= 0.5
+        numpy.multiply(audio[0], scratch, out=output[0])
+        return output
+    if len(audio) != 2:
+        raise ValueError(f"Matrix plugins take mono or stereo audio, got {len(audio)} channels")
+
+    left, right = audio[0], audio[1]
+    for row, (own, other, source, cross) in enumerate(((matrix[0], matrix[1], left, right), (matrix[3], matrix[2], right, left))):
+        target = output[row]
+        numpy.multiply(source, own, out=target)
+        if not is_zero(other):
+            numpy.multiply(cross, other, out=scratch)
+            target += scratch
+    return output
+
+
+class FusedChain(Plugin):
+    """Runs a run of fusable plugins with as few passes over the buffer as possible.
+
+    Neighbouring matrix plugins are multiplied into one matrix and applied in
+    a single pass. DC blockers stay where they are: they would only commute
+    with the mixing while no gain or pan is ramping, and moving them in and
+    out of place would make their state jump.
+    """
+
+    fusable = True
+    in_place = False
+
+    def __init__(self, plugins):
+        self.plugins = list(plugins)
+        # (matrix plugins, None) or (None, plugin) in chain order
+        self.segments = []
+        for plugin in self.plugins:
+            if isinstance(plugin, MatrixPlugin):
+                if self.segments and self.segments[-1][0] is not None:
+                    self.segments[-1][0].append(plugin)
+                else:
+                    self.segments.append(([plugin], None))
+            else:
+                self.segments.append((None, plugin))
+        self.output = None
+        self.work = None
+        self.scratch = None
+
+    def reset(self):
+        for plugin in self.plugins:
+            plugin.reset()
+
+    def render(self, audio, sample_rate):
+        if self.output is None or self.output.shape != audio.shape:
+            self.output = numpy.zeros_like(audio, dtype=numpy.float32)
+            self.work = numpy.zeros_like(audio, dtype=numpy.float32)
+            self.scratch = numpy.zeros(audio.shape[-1], dtype=numpy.float32)
+
+        frames = audio.shape[-1]
+        for matrices, plugin in self.segments:
+            if matrices is not None:
+                matrix = IDENTITY
+                for member in matrices:
+                    matrix = compose(member.matrix(frames), matrix)
+                # A matrix pass never runs in place, so it alternates between the two buffers
+                target = self.work if audio is self.output else self.output
+                audio = apply_matrix(matrix, audio, target, self.scratch)
+            elif plugin.in_place:
+                if audio is not self.output and audio is not self.work:
+                    # Never write into the caller's buffer
+                    numpy.copyto(self.output, audio)
+                    audio = self.output
+                audio = plugin.render(audio, sample_rate)
+            else:
+                audio = plugin.render(audio, sample_rate)
+        return audio
+
+    def __repr__(self):
+        return f"<plugins.FusedChain {self.plugins}>"
+
+
+def is_native(plugin):
+    return isinstance(plugin, pedalboard.Plugin)
+
+
+def compile_stages(plugins):
+    """Groups runs of pedalboard plugins into a native Pedalboard and runs of
+    fusable NumPy plugins into a FusedChain."""
+    stages = []
+    run = []
+    for plugin in plugins:
+        if run and (is_native(plugin) != is_native(run[0]) or not (is_native(plugin) or plugin.fusable)):
+            stages.append(run)
+            run = []
+        run.append(plugin)
+        if not is_native(plugin) and not plugin.fusable:
+            stages.append(run)
+            run = []
+    if run:
+        stages.append(run)
+
+    compiled = []
+    for run in stages:
+        if is_native(run[0]):
+            compiled.append(pedalboard.Pedalboard(run))
+        elif len(run) > 1 or isinstance(run[0], MatrixPlugin):
+            compiled.append(FusedChain(run))
+        else:
+            compiled.append(run[0])
+    return compiled
+
+
+class Board(Plugin):
+    """Chain that can hold pedalboard plugins and NumPy plugins side by side.
+
+    pedalboard's native Pedalboard/Chain/Mix only accept native plugins, so
+    this is what a chain with custom DSP is built as. It is called exactly
+    like a Pedalboard and iterates over the plugins it was given.
+    """
+
+    in_place = False
+
+    def __init__(self, plugins=None):
+        self.plugins = list(plugins or [])
+        self.stages = compile_stages(self.plugins)
+        self.work = None
+
+    def __iter__(self):
+        return iter(self.plugins)
+
+    def __len__(self):
+        return len(self.plugins)
+
+    def __getitem__(self, index):
+        return self.plugins[index]
+
+    def reset(self):
+        for stage in self.stages:
+            stage.reset()
+
+    def render(self, audio, sample_rate):
+        return self.process(audio, sample_rate, 8192, False)
+
+    def process(self, input_array, sample_rate, buffer_size=8192, reset=True):
+        """Runs every stage; may hand back input_array itself if there is nothing to do."""
+        if reset:
+            self.reset()
+
+        audio = input_array
+        owned = False
+        for stage in self.stages:
+            if is_native(stage):
+                audio = stage(audio, sample_rate, buffer_size, False)
+                owned = True
+            elif stage.in_place:
+                if not owned:
+                    # Never write into the caller's buffer
+                    if self.work is None or self.work.shape != audio.shape:
+                        self.work = numpy.zeros(audio.shape, dtype=numpy.float32)
+                    numpy.copyto(self.work, audio)
+                    audio = self.work
+                    owned = True
+                audio = stage.render(audio, sample_rate)
+            else:
+                audio = stage.render(audio, sample_rate)
+                owned = False
+        return audio
+
+    __call__ = process
+
+    def __repr__(self):
+        return f"<plugins.Board with {len(self.plugins)} plugins: {self.plugins}>"
+
+
+class Mix(Board):
+    """Parallel branches summed into one buffer, like pedalboard.Mix."""
+
+    def __init__(self, plugins=None):
+        self.plugins = list(plugins or [])
+        self.branches = [plugin if isinstance(plugin, Plugin) else Board([plugin]) for plugin in self.plugins]
+        self.output = None
+
+    def reset(self):
+        for branch in self.branches:
+            branch.reset()
+
+    def process(self, input_array, sample_rate, buffer_size=8192, reset=True):
+        if reset:
+            self.reset()
+        if self.output is None or self.output.shape != input_array.shape:
+            self.output = numpy.zeros(input_array.shape, dtype=numpy.float32)
+
+        self.output.fill(0)
+        for branch in self.branches:
+            # Branches never write into input_array, so they can share it
+            self.output += branch(input_array, sample_rate, buffer_size, False)
+        return self.output
+
+    __call__ = process
+
+    def __repr__(self):
+        return f"<plugins.Mix with {len(self.plugins)} branches: {self.plugins}>"
@@ -0,0 +1,62 @@
+import math
+import numpy
+
+from plugins.base import Plugin
+
+CHUNK = 256  # Keeps the R**-n table within a safe float range
+
+
+class DCBlock(Plugin):
+    """One-pole DC blocker, y[n] = x[n] - x[n-1] + R * y[n-1], without a per-sample loop.
+
+    The recursion unrolls to y[n] = R**n * (R * y[-1] + sum(R**-k * d[k])) with
+    d = x[n] - x[n-1], which is a cumulative sum over precomputed power tables.
+    """
+
+    fusable = True
+    in_place = True
+
+    def __init__(self, cutoff_frequency_hz=10.0):
+        self.cutoff_frequency_hz = cutoff_frequency_hz
+        self.sample_rate = None
+        self.last_input = None
+        self.last_output = None
+
+    def prepare(self, sample_rate, channels):
+        self.sample_rate = sample_rate
+        pole = math.exp(-2 * math.pi * self.cutoff_frequency_hz / sample_rate)
+        powers = numpy.arange(CHUNK, dtype=numpy.float64)
+        self.pole = pole
+        self.growth = pole ** powers
+        self.decay = pole ** -powers
+        self.last_input = numpy.zeros((channels, 1), dtype=numpy.float64)
+        self.last_output = numpy.zeros((channels, 1), dtype=numpy.float64)
+        self.delta = numpy.zeros((channels, CHUNK), dtype=numpy.float64)
+
+    def reset(self):
+        if self.last_input is not None:
+            self.last_input.fill(0)
+            self.last_output.fill(0)
+
+    def render(self, audio, sample_rate):
+        channels = audio.shape[0]
+        if sample_rate != self.sample_rate or self.last_input is None or self.last_input.shape[0] != channels:
+            self.prepare(sample_rate, channels)
+
+        for start in range(0, audio.shape[-1], CHUNK):
+            block = audio[:, start:start + CHUNK]
+            frames = block.shape[-1]
+            delta = self.delta[:, :frames]
+
+            # d[k] = x[k] - x[k-1], continuing from the previous chunk
+            delta[:, 0:1] = block[:, 0:1] - self.last_input
+            numpy.subtract(block[:, 1:], block[:, :-1], out=delta[:, 1:])
+            self.last_input[:, 0] = block[:, -1]
+
+            delta *= self.decay[:frames]
+            numpy.cumsum(delta, axis=1, out=delta)
+            delta += self.pole * self.last_output
+            delta *= self.growth[:frames]
+            self.last_output[:, 0] = delta[:, -1]
+            numpy.copyto(block, delta, casting='same_kind')
+        return audio
@@ -0,0 +1,25 @@
+from plugins.base import MatrixPlugin, Parameter, Ramp
+
+
+class Gain(MatrixPlugin):
+    """Gain in decibels, ramped in the linear domain."""
+
+    gain_db = Parameter(0.0, -120.0, 40.0)
+
+    def __init__(self, gain_db=0.0):
+        super().__init__()
+        self._linear = Ramp(1.0)
+        self.gain_db = gain_db
+        self._linear.jump()
+
+    def changed(self):
+        # Converted once per change instead of once per block
+        self._linear.target = 10 ** (self.gain_db / 20)
+
+    def reset(self):
+        super().reset()
+        self._linear.jump()
+
+    def matrix(self, frames):
+        gain = self._linear.block(frames)
+        return (gain, 0.0, 0.0, gain)
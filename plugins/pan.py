@@ -1,38 +1,42 @@
-import numpy as np
-import types
-from pedalboard_native import Plugin
+import numpy
 
-class Pan():
-    is_effect = True
-    is_instrument = False
+from plugins.base import MatrixPlugin, Parameter
 
-    @classmethod
-    def __instancecheck__(cls, instance):
-        return isinstance(instance, Plugin)
+# Pan law lookup: cosine/sine gains with extra centre attenuation, indexed by balance
+TABLE_SIZE = 4096
+_positions = numpy.linspace(0, 1, TABLE_SIZE + 1)
+LEFT_GAINS = (numpy.cos(_positions * numpy.pi / 2) * numpy.sqrt(1 / 2)).astype(numpy.float32)
+RIGHT_GAINS = (numpy.sin(_positions * numpy.pi / 2) * numpy.sqrt(1 / 2)).astype(numpy.float32)
 
-    @property
-    def __class__(self):
-        return Plugin
 
-    def __init__(self, balance=0.5):  # Balance: 0 (left) to 1 (right), with 0.5 being center
-        self.balance = balance
+class Pan(MatrixPlugin):
+    """Balance: 0 (left) to 1 (right), with 0.5 being center."""
+
+    balance = Parameter(0.5, 0.0, 1.0)
 
-    def process(self, audio, sample_rate):
-        # Pan law adjustment: -3dB at center
-        center_attenuation = np.sqrt(1/2)
-        
-        # Calculate gains for L and R channels using a cosine and sine law for smooth panning
-        left_gain = np.cos(self.balance * np.pi / 2) * center_attenuation
-        right_gain = np.sin(self.balance * np.pi / 2) * center_attenuation
-        
-        # Apply calculated gains to the audio channels
-        audio[:, 0] *= left_gain  # Apply gain to the left channel
-        audio[:, 1] *= right_gain  # Apply gain to the right channel
-        return audio
+    def __init__(self, balance=0.5):
+        super().__init__()
+        self.balance = balance
+        self._index = None
 
     def set_balance(self, balance):
-        # Ensure the balance is within the range [0, 1]
-        self.balance = np.clip(balance, 0, 1)
-        
+        self.balance = balance
+
+    def matrix(self, frames):
+        balance = type(self).balance.ramp(self).block(frames)
+        if isinstance(balance, float):
+            index = int(balance * TABLE_SIZE + 0.5)
+            return (float(LEFT_GAINS[index]), 0.0, 0.0, float(RIGHT_GAINS[index]))
 
-print(isinstance(Pan(), Plugin))
\ No newline at end of file
+        # Ramping: per-sample gains straight from the table
+        if self._index is None or len(self._index) != frames:
+            self._index = numpy.zeros(frames, dtype=numpy.intp)
+            self._position = numpy.zeros(frames, dtype=numpy.float32)
+            self._left = numpy.zeros(frames, dtype=numpy.float32)
+            self._right = numpy.zeros(frames, dtype=numpy.float32)
+        numpy.multiply(balance, TABLE_SIZE, out=self._position)
+        numpy.rint(self._position, out=self._position)
+        numpy.copyto(self._index, self._position, casting='unsafe')
+        numpy.take(LEFT_GAINS, self._index, out=self._left)
+        numpy.take(RIGHT_GAINS, self._index, out=self._right)
+        return (self._left, 0.0, 0.0, self._right)
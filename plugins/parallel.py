@@ -0,0 +1,165 @@
+import os
+import time
+import _thread
+import threading
+import numpy
+
+from plugins import base
+
+
+class Worker:
+    """One pinned thread running a single branch per block.
+
+    Hand-off uses two raw locks, one each way: no Condition, no queue and no
+    allocation per block. pedalboard releases the GIL inside its native
+    processing, which is where a branch spends its time.
+    """
+
+    def __init__(self, cpu=None):
+        self.cpu = cpu
+        self.started = _thread.allocate_lock()
+        self.finished = _thread.allocate_lock()
+        self.started.acquire()
+        self.finished.acquire()
+        self.task = None
+        self.result = None
+        self.error = None
+        self.elapsed = 0.0
+        self.thread = threading.Thread(target=self.loop, name=f'mix-{cpu}', daemon=True)
+        self.thread.start()
+
+    def loop(self):
+        if self.cpu is not None and hasattr(os, 'sched_setaffinity'):
+            try:
+                os.sched_setaffinity(0, {self.cpu})
+            except OSError:
+                pass
+        while True:
+            self.started.acquire()
+            branch, audio, sample_rate, buffer_size = self.task
+            started = time.perf_counter()
+            try:
+                self.result = branch(audio, sample_rate, buffer_size, False)
+            except Exception as e:
+                self.result = None
+                self.error = e
+            self.elapsed = time.perf_counter() - started
+            self.finished.release()
+
+    def submit(self, branch, audio, sample_rate, buffer_size):
+        self.task = (branch, audio, sample_rate, buffer_size)
+        self.started.release()
+
+    def wait(self):
+        self.finished.acquire()
+        error = self.error
+        if error is not None:
+            self.error = None
+            raise error
+        return self.result
+
+
+class Pool:
+    """Persistent workers, one per core except the first, which the audio thread keeps."""
+
+    def __init__(self, workers=None):
+        cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else list(range(os.cpu_count() or 1))
+        if workers is None:
+            # None at all on a single core, where every mix runs serially
+            workers = len(cpus) - 1
+        # Pinned to distinct cores where there are enough of them
+        spare = cpus[1:] if len(cpus) > workers else []
+        self.workers = [Worker(spare[index] if index < len(spare) else None) for index in range(workers)]
+        # Held by the ParallelMix that is using the workers; nested or
+        # concurrent mixes that find it taken simply run serially
+        self.lock = _thread.allocate_lock()
+
+
+_pool = None
+
+def shared_pool():
+    global _pool
+    if _pool is None:
+        _pool = Pool()
+    return _pool
+
+
+class ParallelMix(base.Mix):
+    """Mix whose expensive branches run on worker threads.
+
+    Branch costs are tracked as a moving average of their measured time.
+    The costliest branch always runs on the calling thread, the other ones
+    above `min_dispatch` seconds go to workers, and cheap branches stay on
+    the calling thread too, where dispatching would cost more than it
+    saves. With fewer than two expensive branches the mix is plain serial.
+    """
+
+    def __init__(self, plugins=None, pool=None, min_dispatch=0.00005, replan_blocks=64):
+        super().__init__(plugins)
+        self.pool = pool
+        self.min_dispatch = min_dispatch
+        self.replan_blocks = replan_blocks
+        self.costs = [0.0] * len(self.branches)
+        self.local = tuple(range(len(self.branches)))
+        self.remote = ()
+        self.blocks = 0
+
+    def plan(self, workers):
+        order = sorted(range(len(self.branches)), key=lambda index: self.costs[index], reverse=True)
+        expensive = [index for index in order if self.costs[index] >= self.min_dispatch]
+        remote = expensive[1:1 + workers]
+        self.remote = tuple(remote)
+        self.local = tuple(index for index in order if index not in remote)
+
+    def run(self, index, input_array, sample_rate, buffer_size):
+        started = time.perf_counter()
+        self.output += self.branches[index](input_array, sample_rate, buffer_size, False)
+        self.costs[index] += 0.1 * (time.perf_counter() - started - self.costs[index])
+
+    def process(self, input_array, sample_rate, buffer_size=8192, reset=True):
+        if reset:
+            self.reset()
+        if self.output is None or self.output.shape != input_array.shape:
+            self.output = numpy.zeros(input_array.shape, dtype=numpy.float32)
+
+        pool = self.pool or shared_pool()
+        self.blocks += 1
+        if self.blocks % self.replan_blocks == 0:
+            # A few small lists every `replan_blocks` blocks, not per block
+            self.plan(len(pool.workers))
+
+        self.output.fill(0)
+        if not self.remote or not pool.lock.acquire(False):
+            for index in range(len(self.branches)):
+                self.run(index, input_array, sample_rate, buffer_size)
+            return self.output
+
+        error = None
+        try:
+            workers = pool.workers
+            for worker, index in zip(workers, self.remote):
+                worker.submit(self.branches[index], input_array, sample_rate, buffer_size)
+            try:
+                for index in self.local:
+                    self.run(index, input_array, sample_rate, buffer_size)
+            except Exception as e:
+                error = e
+            # Every dispatched branch is collected, even after a failure,
+            # so the workers are idle again when the pool is released
+            for worker, index in zip(workers, self.remote):
+                try:
+                    self.output += worker.wait()
+                except Exception as e:
+                    error = error or e
+                    continue
+                self.costs[index] += 0.1 * (worker.elapsed - self.costs[index])
+        finally:
+            pool.lock.release()
+        if error is not None:
+            raise error
+        return self.output
+
+    __call__ = process
+
+    def __repr__(self):
+        return f"<plugins.ParallelMix with {len(self.plugins)} branches: {self.plugins}>"
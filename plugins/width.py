@@ -0,0 +1,28 @@
+from plugins.base import MatrixPlugin, Parameter, Ramp
+
+
+class Width(MatrixPlugin):
+    """Mid/side stereo width: 0 is mono, 1 leaves the image alone, 2 doubles the side signal."""
+
+    width = Parameter(1.0, 0.0, 2.0)
+
+    def __init__(self, width=1.0):
+        super().__init__()
+        self._direct = Ramp(1.0)
+        self._cross = Ramp(0.0)
+        self.width = width
+        self.reset()
+
+    def changed(self):
+        self._direct.target = (1.0 + self.width) / 2
+        self._cross.target = (1.0 - self.width) / 2
+
+    def reset(self):
+        super().reset()
+        self._direct.jump()
+        self._cross.jump()
+
+    def matrix(self, frames):
+        direct = self._direct.block(frames)
+        cross = self._cross.block(frames)
+        return (direct, cross, cross, direct)
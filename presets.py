@@ -0,0 +1,254 @@
+import os
+import json
+import threading
+import numpy
+import pedalboard
+import impulses
+
+from plugins import base
+from plugins.parallel import ParallelMix
+from plugins.pan import Pan
+from plugins.gain import Gain
+from plugins.balance import Balance
+from plugins.width import Width
+from plugins.dc_block import DCBlock
+
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    tomllib = None
+
+PRESETS_PATH = 'assets/presets'
+CONTAINERS = ('Pedalboard', 'Chain', 'Mix')
+
+# NumPy plugins, prefixed so they never shadow a pedalboard plugin of the same name
+CUSTOM_PLUGINS = {
+    'plugins.Pan': Pan,
+    'plugins.Gain': Gain,
+    'plugins.Balance': Balance,
+    'plugins.Width': Width,
+    'plugins.DCBlock': DCBlock,
+}
+
+
+def check_name(name):
+    """Raises ValueError unless `name` is a plain file name, so it cannot leave the preset directory."""
+    if not isinstance(name, str) or not name or name.startswith('.') or '/' in name or '\\' in name:
+        raise ValueError(f"Bad preset name {name!r}")
+
+
+def exists(name, directory=PRESETS_PATH):
+    check_name(name)
+    return any(os.path.exists(os.path.join(directory, name + extension)) for extension in ('.json', '.toml'))
+
+
+def load(name, directory=PRESETS_PATH):
+    """Reads a preset description from <name>.json or <name>.toml."""
+    check_name(name)
+    json_path = os.path.join(directory, name + '.json')
+    if os.path.exists(json_path):
+        with open(json_path, 'r') as f:
+            return json.load(f)
+
+    toml_path = os.path.join(directory, name + '.toml')
+    if os.path.exists(toml_path):
+        if tomllib is None:
+            raise RuntimeError("TOML presets need Python 3.11 or newer")
+        with open(toml_path, 'rb') as f:
+            return tomllib.load(f)
+
+    raise FileNotFoundError(f"Preset {name} not found in {directory}")
+
+
+def names(directory=PRESETS_PATH):
+    found = set()
+    for filename in os.listdir(directory):
+        name, extension = os.path.splitext(filename)
+        if extension in ('.json', '.toml'):
+            found.add(name)
+    return sorted(found)
+
+
+def build_convolution(description, sample_rate):
+    # IRs come preprocessed from the on-disk cache instead of being decoded here
+    impulse, rate = impulses.load(
+        description.pop('impulse_response_filename'),
+        sample_rate,
+        channels=description.pop('ir_channels', None),
+        normalize=description.pop('normalize', None),
+        trim_db=description.pop('trim_db', -80.0),
+    )
+    return pedalboard.Convolution(impulse, sample_rate=rate, **description)
+
+
+def is_empty(plugin):
+    # A dry branch: an empty Chain costs nothing and is never worth a thread
+    return isinstance(plugin, (pedalboard.Chain, base.Board)) and len(plugin) == 0
+
+
+def build_plugin(description, sample_rate=None, parallel=False):
+    """Builds one plugin, recursing into Chain/Mix containers.
+
+    With `parallel` (or "parallel": true on a Mix) the branches of a Mix run
+    on worker threads.
+    """
+    description = dict(description)
+    kind = description.pop('type')
+
+    if kind in CONTAINERS:
+        children = [build_plugin(child, sample_rate, parallel) for child in description.pop('plugins', [])]
+        if kind == 'Mix' and description.pop('parallel', parallel) and sum(not is_empty(child) for child in children) > 1:
+            return ParallelMix(children)
+        if all(base.is_native(child) for child in children):
+            return getattr(pedalboard, kind)(children)
+        # Native containers only take native plugins
+        return base.Mix(children) if kind == 'Mix' else base.Board(children)
+
+    if kind in CUSTOM_PLUGINS:
+        return CUSTOM_PLUGINS[kind](**description)
+
+    if kind == 'Convolution' and isinstance(description.get('impulse_response_filename'), str):
+        return build_convolution(description, sample_rate)
+
+    plugin_class = getattr(pedalboard, kind, None)
+    if not isinstance(plugin_class, type) or not issubclass(plugin_class, pedalboard.Plugin):
+        raise ValueError(f"Unknown plugin type: {kind}")
+    return plugin_class(**description)
+
+
+def build(description, sample_rate=None, parallel=False):
+    board = build_plugin({'type': 'Pedalboard', 'plugins': description['board']}, sample_rate, parallel)
+    # The rate the impulse responses were resampled to, see audio.follow_rate
+    board.sample_rate = sample_rate
+    return board
+
+
+def warm(board, sample_rate, frames, channels=2):
+    # Resets and runs silence through the board so the first real block
+    # does not pay for the plugins' lazy preparation on the audio thread
+    board.reset()
+    board(numpy.zeros((channels, frames), dtype=numpy.float32), sample_rate, frames, False)
+    return board
+
+
+class PresetBank:
+    """Builds presets on worker threads and keeps a bounded LRU cache of ready boards."""
+
+    def __init__(self, directory=PRESETS_PATH, capacity=4, workers=2):
+        self.directory = directory
+        self.capacity = capacity
+        self.cache = OrderedDict()
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='preset')
+
+    def remember(self, name, board):
+        with self.lock:
+            self.cache[name] = board
+            self.cache.move_to_end(name)
+            while len(self.cache) > self.capacity:
+                self.cache.popitem(last=False)
+
+    def exists(self, name):
+        check_name(name)
+        with self.lock:
+            if name in self.cache:
+                return True
+        return exists(name, self.directory)
+
+    def clear(self):
+        """Forgets every cached board, e.g. once they were built for another sample rate."""
+        with self.lock:
+            self.cache.clear()
+
+    def _build(self, name):
+        import config  # Imported lazily, config builds its own board through this module
+
+        board = build(load(name, self.directory), config.sample_rate, config.parallel_mix)
+        self.remember(name, board)
+        return board
+
+    def prepare(self, name):
+        """Returns a Future for the board of `name`, building it in the background if needed."""
+        with self.lock:
+            if name in self.cache:
+                self.cache.move_to_end(name)
+                future = Future()
+                future.set_result(self.cache[name])
+                return future
+            if name not in self.pending:
+                future = self.executor.submit(self._build, name)
+                self.pending[name] = future
+                future.add_done_callback(lambda _: self._forget_pending(name))
+            return self.pending[name]
+
+    def _forget_pending(self, name):
+        with self.lock:
+            self.pending.pop(name, None)
+
+    def switch(self, name, crossfade=True, target=None, sample_rate=None):
+        """Readies `name` off the audio thread and makes it the active board.
+
+        The process callback notices the new `config.board` at the next block
+        boundary, so the swap itself is a single reference assignment. The
+        returned Future resolves with the board once it is active. `target`
+        is an instances.Instance to switch instead of the main group, built
+        for `sample_rate`, its client's rate, when given.
+        """
+        import config
+
+        done = Future()
+
+        def activate_target():
+            # Boards hold state, so a group always gets a board of its own
+            # rather than one from the cache
+            try:
+                rate = sample_rate or config.sample_rate
+                board = build(load(name, self.directory), rate, config.parallel_mix)
+                warm(board, rate, config.processing_block, target.channels)
+                target.preset_crossfade = crossfade
+                target.preset = name
+                target.board = board
+                target.controller.prune(board)
+                target.update_effects_status()
+                done.set_result(board)
+            except Exception as e:
+                print(f"🛑 Failed to load preset {name} for {target.name}: {e}")
+                done.set_exception(e)
+
+        if target is not None:
+            self.executor.submit(activate_target)
+            return done
+
+        def activate(built):
+            try:
+                board = built.result()
+                if board is not config.board:
+                    if board not in config.live_boards:
+                        # A cached board may still be fading out on the audio
+                        # thread, which must be the only one running it
+                        warm(board, config.sample_rate, config.processing_block)
+                    if config.shedder.enabled:
+                        config.shedder.prepare(board, config.sample_rate)
+                    config.profiler.prepare(board, config.shedder)
+                    config.preset_crossfade = crossfade
+                    config.preset = name
+                    config.board = board
+                    config.controller.prune(board)
+                    config.update_effects_status()
+                    if config.controller.forward is not None:
+                        config.controller.forward('preset', name, crossfade)
+                done.set_result(board)
+            except Exception as e:
+                print(f"🛑 Failed to load preset {name}: {e}")
+                done.set_exception(e)
+
+        # Always hop onto a worker, even on a cache hit, to keep warm-up off the caller
+        self.prepare(name).add_done_callback(lambda built: self.executor.submit(activate, built))
+        return done
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,248 @@
+import time
+import bisect
+import collections
+import pedalboard
+
+from plugins import base
+
+# Callback wall time buckets in seconds, roughly log spaced around typical periods
+CALLBACK_BUCKETS = [0.0001, 0.00025, 0.0005, 0.001, 0.0015, 0.002, 0.0029, 0.004, 0.006, 0.0087, 0.012, 0.02, 0.05]
+LOAD_BUCKETS = [0.1, 0.25, 0.5, 0.75, 0.9, 1.0, 1.5]
+
+
+class Histogram:
+    """Cumulative-on-export histogram with fixed bounds, Prometheus style."""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-th observation
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds + [float('inf')], self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def reset(self):
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def lines(self, name, labels=''):
+        separator = ',' if labels else ''
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels}{separator}le="{bound}"}} {cumulative}'
+        yield f'{name}_bucket{{{labels}{separator}le="+Inf"}} {self.count}'
+        yield f'{name}_sum{{{labels}}} {self.sum}' if labels else f'{name}_sum {self.sum}'
+        yield f'{name}_count{{{labels}}} {self.count}' if labels else f'{name}_count {self.count}'
+
+
+class PluginStats:
+    __slots__ = ('seconds', 'calls', 'max')
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.calls = 0
+        self.max = 0.0
+
+
+class Timed(base.Plugin):
+    """Runs one plugin and adds its wall time to the profiler."""
+
+    def __init__(self, plugin, stats):
+        self.plugin = plugin
+        self.stats = stats
+        self.native = base.is_native(plugin)
+        self.in_place = False if self.native else plugin.in_place
+
+    def reset(self):
+        self.plugin.reset()
+
+    def render(self, audio, sample_rate):
+        started = time.perf_counter()
+        if self.native:
+            audio = self.plugin(audio, sample_rate, audio.shape[-1], False)
+        else:
+            audio = self.plugin.render(audio, sample_rate)
+        elapsed = time.perf_counter() - started
+
+        stats = self.stats
+        stats.seconds += elapsed
+        stats.calls += 1
+        if elapsed > stats.max:
+            stats.max = elapsed
+        return audio
+
+
+def children(plugin):
+    if isinstance(plugin, (pedalboard.Chain, pedalboard.Mix, pedalboard.Pedalboard, base.Board)):
+        return list(plugin)
+    return None
+
+
+def instrument(board, plugin_stats, prefix=''):
+    """Rebuilds a board as Python containers with every leaf plugin wrapped in Timed.
+
+    The leaves are the board's own plugin objects, so their state carries
+    over when profiling is switched on or off.
+    """
+    return base.Board([stage(index, plugin, plugin_stats, prefix) for index, plugin in enumerate(board)])
+
+
+def stage(index, plugin, plugin_stats, prefix):
+    # Paths are the effects.Registry ids, so /metrics joins with the effects list
+    path = f"{prefix}{index}:{type(plugin).__name__}"
+    nested = children(plugin)
+    if nested is None:
+        return Timed(plugin, plugin_stats.setdefault(path, PluginStats()))
+    if isinstance(plugin, (pedalboard.Mix, base.Mix)):
+        # Every branch keeps its own index, or siblings would share stats
+        branches = [base.Board([stage(branch, child, plugin_stats, f"{path}/")]) for branch, child in enumerate(nested)]
+        return type(plugin)(branches) if isinstance(plugin, base.Mix) else base.Mix(branches)
+    return instrument(nested, plugin_stats, f"{path}/")
+
+
+class Profiler:
+    """Hot-path instrumentation of the process callback.
+
+    Disabled, the callback only pays for one attribute check. Enabled, it
+    records a wall time and DSP load histogram per block; with `per_plugin`
+    the board runs through an instrumented copy that times every plugin,
+    including the ones nested in Chain and Mix. Xruns are always counted.
+
+    The instrumented copy is built off the audio thread by `prepare` and
+    published as one `(board, instrumented)` tuple, which the callback reads
+    once per block and only uses while its board is the one it was built for.
+    """
+
+    def __init__(self, xrun_history=32):
+        self.enabled = False
+        self.per_plugin = False
+        self.callback = Histogram(CALLBACK_BUCKETS)
+        self.load = Histogram(LOAD_BUCKETS)
+        self.load_max = 0.0
+        self.last_load = 0.0
+        self.plugins = {}
+        self.xruns = 0
+        self.xrun_times = collections.deque(maxlen=xrun_history)
+        self.current = None
+
+    def configure(self, enabled=None, per_plugin=None, board=None, shedder=None):
+        if enabled is not None:
+            self.enabled = bool(enabled)
+        if per_plugin is not None:
+            self.per_plugin = bool(per_plugin)
+        # Per-plugin timing is part of profiling, never on its own
+        self.per_plugin = self.per_plugin and self.enabled
+        self.prepare(board, shedder)
+
+    def prepare(self, board, shedder=None):
+        """Instruments `board` as the callback will run it, behind `shedder` when that is on."""
+        if not self.per_plugin or board is None:
+            self.current = None
+            return
+        if shedder is not None and shedder.enabled:
+            board = shedder.board(board)
+        self.current = (board, instrument(board, self.plugins))
+
+    def reset(self, board=None, shedder=None):
+        self.callback.reset()
+        self.load.reset()
+        self.load_max = 0.0
+        self.plugins = {}
+        # The published copy still holds the old stats, so it is rebuilt with the new ones
+        self.prepare(board, shedder)
+
+    # Audio thread side
+
+    def board(self, board):
+        """The board to run this block, instrumented if per-plugin timing is on."""
+        current = self.current
+        if current is None or current[0] is not board:
+            return board
+        return current[1]
+
+    def record_block(self, elapsed, load):
+        self.callback.observe(elapsed)
+        self.load.observe(load)
+        self.last_load = load
+        if load > self.load_max:
+            self.load_max = load
+
+    def record_xrun(self, delay):
+        self.xruns += 1
+        self.xrun_times.append((time.time(), delay))
+
+    # Readers
+
+    def summary(self):
+        """Compact view for the realtime stream."""
+        return {
+            'enabled': self.enabled,
+            'callback_p50': self.callback.quantile(0.5),
+            'callback_p99': self.callback.quantile(0.99),
+            'dsp_load': self.last_load,
+            'dsp_load_max': self.load_max,
+            'xruns': self.xruns,
+            'last_xruns': [timestamp for timestamp, _ in self.xrun_times],
+            'plugins': {path: stats.seconds / stats.calls for path, stats in list(self.plugins.items()) if stats.calls},
+        }
+
+    def prometheus(self):
+        lines = [
+            '# HELP resobox_profiling_enabled Whether callback profiling is switched on',
+            '# TYPE resobox_profiling_enabled gauge',
+            f'resobox_profiling_enabled {int(self.enabled)}',
+            '# HELP resobox_callback_seconds Wall time of the audio process callback',
+            '# TYPE resobox_callback_seconds histogram',
+            *self.callback.lines('resobox_callback_seconds'),
+            '# HELP resobox_dsp_load Callback time as a fraction of the period',
+            '# TYPE resobox_dsp_load histogram',
+            *self.load.lines('resobox_dsp_load'),
+            '# HELP resobox_dsp_load_max Highest DSP load seen since the last reset',
+            '# TYPE resobox_dsp_load_max gauge',
+            f'resobox_dsp_load_max {self.load_max}',
+            '# HELP resobox_xruns_total JACK xruns',
+            '# TYPE resobox_xruns_total counter',
+            f'resobox_xruns_total {self.xruns}',
+        ]
+        if self.xrun_times:
+            timestamp, delay = self.xrun_times[-1]
+            lines += [
+                '# HELP resobox_last_xrun_timestamp_seconds Unix time of the last xrun',
+                '# TYPE resobox_last_xrun_timestamp_seconds gauge',
+                f'resobox_last_xrun_timestamp_seconds {timestamp}',
+                '# HELP resobox_last_xrun_delay_microseconds Delay reported for the last xrun',
+                '# TYPE resobox_last_xrun_delay_microseconds gauge',
+                f'resobox_last_xrun_delay_microseconds {delay}',
+            ]
+
+        plugins = list(self.plugins.items())
+        if plugins:
+            lines += [
+                '# HELP resobox_plugin_seconds_total Time spent inside each plugin',
+                '# TYPE resobox_plugin_seconds_total counter',
+                *(f'resobox_plugin_seconds_total{{plugin="{path}"}} {stats.seconds}' for path, stats in plugins),
+                '# HELP resobox_plugin_calls_total Blocks processed by each plugin',
+                '# TYPE resobox_plugin_calls_total counter',
+                *(f'resobox_plugin_calls_total{{plugin="{path}"}} {stats.calls}' for path, stats in plugins),
+                '# HELP resobox_plugin_max_seconds Slowest block of each plugin',
+                '# TYPE resobox_plugin_max_seconds gauge',
+                *(f'resobox_plugin_max_seconds{{plugin="{path}"}} {stats.max}' for path, stats in plugins),
+            ]
+        return '\n'.join(lines) + '\n'
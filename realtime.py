@@ -1,37 +1,315 @@
 import asyncio
 import json
+import struct
 import websockets
 import config
+import effects
+import telemetry
+import instances
 
-# WebSocket Handling
-async def websocket_handler(websocket, path):
-    global config
-    try:
+from urllib.parse import urlparse, parse_qs
+
+# Every field a client can subscribe to, in binary field id order
+FIELDS = [
+    'audio',
+    'recording',
+    'recording_start_time',
+    'output_rms',
+    'input_rms',
+    'output_peak',
+    'input_peak',
+    'dsp_load',
+    'xruns',
+    'looper',
+    'effects',
+    'profile',
+    'shedding',
+    'engine',
+    'instances',
+    'effects_version',
+]
+
+# Binary encoding of the numeric fields, everything else is a JSON blob
+FIELD_FORMATS = {
+    'output_rms': struct.Struct('<f'),
+    'input_rms': struct.Struct('<f'),
+    'output_peak': struct.Struct('<2f'),
+    'input_peak': struct.Struct('<2f'),
+    'dsp_load': struct.Struct('<f'),
+    'xruns': struct.Struct('<I'),
+    'effects_version': struct.Struct('<I'),
+}
+
+# magic, version, kind, sequence, field count
+HEADER = struct.Struct('<BBBIB')
+MAGIC = 0x52
+VERSION = 1
+KEYFRAME = 0
+DELTA = 1
+
+BLOB_LENGTH = struct.Struct('<I')
+
+
+def collect(segment, audio=True):
+    """One snapshot of everything the UI can see, taken once per tick.
+
+    The analyzer only works while `audio` is asked for, so it costs
+    nothing when no client subscribes to the spectrum.
+    """
+    levels = segment.snapshot()
+    # Parameters ramp on the audio thread, so they are read every tick;
+    # the list stays the same object until one of them changes
+    registry = effects.refresh(config)
+    return {
+        'audio': config.analyzer.request() if audio else config.analyzer.latest,
+        'recording': config.recorder.active,
+        'recording_start_time': config.recorder.start_time,
+        'output_rms': levels['output_rms'],
+        'input_rms': levels['input_rms'],
+        'output_peak': levels['output_peak'],
+        'input_peak': levels['input_peak'],
+        'dsp_load': levels['dsp_load'],
+        'xruns': levels['xruns'],
+        'looper': config.looper.status(),
+        'effects': registry.status,
+        'profile': config.profiler.summary(),
+        'shedding': {
+            'level': levels['shed_level'],
+            'steps': config.shedder.shed_steps,
+            'transitions': levels['shed_transitions']
+        },
+        'engine': config.pipeline.stats() if config.pipeline is not None else {'mode': 'direct', 'latency_mode': config.latency_mode, 'latency_frames': config.processing_block - config.block_size},
+        'instances': instances.snapshot(),
+        'effects_version': registry.version
+    }
+
+
+def json_values(values):
+    values = dict(values)
+    # The UI has always received the levels as strings
+    for field in ('output_rms', 'input_rms'):
+        if field in values:
+            values[field] = str(values[field])
+    return values
+
+
+def encode_binary(kind, sequence, values):
+    parts = [HEADER.pack(MAGIC, VERSION, kind, sequence & 0xFFFFFFFF, len(values))]
+    for field, value in values.items():
+        parts.append(bytes((FIELDS.index(field),)))
+        field_format = FIELD_FORMATS.get(field)
+        if field_format is None:
+            blob = json.dumps(value).encode()
+            parts.append(BLOB_LENGTH.pack(len(blob)))
+            parts.append(blob)
+        elif isinstance(value, (list, tuple)):
+            parts.append(field_format.pack(*value))
+        else:
+            parts.append(field_format.pack(value))
+    return b''.join(parts)
+
+
+class Subscriber:
+    """One connected client with a bounded queue of outgoing frames.
+
+    A client that cannot keep up has its stale frames dropped and is sent a
+    keyframe next, so it never stalls the others and never applies a delta
+    on top of a state it missed.
+    """
+
+    def __init__(self, websocket, queue_size=4):
+        self.websocket = websocket
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.fields = tuple(FIELDS)
+        self.format = 'json'
+        self.deltas = False
+        self.rate = None
+        self.needs_keyframe = True
+        self.dropped = 0
+
+    def configure(self, options):
+        # Checked first, so a malformed subscription changes nothing
+        rate = self.rate
+        if 'rate' in options:
+            rate = float(options['rate']) if options['rate'] else None
+            if rate is not None and not 0 < rate < float('inf'):
+                raise ValueError(f"Bad rate {options['rate']}")
+        fields = options.get('fields', options.get('subscribe'))
+        if fields is not None:
+            if isinstance(fields, str):
+                fields = fields.split(',')
+            self.fields = tuple(field for field in FIELDS if field in fields)
+        if 'format' in options:
+            self.format = 'binary' if options['format'] == 'binary' else 'json'
+            # Binary clients get deltas unless they ask otherwise
+            self.deltas = self.format == 'binary'
+        if 'deltas' in options:
+            self.deltas = options['deltas'] not in (False, 'false', '0', 0)
+        self.rate = rate
+        self.needs_keyframe = True
+
+    @property
+    def group(self):
+        return (self.fields, self.format, self.deltas, self.divisor)
+
+    @property
+    def divisor(self):
+        # Ticks per frame for the requested rate in frames per second
+        if not self.rate:
+            return 1
+        return max(1, round(1 / (self.rate * config.websocket_sleep_time)))
+
+    def offer(self, frame):
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+                self.dropped += 1
+            self.needs_keyframe = True
+
+    async def pump(self):
+        try:
+            while True:
+                await self.websocket.send(await self.queue.get())
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+
+class Group:
+    """Subscribers sharing fields, format, delta mode and rate: every frame
+    is serialized once for all of them."""
+
+    def __init__(self, fields, format, deltas, divisor):
+        self.fields = fields
+        self.format = format
+        self.deltas = deltas
+        self.divisor = divisor
+        self.previous = None
+        self.sequence = 0
+        self.since_keyframe = 0
+
+    def encode(self, kind, values):
+        if self.format == 'binary':
+            return encode_binary(kind, self.sequence, values)
+        if self.deltas:
+            return json.dumps({'kind': 'keyframe' if kind == KEYFRAME else 'delta', 'sequence': self.sequence, 'values': json_values(values)})
+        return json.dumps(json_values(values))
+
+    def publish(self, snapshot, members):
+        values = {field: snapshot[field] for field in self.fields}
+        changed = values if self.previous is None else {field: value for field, value in values.items() if self.previous[field] != value}
+        self.previous = values
+        self.since_keyframe += 1
+
+        periodic = self.since_keyframe >= config.websocket_keyframe_interval
+        if periodic:
+            self.since_keyframe = 0
+            for subscriber in members:
+                subscriber.needs_keyframe = True
+
+        waiting = [subscriber for subscriber in members if subscriber.needs_keyframe]
+        if not changed and not waiting:
+            return
+
+        self.sequence += 1
+        keyframe = None
+        delta = None
+        for subscriber in members:
+            if subscriber.needs_keyframe or not self.deltas:
+                if keyframe is None:
+                    keyframe = self.encode(KEYFRAME, values)
+                subscriber.needs_keyframe = False
+                subscriber.offer(keyframe)
+            elif changed:
+                if delta is None:
+                    delta = self.encode(DELTA, changed)
+                subscriber.offer(delta)
+
+
+class Broadcaster:
+    """Single producer: takes one snapshot per tick and fans it out."""
+
+    def __init__(self):
+        self.subscribers = set()
+        self.groups = {}
+        self.tick = 0
+
+    def add(self, subscriber):
+        self.subscribers.add(subscriber)
+
+    def remove(self, subscriber):
+        self.subscribers.discard(subscriber)
+
+    async def run(self):
+        segment = telemetry.segment()
         while True:
-            # Формируем данные для отправки, включая ID каждого эффекта
-            data = {
-                'audio': {
-                    'input': None,
-                    'output': None
-                },
-                'recording': None,
-                'recording_start_time': None,
-                'output_rms': str(config.output_rms),
-                'input_rms': str(config.input_rms),
-                'looper': None,
-                'effects': config.effects_status
-            }
-            await websocket.send(json.dumps(data))
+            if self.subscribers:
+                audio = any('audio' in subscriber.fields for subscriber in self.subscribers)
+                self.publish(collect(segment, audio))
+            self.tick += 1
             await asyncio.sleep(config.websocket_sleep_time)
+
+    def publish(self, snapshot):
+        members = {}
+        for subscriber in self.subscribers:
+            members.setdefault(subscriber.group, []).append(subscriber)
+
+        # Groups nobody belongs to any more are forgotten
+        for key in list(self.groups):
+            if key not in members:
+                del self.groups[key]
+
+        for key, subscribers in members.items():
+            group = self.groups.get(key)
+            if group is None:
+                group = self.groups[key] = Group(*key)
+            if self.tick % group.divisor == 0:
+                group.publish(snapshot, subscribers)
+
+
+broadcaster = Broadcaster()
+
+
+def request_options(websocket, path):
+    # Initial subscription from the query string, e.g. /?format=binary&rate=10
+    if path is None:
+        request = getattr(websocket, 'request', None)
+        path = getattr(request, 'path', None) or getattr(websocket, 'path', '/')
+    return {key: values[-1] for key, values in parse_qs(urlparse(path).query).items()}
+
+
+# WebSocket Handling
+async def websocket_handler(websocket, path=None):
+    subscriber = Subscriber(websocket)
+    broadcaster.add(subscriber)
+    pump = asyncio.create_task(subscriber.pump())
+    try:
+        # Initial subscription from the query string, the defaults if it is malformed
+        try:
+            subscriber.configure(request_options(websocket, path))
+        except (ValueError, TypeError, AttributeError):
+            print("🛑 WebSocket: ignoring malformed subscription")
+        # Clients may change their subscription at any time with a JSON message
+        async for message in websocket:
+            try:
+                subscriber.configure(json.loads(message))
+            except (ValueError, TypeError, AttributeError):
+                print("🛑 WebSocket: ignoring malformed subscription")
+        print("🛑 WebSocket connection closed normally.")
     except websockets.exceptions.ConnectionClosedOK:
         print("🛑 WebSocket connection closed normally.")
     except Exception as e:
         print(f"🛑 WebSocket error: {e}")
+    finally:
+        broadcaster.remove(subscriber)
+        pump.cancel()
 
 async def websocket_server():
     print("\n✨ WebSocket started\n")
-    async with websockets.serve(websocket_handler, '0.0.0.0', 8765):
-        await asyncio.Future()  # Run forever
-
-def start_websocket_server():
-    asyncio.run(websocket_server())
\ No newline at end of file
+    producer = asyncio.create_task(broadcaster.run())
+    try:
+        async with websockets.serve(websocket_handler, '0.0.0.0', 8765):
+            await asyncio.Future()  # Run forever
+    finally:
+        producer.cancel()
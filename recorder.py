@@ -0,0 +1,152 @@
+import os
+import time
+import threading
+import numpy
+import soundfile
+
+
+class AudioRing:
+    """Preallocated single-producer/single-consumer ring of audio frames.
+
+    The audio thread only copies blocks in and moves `written`, the writer
+    thread only copies chunks out and moves `read`. A block that does not
+    fit is dropped whole and counted, the audio thread never waits.
+    """
+
+    def __init__(self, channels, capacity):
+        self.channels = channels
+        self.capacity = capacity
+        self.buffer = numpy.zeros((channels, capacity), dtype=numpy.float32)
+        self.written = 0
+        self.read = 0
+        self.overruns = 0
+
+    def available(self):
+        return self.written - self.read
+
+    def write(self, blocks):
+        """Copies one block, given as a list of per-channel buffers."""
+        frames = len(blocks[0])
+        if self.capacity - (self.written - self.read) < frames:
+            self.overruns += 1
+            return False
+
+        start = self.written % self.capacity
+        first = min(frames, self.capacity - start)
+        for channel, block in enumerate(blocks):
+            self.buffer[channel, start:start + first] = block[:first]
+            if first < frames:
+                self.buffer[channel, :frames - first] = block[first:]
+        self.written += frames
+        return True
+
+    def read_into(self, target):
+        """Copies up to len(target) frames into target (frames, channels); returns the count."""
+        frames = min(self.available(), len(target))
+        start = self.read % self.capacity
+        first = min(frames, self.capacity - start)
+        target[:first] = self.buffer[:, start:start + first].T
+        if first < frames:
+            target[first:frames] = self.buffer[:, :frames - first].T
+        self.read += frames
+        return frames
+
+
+class Recorder:
+    """Streams the box output to disk.
+
+    The process callback calls write() with the output port buffers, which
+    only copies into the ring. A writer thread drains the ring in chunks of
+    `chunk_seconds` with soundfile, so the disk sees large sequential
+    writes and the audio thread never touches a file or allocates.
+    """
+
+    def __init__(self, channels=2, buffer_seconds=10.0, chunk_seconds=1.0, directory='recordings', format='FLAC', subtype='PCM_24'):
+        self.channels = channels
+        self.buffer_seconds = buffer_seconds
+        self.chunk_seconds = chunk_seconds
+        self.directory = directory
+        self.format = format
+        self.subtype = subtype
+        self.ring = None
+        self.active = False
+        self.start_time = None
+        self.path = None
+        self.thread = None
+        self.frames_written = 0
+        self.sample_rate = 0
+
+    def prepare(self, sample_rate):
+        """Allocates the ring; never called from the audio thread."""
+        capacity = int(self.buffer_seconds * sample_rate)
+        if self.ring is None or self.ring.capacity != capacity:
+            self.ring = AudioRing(self.channels, capacity)
+
+    # Audio thread side
+
+    def write(self, blocks):
+        if self.active:
+            self.ring.write(blocks)
+
+    # Control plane side
+
+    def start(self, sample_rate, path=None):
+        if self.active:
+            return self.path
+        self.prepare(sample_rate)
+        self.ring.read = self.ring.written
+        self.ring.overruns = 0
+
+        if path is None:
+            os.makedirs(self.directory, exist_ok=True)
+            extension = 'flac' if self.format == 'FLAC' else self.format.lower()
+            path = os.path.join(self.directory, time.strftime(f'%Y%m%d-%H%M%S.{extension}'))
+        self.path = path
+        self.frames_written = 0
+        self.sample_rate = sample_rate
+        sound_file = soundfile.SoundFile(path, 'w', samplerate=sample_rate, channels=self.channels, format=self.format, subtype=self.subtype)
+        chunk = numpy.zeros((int(self.chunk_seconds * sample_rate), self.channels), dtype=numpy.float32)
+
+        self.start_time = time.time()
+        self.active = True
+        self.thread = threading.Thread(target=self.drain, args=(sound_file, chunk), name='recorder', daemon=True)
+        self.thread.start()
+        print(f"⏺ Recording to {path}")
+        return path
+
+    def stop(self):
+        if not self.active:
+            return None
+        self.active = False
+        self.thread.join()
+        self.thread = None
+        self.start_time = None
+        print(f"⏹ Recorded {self.frames_written} frames to {self.path}, {self.ring.overruns} overruns")
+        return self.path
+
+    def toggle(self, sample_rate):
+        return self.stop() if self.active else self.start(sample_rate)
+
+    def drain(self, sound_file, chunk):
+        # Wakes every quarter chunk and writes only full chunks, then the rest at the end
+        interval = self.chunk_seconds / 4
+        with sound_file:
+            while self.active:
+                if self.ring.available() >= len(chunk):
+                    frames = self.ring.read_into(chunk)
+                    sound_file.write(chunk[:frames])
+                    self.frames_written += frames
+                else:
+                    time.sleep(interval)
+            while self.ring.available():
+                frames = self.ring.read_into(chunk)
+                sound_file.write(chunk[:frames])
+                self.frames_written += frames
+
+    def status(self):
+        return {
+            'active': self.active,
+            'path': self.path,
+            'seconds': self.frames_written / self.sample_rate if self.sample_rate else 0.0,
+            'overruns': self.ring.overruns if self.ring else 0,
+        }
@@ -0,0 +1,177 @@
+import os
+import time
+import argparse
+import numpy
+import soundfile
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import effects
+import presets
+
+# Below this peak a window of the tail counts as silence (-90 dBFS)
+SILENCE = 10 ** (-90 / 20)
+
+# Boards of this worker process by (preset, sample rate), reset for every file
+_boards = {}
+
+
+def cores():
+    return len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+
+
+def audio_files(directory):
+    extensions = {'.' + name.lower() for name in soundfile.available_formats()}
+    return sorted(
+        os.path.join(directory, filename)
+        for filename in os.listdir(directory)
+        if os.path.splitext(filename)[1].lower() in extensions
+    )
+
+
+def output_names(files):
+    """Output name per input: its path relative to the inputs' common directory, without extension.
+
+    Raises ValueError when two inputs would still write the same file,
+    e.g. take.wav and take.flac.
+    """
+    if not files:
+        return {}
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in files])
+    names = {path: os.path.splitext(os.path.relpath(os.path.abspath(path), root))[0] for path in files}
+    seen = {}
+    for path, name in names.items():
+        if name in seen:
+            raise ValueError(f"{seen[name]} and {path} would both render to {name}")
+        seen[name] = path
+    return names
+
+
+def mixing_matrix(inputs, outputs):
+    """(outputs, inputs) gains: a mono input feeds every output, extra inputs are averaged in."""
+    matrix = numpy.zeros((outputs, inputs), dtype=numpy.float32)
+    if outputs >= inputs:
+        for output in range(outputs):
+            matrix[output, output % inputs] = 1.0
+    else:
+        for source in range(inputs):
+            matrix[source % outputs, source] = 1.0
+        matrix /= matrix.sum(axis=1, keepdims=True)
+    return matrix
+
+
+def board_for(preset, sample_rate):
+    board = _boards.get((preset, sample_rate))
+    if board is None:
+        board = _boards[(preset, sample_rate)] = presets.build(presets.load(preset), sample_rate)
+    board.reset()
+    return board
+
+
+def longest_delay(board):
+    # Between two echoes of a dry delay the output is silent for up to this long
+    return max((float(getattr(entry.plugin, 'delay_seconds', 0.0)) for entry in effects.Registry(board).entries), default=0.0)
+
+
+def render_file(path, preset, output_directory, chunk_seconds=5.0, channels=2, max_tail=30.0, format='WAV', subtype='PCM_24', name=None):
+    """Streams one file through a preset's board; returns (output path, audio seconds, CPU seconds).
+
+    The file is read and written in chunks of `chunk_seconds`, and the board
+    keeps its state from one chunk to the next, exactly as it does from one
+    JACK period to the next. Once the input ends, silence keeps going in
+    until a whole window of output is below -90 dBFS, so reverb, delay and
+    convolution tails ring out. The window is longer than the longest delay
+    on the board, so the gap between two echoes never ends a tail early.
+    The output is `name`, by default the input's base name, under a
+    directory per preset.
+    """
+    started = time.process_time()
+    with soundfile.SoundFile(path) as source:
+        sample_rate = source.samplerate
+        board = board_for(preset, sample_rate)
+        chunk = int(chunk_seconds * sample_rate)
+        window = int(max(0.5, longest_delay(board) + 0.1) * sample_rate)
+
+        name = name or os.path.splitext(os.path.basename(path))[0]
+        extension = 'flac' if format == 'FLAC' else format.lower()
+        output_path = os.path.join(output_directory, preset, f"{name}.{extension}")
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+        # Mono DI goes into every input, as on the pedal with one capture
+        # port; more channels than the board takes are averaged down
+        mix = mixing_matrix(source.channels, channels)
+        frames = numpy.zeros((chunk, source.channels), dtype=numpy.float32)
+        planar = numpy.zeros((channels, chunk), dtype=numpy.float32)
+        with soundfile.SoundFile(output_path, 'w', samplerate=sample_rate, channels=channels, format=format, subtype=subtype) as target:
+            while True:
+                count = len(source.read(out=frames))
+                if count == 0:
+                    break
+                numpy.matmul(mix, frames[:count].T, out=planar[:, :count])
+                processed = board(planar[:, :count], sample_rate, 8192, False)
+                target.write(processed.T)
+
+            silence = numpy.zeros((channels, window), dtype=numpy.float32)
+            for _ in range(int(numpy.ceil(max_tail * sample_rate / window))):
+                processed = board(silence, sample_rate, 8192, False)
+                target.write(processed.T)
+                if processed.size == 0 or numpy.abs(processed).max() < SILENCE:
+                    break
+
+        seconds = source.frames / sample_rate
+    return output_path, seconds, time.process_time() - started
+
+
+def render(files, preset_names, output_directory, workers=None, **options):
+    """Renders every file through every preset on a process pool; yields results as they finish."""
+    workers = workers or cores()
+    names = output_names(files)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(render_file, path, preset, output_directory, name=names[path], **options): (path, preset)
+            for preset in preset_names
+            for path in files
+        }
+        for future in as_completed(futures):
+            path, preset = futures[future]
+            yield path, preset, future.result()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="🎛 ResoBox offline render: reamp a directory of recordings through presets")
+    parser.add_argument('input', help="Directory of audio files")
+    parser.add_argument('--preset', action='append', help="Preset to render through, may be given several times (default: default)")
+    parser.add_argument('--output', default='renders', help="Output directory, one subdirectory per preset")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes, one per core by default")
+    parser.add_argument('--chunk-seconds', type=float, default=5.0)
+    parser.add_argument('--max-tail', type=float, default=30.0, help="Longest tail rendered after the input ends, in seconds")
+    parser.add_argument('--channels', type=int, default=2)
+    parser.add_argument('--format', default='WAV')
+    parser.add_argument('--subtype', default='PCM_24')
+    args = parser.parse_args()
+
+    files = audio_files(args.input)
+    preset_names = args.preset or ['default']
+    workers = args.workers or cores()
+    if not files:
+        parser.error(f"No audio files in {args.input}")
+    try:
+        output_names(files)
+    except ValueError as e:
+        parser.error(str(e))
+
+    print(f"🎚 Rendering {len(files)} files through {', '.join(preset_names)} on {workers} workers")
+    started = time.perf_counter()
+    audio_seconds = 0.0
+    cpu_seconds = 0.0
+    for path, preset, (output_path, seconds, cpu) in render(
+        files, preset_names, args.output, workers,
+        chunk_seconds=args.chunk_seconds, channels=args.channels, max_tail=args.max_tail, format=args.format, subtype=args.subtype,
+    ):
+        audio_seconds += seconds
+        cpu_seconds += cpu
+        print(f"✅ {output_path}: {seconds:.1f} s of audio, {seconds / cpu if cpu else float('inf'):.1f}x realtime")
+
+    wall = time.perf_counter() - started
+    print(f"\n⏱ {audio_seconds:.1f} s of audio in {wall:.1f} s: {audio_seconds / wall:.1f}x realtime overall, "
+          f"{audio_seconds / wall / workers:.1f}x per worker, {audio_seconds / cpu_seconds if cpu_seconds else float('inf'):.1f}x per CPU second")
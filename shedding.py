@@ -0,0 +1,275 @@
+import time
+import random
+import numpy
+import pedalboard
+
+from plugins import base
+
+# Degradation steps, cheapest loss of quality first
+STEPS = ('convolution', 'reverb', 'wet')
+
+
+class Shed(base.Plugin):
+    """Stand-in for a plugin the shedder can swap for something cheaper.
+
+    `fallback` is a cheaper plugin, 'dry' (pass the input through) or
+    'silence' (for a wet branch of a Mix, whose dry branch carries on).
+    Switching runs both sides for `fade_time` and crossfades between them;
+    after that only the selected side costs anything.
+    """
+
+    in_place = False
+
+    def __init__(self, plugin, fallback, fade_time=0.01):
+        self.plugin = plugin
+        self.fallback = fallback
+        self.fade_time = fade_time
+        self.shed = False
+        self.fade_position = 0
+        self.fade_length = 0
+        self.ramp = None
+        self.silence = None
+        self.output = None
+
+    def engage(self):
+        self.switch(True)
+
+    def release(self):
+        self.switch(False)
+
+    def switch(self, shed):
+        if shed == self.shed:
+            return
+        if not shed:
+            # The full plugin comes back from silence, not from a stale tail
+            self.plugin.reset()
+        elif hasattr(self.fallback, 'mix'):
+            # The mix may have been changed on the full plugin since arming
+            self.fallback.mix = self.plugin.mix
+        self.shed = shed
+        self.fade_position = 0
+        self.fade_length = -1  # Sized at the next block, where the sample rate is known
+
+    def reset(self):
+        self.plugin.reset()
+        if isinstance(self.fallback, (pedalboard.Plugin, base.Plugin)):
+            self.fallback.reset()
+        self.fade_length = 0
+
+    def run(self, side, audio, sample_rate):
+        if side == 'dry':
+            return audio
+        if side == 'silence':
+            return self.silence
+        return side(audio, sample_rate, audio.shape[-1], False)
+
+    def render(self, audio, sample_rate):
+        frames = audio.shape[-1]
+        if self.output is None or self.output.shape != audio.shape:
+            self.output = numpy.zeros(audio.shape, dtype=numpy.float32)
+            self.silence = numpy.zeros(audio.shape, dtype=numpy.float32)
+            self.ramp = numpy.zeros(frames, dtype=numpy.float32)
+            self.unit = numpy.arange(frames, dtype=numpy.float32)
+
+        target = self.fallback if self.shed else self.plugin
+        if self.fade_length == 0:
+            return self.run(target, audio, sample_rate)
+
+        if self.fade_length < 0:
+            self.fade_length = max(frames, int(self.fade_time * sample_rate))
+        source = self.plugin if self.shed else self.fallback
+
+        # Gain of the target side, linear over the whole fade
+        numpy.add(self.unit, self.fade_position, out=self.ramp)
+        self.ramp *= 1.0 / self.fade_length
+        numpy.minimum(self.ramp, 1.0, out=self.ramp)
+
+        faded = self.run(source, audio, sample_rate)
+        numpy.subtract(faded, self.run(target, audio, sample_rate), out=self.output)
+        self.output *= self.ramp
+        numpy.subtract(faded, self.output, out=self.output)
+
+        self.fade_position += frames
+        if self.fade_position >= self.fade_length:
+            self.fade_length = 0
+        return self.output
+
+    def __repr__(self):
+        return f"<Shed {self.plugin!r} -> {self.fallback!r}{' (shed)' if self.shed else ''}>"
+
+
+def short_convolution(plugin, sample_rate, fraction, taper=64):
+    """The same convolution with only the head of its impulse response."""
+    impulse = numpy.asarray(plugin.impulse_response, dtype=numpy.float32)
+    length = max(taper, int(impulse.shape[-1] * fraction))
+    head = numpy.array(impulse[..., :length], dtype=numpy.float32)
+    head[..., -taper:] *= numpy.linspace(1, 0, taper, dtype=numpy.float32)
+    return pedalboard.Convolution(head, plugin.mix, sample_rate=sample_rate)
+
+
+def is_dry(plugin):
+    return isinstance(plugin, (pedalboard.Chain, base.Board)) and not isinstance(plugin, base.Mix) and len(plugin) == 0
+
+
+class Armed:
+    """A board rebuilt with Shed stand-ins, and its current degradation level."""
+
+    def __init__(self, board, armed, steps):
+        self.board = board
+        self.armed = armed
+        self.steps = steps
+        self.level = 0
+
+
+def arm(board, sample_rate, order=STEPS, ir_fraction=0.25, fade_time=0.01):
+    """Wraps every sheddable plugin of `board`, returning an Armed.
+
+    Only containers that hold a stand-in are rebuilt (as plugins.base
+    containers); untouched sub-chains stay native and are shared.
+    """
+    targets = {step: [] for step in order}
+
+    def wrap(plugin, fallback, step):
+        shed = Shed(plugin, fallback, fade_time)
+        targets[step].append(shed)
+        return shed
+
+    def visit(plugin):
+        if isinstance(plugin, (pedalboard.Mix, base.Mix)):
+            branches = [visit(branch) for branch in plugin]
+            if 'wet' in targets and any(is_dry(branch) for branch in plugin):
+                # Next to a dry branch, every other branch is a wet path
+                branches = [branch if is_dry(original) else wrap(branch, 'silence', 'wet') for branch, original in zip(branches, plugin)]
+            if all(new is old for new, old in zip(branches, plugin)):
+                return plugin
+            # A ParallelMix stays parallel, a native Mix becomes a plugins.base one
+            return type(plugin)(branches) if isinstance(plugin, base.Mix) else base.Mix(branches)
+
+        if isinstance(plugin, (pedalboard.Chain, pedalboard.Pedalboard, base.Board)):
+            plugins = [visit(child) for child in plugin]
+            if all(new is old for new, old in zip(plugins, plugin)):
+                return plugin
+            return base.Board(plugins)
+
+        if isinstance(plugin, pedalboard.Convolution) and 'convolution' in targets:
+            fallback = short_convolution(plugin, sample_rate, ir_fraction)
+            fallback(numpy.zeros((2, 256), dtype=numpy.float32), sample_rate, 256, False)
+            return wrap(plugin, fallback, 'convolution')
+        if isinstance(plugin, pedalboard.Reverb) and 'reverb' in targets:
+            return wrap(plugin, 'dry', 'reverb')
+        return plugin
+
+    armed = base.Board([visit(plugin) for plugin in board])
+    steps = [(step, targets[step]) for step in order if targets[step]]
+    return Armed(board, armed, steps)
+
+
+class LoadShedder:
+    """Steps the board down when the callback nears its deadline, and back up.
+
+    Fed the DSP load (callback time / period) of every block. `engage_blocks`
+    blocks in a row above `high` shed the next step in priority order;
+    `release_blocks` blocks in a row below `low` restore the last one. The
+    gap between the two thresholds and the much longer release keep it from
+    flapping. Only the process callback calls observe().
+    """
+
+    def __init__(self, order=STEPS, high=0.8, low=0.5, engage_blocks=8, release_blocks=400, ir_fraction=0.25, fade_time=0.01):
+        self.enabled = False
+        self.order = order
+        self.high = high
+        self.low = low
+        self.engage_blocks = engage_blocks
+        self.release_blocks = release_blocks
+        self.ir_fraction = ir_fraction
+        self.fade_time = fade_time
+        self.current = None
+        self.over = 0
+        self.under = 0
+        self.transitions = 0
+
+    def prepare(self, board, sample_rate):
+        """Arms `board` off the audio thread; the callback picks it up by identity."""
+        self.current = arm(board, sample_rate, self.order, self.ir_fraction, self.fade_time)
+
+    def configure(self, enabled=None, board=None, sample_rate=None):
+        if enabled is not None:
+            self.enabled = bool(enabled)
+        if self.enabled and board is not None:
+            self.prepare(board, sample_rate)
+
+    @property
+    def level(self):
+        current = self.current
+        return 0 if current is None else current.level
+
+    @property
+    def shed_steps(self):
+        current = self.current
+        if current is None:
+            return []
+        return [step for step, _ in current.steps[:current.level]]
+
+    # Audio thread side
+
+    def board(self, board):
+        current = self.current
+        if current is None or current.board is not board:
+            return board
+        return current.armed
+
+    def observe(self, load):
+        """Returns True when the level changed this block."""
+        if load > self.high:
+            self.over += 1
+            self.under = 0
+        elif load < self.low:
+            self.under += 1
+            self.over = 0
+        else:
+            self.over = 0
+            self.under = 0
+
+        current = self.current
+        if current is None:
+            return False
+
+        if self.over >= self.engage_blocks and current.level < len(current.steps):
+            for shed in current.steps[current.level][1]:
+                shed.engage()
+            current.level += 1
+        elif self.under >= self.release_blocks and current.level > 0:
+            current.level -= 1
+            for shed in current.steps[current.level][1]:
+                shed.release()
+        else:
+            return False
+
+        self.over = 0
+        self.under = 0
+        self.transitions += 1
+        return True
+
+
+class LoadInjector:
+    """Synthetic load: busy-waits in the callback for a share of the period.
+
+    With `jitter`, every block adds a random extra share up to that amount,
+    which is how spikes on stage look.
+    """
+
+    def __init__(self):
+        self.fraction = 0.0
+        self.jitter = 0.0
+
+    def configure(self, fraction=None, jitter=None):
+        if fraction is not None:
+            self.fraction = max(0.0, float(fraction))
+        if jitter is not None:
+            self.jitter = max(0.0, float(jitter))
+
+    def burn(self, period):
+        # On top of whatever the board already took
+        deadline = time.perf_counter() + period * (self.fraction + self.jitter * random.random())
+        while time.perf_counter() < deadline:
+            pass
@@ -0,0 +1,156 @@
+import os
+import glob
+import string
+import hashlib
+import numpy
+
+from PIL import Image, ImageDraw, ImageFont
+
+SPRITES_PATH = 'assets/sprites'
+FONTS_PATH = 'assets/fonts'
+CACHE_PATH = os.path.join(SPRITES_PATH, '.cache')
+CHARSET = string.printable.strip() + ' '
+ATLAS_VERSION = 1
+
+
+def sprite_bitmap(path, alpha_threshold=255):
+    """1-bit bitmap of a sprite: a pixel is lit where the PNG is opaque enough."""
+    with Image.open(path) as source:
+        alpha = numpy.asarray(source.convert('RGBA'))[:, :, 3]
+    return alpha >= alpha_threshold
+
+
+def glyph_bitmaps(path, size, charset=CHARSET):
+    """Renders every glyph of a font once; returns {char: bitmap} with bitmaps
+    sharing the font's line height, so text rows line up."""
+    font = ImageFont.truetype(path, size)
+    ascent, descent = font.getmetrics()
+    glyphs = {}
+    for char in charset:
+        width = max(1, int(round(font.getlength(char))))
+        image = Image.new('1', (width, ascent + descent), 0)
+        ImageDraw.Draw(image).text((0, 0), char, font=font, fill=1)
+        glyphs[char] = numpy.asarray(image, dtype=bool)
+    return glyphs
+
+
+def sources(sprites_path, fonts_path):
+    return sorted(glob.glob(os.path.join(sprites_path, '*.png'))) + sorted(glob.glob(os.path.join(fonts_path, '*.ttf')))
+
+
+def atlas_key(paths, font_size):
+    sha = hashlib.sha256(f"{ATLAS_VERSION}:{font_size}".encode())
+    for path in paths:
+        sha.update(os.path.basename(path).encode())
+        with open(path, 'rb') as f:
+            sha.update(hashlib.sha256(f.read()).digest())
+    return sha.hexdigest()[:24]
+
+
+class Atlas:
+    """Every sprite and font glyph of the box, converted to 1-bit once.
+
+    Sprites are keyed by file name without extension, glyphs by
+    (font name, char). The converted atlas is stored under the cache
+    directory, so later starts only load one .npz file.
+    """
+
+    def __init__(self, sprites, glyphs):
+        self.sprites = sprites
+        self.glyphs = glyphs
+
+    @classmethod
+    def build(cls, sprites_path=SPRITES_PATH, fonts_path=FONTS_PATH, font_size=16):
+        sprites = {}
+        glyphs = {}
+        for path in sorted(glob.glob(os.path.join(sprites_path, '*.png'))):
+            sprites[os.path.splitext(os.path.basename(path))[0]] = sprite_bitmap(path)
+        for path in sorted(glob.glob(os.path.join(fonts_path, '*.ttf'))):
+            font_name = os.path.splitext(os.path.basename(path))[0]
+            for char, bitmap in glyph_bitmaps(path, font_size).items():
+                glyphs[(font_name, char)] = bitmap
+        return cls(sprites, glyphs)
+
+    @classmethod
+    def load(cls, sprites_path=SPRITES_PATH, fonts_path=FONTS_PATH, font_size=16, cache_path=CACHE_PATH):
+        cached = os.path.join(cache_path, f"atlas-{atlas_key(sources(sprites_path, fonts_path), font_size)}.npz")
+        if os.path.exists(cached):
+            with numpy.load(cached) as data:
+                sprites = {}
+                glyphs = {}
+                for name in data.files:
+                    kind, _, key = name.partition(':')
+                    if kind == 'sprite':
+                        sprites[key] = data[name]
+                    else:
+                        font_name, _, code = key.rpartition(':')
+                        glyphs[(font_name, chr(int(code)))] = data[name]
+                return cls(sprites, glyphs)
+
+        atlas = cls.build(sprites_path, fonts_path, font_size)
+        os.makedirs(cache_path, exist_ok=True)
+        arrays = {f"sprite:{name}": bitmap for name, bitmap in atlas.sprites.items()}
+        arrays.update({f"glyph:{font_name}:{ord(char)}": bitmap for (font_name, char), bitmap in atlas.glyphs.items()})
+        partial = f"{cached}.{os.getpid()}.tmp.npz"
+        numpy.savez_compressed(partial, **arrays)
+        os.replace(partial, cached)
+        return atlas
+
+
+class Compositor:
+    """Blits 1-bit sprites and text onto a canvas with NumPy."""
+
+    def __init__(self, atlas, width, height):
+        self.atlas = atlas
+        self.width = width
+        self.height = height
+        self.canvas = numpy.zeros((height, width), dtype=bool)
+
+    def clear(self):
+        self.canvas.fill(False)
+
+    def blit(self, bitmap, x, y):
+        # Clip the bitmap against the canvas, then OR it in
+        height, width = bitmap.shape
+        left, top = max(0, x), max(0, y)
+        right, bottom = min(self.width, x + width), min(self.height, y + height)
+        if left >= right or top >= bottom:
+            return
+        self.canvas[top:bottom, left:right] |= bitmap[top - y:bottom - y, left - x:right - x]
+
+    def sprite(self, name, x, y):
+        self.blit(self.atlas.sprites[name], x, y)
+
+    def text(self, text, x, y, font):
+        for char in text:
+            glyph = self.atlas.glyphs.get((font, char))
+            if glyph is None:
+                continue
+            self.blit(glyph, x, y)
+            x += glyph.shape[1]
+
+    def pack(self):
+        """The canvas as rows of MSB-first bytes, the display framebuffer format."""
+        return numpy.packbits(self.canvas, axis=1)
+
+
+class FrameLoop:
+    """Memoized periodic animation: every frame is rendered once, then replayed."""
+
+    def __init__(self, compositor, period, render):
+        self.period = period
+        self.frames = numpy.zeros((period, compositor.height, compositor.width // 8), dtype=numpy.uint8)
+        for index in range(period):
+            compositor.clear()
+            render(compositor, index)
+            self.frames[index] = compositor.pack()
+        self.frames.setflags(write=False)
+
+    def frame(self, index):
+        return self.frames[index % self.period]
+
+
+def level_rows(width):
+    """Packed bottom rows for a level bar of 0..width lit pixels."""
+    rows = numpy.tri(width + 1, width, -1, dtype=bool)
+    return numpy.packbits(rows, axis=1)
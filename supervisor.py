@@ -0,0 +1,106 @@
+import time
+import signal
+import asyncio
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+
+class Supervisor:
+    """Runs every control plane service as a task of one event loop.
+
+    A service is a coroutine function that runs until it is cancelled. When
+    it raises or returns it is started again after `backoff` seconds,
+    doubled on every failure up to `max_backoff` and reset once the service
+    has stayed up for `healthy_after` seconds, so a busy port or a missing
+    JACK server never turns into a restart storm.
+
+    SIGINT and SIGTERM only set an event; the loop then cancels the
+    services and waits up to `shutdown_timeout` seconds for their cleanup
+    before run() returns.
+    """
+
+    def __init__(self, backoff=0.5, max_backoff=30.0, healthy_after=60.0, shutdown_timeout=3.0):
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.healthy_after = healthy_after
+        self.shutdown_timeout = shutdown_timeout
+        self.tasks = {}
+        self.restarts = {}
+        self.stopping = None
+        self.loop = None
+
+    def start(self, name, service):
+        self.restarts[name] = 0
+        self.tasks[name] = asyncio.get_running_loop().create_task(self.supervise(name, service), name=name)
+
+    async def supervise(self, name, service):
+        delay = self.backoff
+        while True:
+            started = time.monotonic()
+            try:
+                await service()
+                print(f"🛑 {name} stopped, restarting in {delay:g} s")
+            except Exception as e:
+                print(f"🛑 {name} failed: {e!r}, restarting in {delay:g} s")
+
+            if time.monotonic() - started >= self.healthy_after:
+                delay = self.backoff
+            self.restarts[name] += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_backoff)
+
+    def stop(self):
+        # Safe from any thread, signal handlers call it on the loop itself
+        if self.stopping is not None:
+            self.loop.call_soon_threadsafe(self.stopping.set)
+
+    async def run(self, main=None, handle_signals=True):
+        """Calls `main(self)` to start the services, then serves until stopped."""
+        loop = self.loop = asyncio.get_running_loop()
+        self.stopping = asyncio.Event()
+        # Only the main thread may install signal handlers
+        signals = (signal.SIGINT, signal.SIGTERM) if handle_signals else ()
+        for signum in signals:
+            loop.add_signal_handler(signum, self.stop)
+        try:
+            if main is not None:
+                await main(self)
+            await self.stopping.wait()
+        finally:
+            print("\n💀 Closing...")
+            tasks = list(self.tasks.values())
+            for task in tasks:
+                task.cancel()
+            # Services release ports, clients and segments in their finally blocks
+            if tasks:
+                _, pending = await asyncio.wait(tasks, timeout=self.shutdown_timeout)
+                for task in pending:
+                    print(f"🛑 {task.get_name()} did not stop within {self.shutdown_timeout:g} s, leaving it")
+            for signum in signals:
+                loop.remove_signal_handler(signum)
+
+    def status(self):
+        return {name: {'running': not task.done(), 'restarts': self.restarts[name]} for name, task in self.tasks.items()}
+
+
+def new_event_loop(use_uvloop=True):
+    if use_uvloop and uvloop is not None:
+        return uvloop.new_event_loop()
+    return asyncio.new_event_loop()
+
+
+def run(main=None, use_uvloop=True, supervisor=None, handle_signals=True):
+    """Runs the control plane on the calling thread, on uvloop when installed."""
+    supervisor = supervisor or Supervisor()
+    loop = new_event_loop(use_uvloop)
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(supervisor.run(main, handle_signals))
+        loop.run_until_complete(loop.shutdown_asyncgens())
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+    return supervisor
@@ -0,0 +1,193 @@
+import os
+import mmap
+import time
+import numpy
+import tempfile
+
+import config
+
+MAGIC = 0x5245534F  # "RESO"
+VERSION = 3
+CHANNELS = 2
+MAX_EFFECTS = 32
+
+# Fixed layout of the segment, shared by every process of the box
+LAYOUT = numpy.dtype([
+    ('magic', numpy.uint32),
+    ('version', numpy.uint32),
+    ('sequence', numpy.uint64),
+    ('xrun_sequence', numpy.uint64),
+    ('updated', numpy.float64),
+    ('input_rms', numpy.float64),
+    ('output_rms', numpy.float64),
+    ('input_peak', numpy.float32, (CHANNELS,)),
+    ('output_peak', numpy.float32, (CHANNELS,)),
+    ('input_clips', numpy.int64, (CHANNELS,)),
+    ('output_clips', numpy.int64, (CHANNELS,)),
+    ('dsp_load', numpy.float64),
+    ('xruns', numpy.uint64),
+    ('last_xrun_time', numpy.float64),
+    ('last_xrun_delay', numpy.float64),
+    ('shed_level', numpy.uint32),
+    ('shed_transitions', numpy.uint64),
+    ('effect_count', numpy.uint32),
+    ('effects', numpy.float32, (MAX_EFFECTS,)),
+])
+
+
+class Telemetry:
+    """Seqlock-protected telemetry block in a shared memory mapping.
+
+    Every sequence has exactly one writer, which never takes a lock: it makes
+    the sequence odd, writes its fields and makes it even again. `sequence`
+    belongs to the audio thread; the xrun fields have `xrun_sequence` of
+    their own, because JACK reports xruns on another thread. Readers in any
+    process copy the block and retry if either sequence moved.
+    """
+
+    def __init__(self, name, create=False):
+        self.path = segment_path(name)
+        self.owner = create
+
+        # A plain file in shared memory: no resource tracker decides its lifetime
+        with open(self.path, 'w+b' if create else 'r+b') as f:
+            if create:
+                f.truncate(LAYOUT.itemsize)
+            self.map = mmap.mmap(f.fileno(), LAYOUT.itemsize)
+
+        self.record = numpy.ndarray((), dtype=LAYOUT, buffer=self.map)
+
+        if create:
+            self.record[...] = numpy.zeros((), dtype=LAYOUT)
+            self.record['magic'] = MAGIC
+            self.record['version'] = VERSION
+        elif self.record['magic'] != MAGIC or self.record['version'] != VERSION:
+            self.close()
+            raise ValueError(f"Telemetry segment {self.path} has an unknown layout")
+
+        # Field views, so the writer never looks fields up by name
+        for field in LAYOUT.names:
+            setattr(self, '_' + field, self.record[field])
+
+    # Writer side, audio thread only, except publish_xrun
+
+    def begin(self):
+        self._sequence += 1
+
+    def end(self):
+        self._sequence += 1
+
+    def publish_levels(self, input_meter, output_meter, dsp_load):
+        self.begin()
+        self._updated[...] = time.time()
+        self._input_rms[...] = input_meter.average[-1]
+        self._output_rms[...] = output_meter.average[-1]
+        self._input_peak[:] = input_meter.peak
+        self._output_peak[:] = output_meter.peak
+        self._input_clips[:] = input_meter.clips
+        self._output_clips[:] = output_meter.clips
+        self._dsp_load[...] = dsp_load
+        self.end()
+
+    def publish_xrun(self, delay):
+        # From the xrun callback's thread, under its own sequence
+        self._xrun_sequence += 1
+        self._xruns += 1
+        self._last_xrun_time[...] = time.time()
+        self._last_xrun_delay[...] = delay
+        self._xrun_sequence += 1
+
+    def publish_shedding(self, level, transitions):
+        self.begin()
+        self._shed_level[...] = level
+        self._shed_transitions[...] = transitions
+        self.end()
+
+    def publish_effects(self, values):
+        count = min(len(values), MAX_EFFECTS)
+        self.begin()
+        self._effects[:count] = values[:count]
+        self._effect_count[...] = count
+        self.end()
+
+    # Reader side, any process
+
+    def read(self, retries=100):
+        """Returns a consistent copy of the record as a numpy structured scalar."""
+        for _ in range(retries):
+            before = int(self._sequence)
+            xrun_before = int(self._xrun_sequence)
+            if (before | xrun_before) & 1:
+                time.sleep(0)
+                continue
+            copy = self.record.copy()
+            if int(self._sequence) == before and int(self._xrun_sequence) == xrun_before:
+                return copy
+        # The writers never hold a sequence odd for long, give up on consistency
+        return self.record.copy()
+
+    def snapshot(self):
+        record = self.read()
+        effect_count = int(record['effect_count'])
+        return {
+            'updated': float(record['updated']),
+            'input_rms': float(record['input_rms']),
+            'output_rms': float(record['output_rms']),
+            'input_peak': record['input_peak'].tolist(),
+            'output_peak': record['output_peak'].tolist(),
+            'input_clips': record['input_clips'].tolist(),
+            'output_clips': record['output_clips'].tolist(),
+            'dsp_load': float(record['dsp_load']),
+            'xruns': int(record['xruns']),
+            'last_xrun_time': float(record['last_xrun_time']),
+            'last_xrun_delay': float(record['last_xrun_delay']),
+            'shed_level': int(record['shed_level']),
+            'shed_transitions': int(record['shed_transitions']),
+            'effects': record['effects'][:effect_count].tolist(),
+        }
+
+    def close(self):
+        # Drop the numpy views before the buffer is released
+        self.record = None
+        for field in LAYOUT.names:
+            setattr(self, '_' + field, None)
+        self.map.close()
+
+    def unlink(self):
+        self.close()
+        if self.owner and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def segment_path(name):
+    # /dev/shm keeps the segment in RAM on Linux, elsewhere the page cache does
+    directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(directory, name)
+
+
+def effect_states(board):
+    """One number per top-level effect: its mix if it has one, otherwise 1 (active)."""
+    return [float(getattr(effect, 'mix', 1.0)) for effect in board]
+
+
+_segment = None
+
+def segment(create=False):
+    """Returns this process's handle to the box telemetry segment.
+
+    The main process creates it before starting the children, every other
+    caller attaches to the existing one by name.
+    """
+    global _segment
+    if _segment is None:
+        # With create, a segment left behind by a crashed run is simply overwritten
+        _segment = Telemetry(config.telemetry_name, create=create)
+    return _segment
+
+
+def release():
+    """Closes this process's handle, removing the segment if it was created here."""
+    global _segment
+    if _segment is not None:
+        _segment.unlink()
+        _segment = None
@@ -0,0 +1,8 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The modules are flat at the top level and presets load from a relative path
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
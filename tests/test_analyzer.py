@@ -0,0 +1,73 @@
+import base64
+import numpy
+
+from analyzer import INPUT, OUTPUT, Analyzer
+
+
+def make_analyzer(**options):
+    analyzer = Analyzer(**options)
+    analyzer.thread = False  # No worker, the test calls analyze() itself
+    analyzer.prepare(48000)
+    return analyzer
+
+
+def feed(analyzer, signal, frames):
+    """Writes (channels, samples) for the input and -signal for the output, `frames` at a time."""
+    for start in range(0, signal.shape[-1], frames):
+        block = signal[:, start:start + frames]
+        analyzer.write(list(block), list(-block))
+
+
+def test_ring_wraps_around_and_keeps_the_decimated_order():
+    analyzer = make_analyzer(decimation=2, ring_seconds=0.01)
+    assert analyzer.capacity == 240
+    signal = numpy.stack([numpy.arange(2000), numpy.arange(2000) + 0.5]).astype(numpy.float32)
+    # An odd period, so the decimation phase carries from one block to the next
+    feed(analyzer, signal, 7)
+
+    decimated = signal[:, ::2]
+    assert analyzer.written == decimated.shape[-1]
+    recent = analyzer.recent(100)
+    numpy.testing.assert_array_equal(recent[INPUT], decimated.mean(axis=0)[-100:])
+    numpy.testing.assert_array_equal(recent[OUTPUT], -decimated.mean(axis=0)[-100:])
+    # Never more than half the ring, the other half may be being written
+    assert analyzer.recent(10 ** 6).shape == (2, 120)
+
+
+def sine_frame(amplitude, frequency=1000):
+    analyzer = make_analyzer()
+    time = numpy.arange(48000 // 2) / 48000
+    sine = (amplitude * numpy.sin(2 * numpy.pi * frequency * time)).astype(numpy.float32)
+    feed(analyzer, numpy.stack([sine, sine]), 256)
+    analyzer.analyze()
+    spectrum = numpy.frombuffer(base64.b64decode(analyzer.latest['input']['spectrum']), dtype=numpy.uint8)
+    waveform = numpy.frombuffer(base64.b64decode(analyzer.latest['input']['waveform']), dtype=numpy.int8).reshape(-1, 2)
+    return analyzer, spectrum, waveform
+
+
+def test_sine_lands_in_its_band():
+    analyzer, spectrum, waveform = sine_frame(1.0)
+    assert spectrum.shape == (analyzer.bands,)
+    edges = numpy.geomspace(analyzer.min_frequency, 48000 / analyzer.decimation / 2, analyzer.bands + 1)
+    band = numpy.searchsorted(edges, 1000) - 1
+    assert spectrum.argmax() == band
+    # Near the top of the scale: the band averages the sine with its neighbouring bins
+    assert spectrum[band] >= 200
+    assert spectrum[-8:].max() < spectrum[band] - 100
+
+    # Half the amplitude is 6 dB down, on a 90 dB scale of 255 steps
+    _, quieter, _ = sine_frame(0.5)
+    assert abs(int(spectrum[band]) - int(quieter[band]) - 6.02 / 90 * 255) <= 1.5
+
+    assert waveform.shape == (analyzer.width, 2)
+    # A min/max envelope of a sine with many periods per point
+    assert waveform[:, 0].max() <= -120 and waveform[:, 1].min() >= 120
+
+
+def test_silence_is_the_bottom_of_the_scale():
+    analyzer = make_analyzer()
+    feed(analyzer, numpy.zeros((2, 4096), dtype=numpy.float32), 128)
+    analyzer.analyze()
+    for source in ('input', 'output'):
+        assert not any(base64.b64decode(analyzer.latest[source]['spectrum']))
+        assert not any(base64.b64decode(analyzer.latest[source]['waveform']))
@@ -0,0 +1,108 @@
+import tracemalloc
+import numpy
+import pytest
+import pedalboard
+
+import audio
+import backends
+import config
+
+
+def null_engine(frames=128, sample_rate=48000):
+    client = backends.NullClient('ResoBox', frames, sample_rate, realtime=False)
+    processor = audio.Processor(channels=2)
+    ports = [client.inports.register('input_1'), client.inports.register('input_2')]
+    outputs = [client.outports.register('output_1'), client.outports.register('output_2')]
+    inputs = [port.get_array() for port in ports]
+    output_buffers = [port.get_array() for port in outputs]
+    client.set_process_callback(lambda count: processor.process(inputs, output_buffers))
+    client.set_blocksize_callback(lambda count: processor.prepare(count, client.samplerate))
+    for source, port in zip(client.get_ports(is_output=True), ports):
+        client.connect(source, port.name)
+    for port, destination in zip(outputs, client.get_ports(is_input=True)):
+        client.connect(port.name, destination)
+    client.captured[:] = numpy.random.uniform(-0.3, 0.3, client.captured.shape)
+    client.processor = processor
+    return client
+
+
+def block_peak(frames, blocks=200):
+    """Highest traced memory any one warmed-up block allocates above its starting level."""
+    client = null_engine(frames)
+    client.run(50)
+    peak = 0
+    tracemalloc.start()
+    try:
+        for _ in range(blocks):
+            tracemalloc.reset_peak()
+            started, _ = tracemalloc.get_traced_memory()
+            client.step()
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - started)
+    finally:
+        tracemalloc.stop()
+    return peak, client.processor.block
+
+
+def test_process_callback_does_not_allocate_after_warmup():
+    client = null_engine()
+    client.run(50)
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        client.run(400)
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    growth = sum(stat.size_diff for stat in after.filter_traces(ignore).compare_to(before.filter_traces(ignore), 'filename'))
+    # Anything kept per block would be hundreds of blocks times its size
+    assert growth < 2048
+    assert numpy.abs(client.played).max() > 0
+
+
+@pytest.mark.parametrize('mode', ['live', 'efficient'])
+def test_no_block_sized_temporaries(mode, monkeypatch):
+    """Catches arrays made and freed within a block, which the net growth above misses.
+
+    NumPy's ufunc machinery and the views of the port buffers allocate a
+    fixed amount per call whatever the block size, so the check compares a
+    small and a large period: only allocations that scale with the block
+    differ. The single one allowed is the output array pedalboard returns
+    from every board call, which the callback has no way to provide.
+    """
+    monkeypatch.setattr(config, 'latency_mode', mode)
+    # Both periods hold a whole internal block, so the board runs in every one
+    small, small_block = block_peak(config.efficient_block_size)
+    large, large_block = block_peak(8 * config.efficient_block_size)
+    board_output = 2 * (large_block - small_block) * numpy.dtype(numpy.float32).itemsize
+    # Far below the smallest temporary that scales, one channel of the large period
+    slack = 1024
+    assert large - small <= board_output + slack
+
+
+def play(mode, signal, frames, monkeypatch):
+    """Runs `signal` through a fresh processor period by period, returns what it played."""
+    monkeypatch.setattr(config, 'latency_mode', mode)
+    # Linear and time invariant, so splitting the signal differently cannot change it
+    monkeypatch.setattr(config, 'board', pedalboard.Pedalboard([pedalboard.Gain(-6), pedalboard.LowpassFilter(2000)]))
+    processor = audio.Processor(channels=2)
+    outputs = [numpy.zeros(frames, dtype=numpy.float32) for _ in range(2)]
+    played = []
+    for start in range(0, signal.shape[-1], frames):
+        processor.process(list(signal[:, start:start + frames]), outputs)
+        played.append(numpy.stack(outputs))
+    return numpy.concatenate(played, axis=-1), processor
+
+
+def test_efficient_mode_only_delays_the_live_output(monkeypatch):
+    frames = 128
+    signal = numpy.random.default_rng(3).uniform(-0.3, 0.3, (2, 64 * frames)).astype(numpy.float32)
+    live, _ = play('live', signal, frames, monkeypatch)
+    efficient, processor = play('efficient', signal, frames, monkeypatch)
+
+    latency = config.processing_block - config.block_size
+    assert latency == processor.latency == processor.block - frames > 0
+    assert not efficient[:, :latency].any()
+    numpy.testing.assert_allclose(efficient[:, latency:], live[:, :-latency], atol=1e-6)
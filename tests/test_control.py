@@ -0,0 +1,111 @@
+import random
+import threading
+import numpy
+import pedalboard
+
+from control import Controller
+
+
+def make_board():
+    return pedalboard.Pedalboard([pedalboard.Delay(delay_seconds=0.01), pedalboard.Chorus(), pedalboard.Phaser()])
+
+
+def test_preset_switches_reuse_slots():
+    controller = Controller(capacity=8)
+    for _ in range(1000):
+        board = make_board()
+        for plugin in board:
+            assert controller.set(plugin, 'mix', 0.5)
+        controller.apply()
+        controller.prune(board)
+    assert controller.count <= 6
+    assert len(controller.indexes) == 3
+
+
+def test_command_for_a_pruned_slot_is_dropped():
+    controller = Controller(capacity=1)
+    old = pedalboard.Delay(mix=0.5)
+    controller.set(old, 'mix', 1.0, smooth=False)
+    controller.prune(pedalboard.Pedalboard([]))
+
+    new = pedalboard.Delay(mix=0.25)
+    assert controller.parameter(new, 'mix') == 0
+    controller.apply()
+    assert new.mix == 0.25
+
+
+def test_only_queued_changes_are_forwarded():
+    controller = Controller(queue_size=1)
+    forwarded = []
+    controller.forward = lambda *message: forwarded.append(message)
+    delay = pedalboard.Delay()
+    assert controller.set(delay, 'mix', 0.1)
+    assert not controller.set(delay, 'mix', 0.2)
+    assert forwarded == [('set', delay, 'mix', 0.1, True)]
+
+
+def test_stress_changes_during_processing():
+    """Producers hammer parameters and swap boards while an audio thread processes."""
+    controller = Controller(capacity=16, queue_size=64, ramp_time=0.001)
+    controller.prepare(64, 48000)
+    state = {'board': make_board()}
+    last = {}
+    errors = []
+    running = threading.Event()
+    running.set()
+    lock = threading.Lock()
+
+    def audio():
+        block = numpy.random.uniform(-0.3, 0.3, (2, 64)).astype(numpy.float32)
+        try:
+            while running.is_set():
+                controller.apply()
+                state['board'](block, 48000, 64, False)
+        except Exception as e:
+            errors.append(e)
+
+    def producer(seed):
+        generator = random.Random(seed)
+        try:
+            for _ in range(2000):
+                with lock:
+                    board = state['board']
+                plugin = board[seed % len(board)]
+                value = generator.random()
+                if controller.set(plugin, 'mix', value):
+                    # The plugin itself is kept, so its id cannot be reused by a later board
+                    last[id(plugin)] = (plugin, value)
+        except Exception as e:
+            errors.append(e)
+
+    def switcher():
+        try:
+            for _ in range(50):
+                board = make_board()
+                with lock:
+                    state['board'] = board
+                controller.prune(board)
+                threading.Event().wait(0.002)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=audio)]
+    threads += [threading.Thread(target=producer, args=(seed,)) for seed in range(3)]
+    threads += [threading.Thread(target=switcher)]
+    for thread in threads:
+        thread.start()
+    for thread in threads[1:]:
+        thread.join()
+    running.clear()
+    threads[0].join()
+
+    assert errors == []
+    # Whatever landed on the final board settles at the last value sent
+    for _ in range(10):
+        controller.apply()
+    for plugin in state['board']:
+        if id(plugin) in last:
+            sent, value = last[id(plugin)]
+            assert sent is plugin
+            assert plugin.mix == numpy.float32(value)
+    assert len(controller.indexes) <= 3 + 3 * 2
@@ -0,0 +1,53 @@
+import types
+import pedalboard
+
+import effects
+import presets
+
+
+def build():
+    return presets.build(presets.load('default'), 48000)
+
+
+def test_ids_are_stable_across_rebuilds():
+    first, second = effects.Registry(build()), effects.Registry(build())
+    assert list(first.ids) == list(second.ids)
+    assert '1:Mix/0:Chain/2:Distortion' in first.ids
+    # Every plugin, at any depth, is found by id and by object
+    for entry in first.entries:
+        assert first.get(entry.id) is entry.plugin
+        assert first.find(entry.plugin) is entry
+        assert second.get(entry.id) is not entry.plugin
+    assert first.get('9:Nothing') is None
+
+
+def test_refresh_only_rebuilds_changed_plugins():
+    board = build()
+    registry = effects.Registry(board)
+    assert registry.refresh()
+    status, version = registry.status, registry.version
+    states = {entry.id: entry.state for entry in registry.entries}
+
+    # Nothing changed: same snapshot, no new version
+    assert not registry.refresh()
+    assert registry.status is status and registry.version == version
+
+    registry.get('1:Mix/0:Chain/2:Distortion').drive_db = 40
+    assert registry.refresh()
+    assert registry.version == version + 1 and registry.status is not status
+    for entry in registry.entries:
+        if entry.id == '1:Mix/0:Chain/2:Distortion':
+            assert entry.state is not states[entry.id]
+            assert entry.state['state']['drive_db'] == 40
+        else:
+            assert entry.state is states[entry.id]
+
+
+def test_current_follows_the_group_board():
+    group = types.SimpleNamespace(board=build(), effect_registry=None, effects_status=[])
+    registry = effects.current(group)
+    assert effects.current(group) is registry
+    group.board = pedalboard.Pedalboard([pedalboard.Gain()])
+    assert effects.current(group) is not registry
+    assert list(effects.refresh(group).ids) == ['0:Gain']
+    assert group.effects_status[0]['id'] == '0:Gain'
@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+import numpy
+
+import config
+import graphics
+
+
+class Display:
+    def __init__(self, buffer):
+        self._buffer = buffer
+        self.images = []
+        self.shown = 0
+
+    def image(self, image):
+        self.images.append(image)
+
+    def display(self):
+        self.shown += 1
+
+
+def frame():
+    return numpy.random.default_rng(0).integers(0, 256, (config.screen_height, config.screen_width // 8), dtype=numpy.uint8)
+
+
+def test_show_fills_a_page_buffer_of_the_expected_layout(monkeypatch):
+    display = Display([0] * (config.screen_width * config.screen_height // 8))
+    monkeypatch.setattr(graphics, 'disp', display)
+    graphics.show(frame())
+    assert display._buffer == graphics.ssd1306_pages(frame()).tolist()
+    assert display.images == [] and display.shown == 1
+
+
+def test_show_falls_back_to_the_public_image_api(monkeypatch):
+    display = Display(None)
+    monkeypatch.setattr(graphics, 'disp', display)
+    graphics.show(frame())
+    image, = display.images
+    assert image.mode == '1'
+    assert numpy.array_equal(numpy.packbits(numpy.array(image), axis=1), frame())
+    assert display._buffer is None and display.shown == 1
+
+
+def test_server_stays_up_with_a_display(monkeypatch):
+    monkeypatch.setattr(graphics, 'disp', Display(None))
+    monkeypatch.setattr(graphics, 'start_update_matrix_thread', lambda: None)
+
+    async def run():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(graphics.graphics_server(), 0.2)
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize('path, binary', [('/', False), ('/?format=json', False), ('/?format=binary', True), ('/?rate=5', False)])
+def test_json_frames_stay_the_default(path, binary):
+    assert graphics.wants_binary(None, path) is binary
@@ -0,0 +1,19 @@
+import glob
+import os
+import numpy
+from concurrent.futures import ThreadPoolExecutor
+
+import impulses
+
+
+def test_threads_loading_one_impulse_share_a_complete_cache_file(tmp_path):
+    path = sorted(glob.glob(os.path.join(impulses.IMPULSES_PATH, '*.wav')))[0]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: impulses.load(path, 48000, cache_path=str(tmp_path)), range(16)))
+
+    expected = impulses.prepare(path, 48000)
+    for audio, sample_rate in results:
+        assert sample_rate == 48000
+        numpy.testing.assert_array_equal(audio, expected)
+    # Only the published file is left behind
+    assert [name for name in os.listdir(tmp_path) if name.endswith('.tmp')] == []
@@ -0,0 +1,22 @@
+import numpy
+
+from looper import Looper, OVERDUBBING, PLAYING
+
+
+def test_commands_posted_in_one_block_all_apply():
+    looper = Looper(max_seconds=1, sample_rate=1000)
+    block = numpy.ones((2, 10), dtype=numpy.float32)
+    looper.command('record')
+    looper.process(block)
+    looper.process(block)
+
+    looper.command('play')
+    looper.command('overdub')
+    looper.process(block)
+    assert looper.state == OVERDUBBING
+    assert looper.length == 20
+
+    looper.command('undo')
+    looper.command('play')
+    looper.process(block)
+    assert looper.state == PLAYING
@@ -0,0 +1,59 @@
+import numpy
+
+from meter import Meter
+
+
+def rms(block):
+    return numpy.sqrt(numpy.mean(block.astype(numpy.float64) ** 2, axis=1))
+
+
+def test_running_sum_is_the_moving_average_of_the_window():
+    meter = Meter(channels=2, window_size=8)
+    generator = numpy.random.default_rng(3)
+    history = []
+    # Several laps of the ring, so wraparound and the resync are covered
+    for _ in range(37):
+        block = generator.uniform(-1, 1, (2, 64)).astype(numpy.float32) * generator.uniform(0.01, 1)
+        meter.update(block)
+        channels = rms(block)
+        # The last column is the RMS of both channels together
+        history.append([*channels, numpy.sqrt(numpy.mean(channels ** 2))])
+        window = numpy.array(history[-8:])
+        numpy.testing.assert_allclose(meter.channel_levels, window[:, :-1].mean(axis=0), rtol=1e-5)
+        numpy.testing.assert_allclose(meter.level, window[:, -1].mean(), rtol=1e-5)
+
+
+def test_peak_hold_expires_and_restarts():
+    meter = Meter(channels=1, hold_blocks=3)
+    loud = numpy.full((1, 32), 0.8, dtype=numpy.float32)
+    quiet = numpy.full((1, 32), -0.2, dtype=numpy.float32)
+
+    meter.update(loud)
+    for _ in range(2):
+        meter.update(quiet)
+        assert meter.peak_hold[0] == numpy.float32(0.8)
+    meter.update(quiet)
+    # Held for hold_blocks, then it follows the current peak
+    assert meter.peak_hold[0] == numpy.float32(0.2)
+    assert meter.peak[0] == numpy.float32(0.2)
+
+    meter.update(loud)
+    assert meter.peak_hold[0] == numpy.float32(0.8)
+
+
+def test_clips_and_reset():
+    meter = Meter(channels=2, clip_level=1.0)
+    block = numpy.zeros((2, 16), dtype=numpy.float32)
+    block[1, 3] = -1.5
+    meter.update(block)
+    meter.update(block)
+    assert meter.clips.tolist() == [0, 2]
+
+    meter.reset()
+    assert meter.level == 0.0
+    assert meter.count == 0 and meter.index == 0
+    assert meter.snapshot() == {'rms': 0.0, 'channels': [0.0, 0.0], 'peak': [0.0, 0.0], 'peak_hold': [0.0, 0.0], 'clips': [0, 0]}
+    # The ring starts over, the old blocks no longer count
+    quiet = numpy.full((2, 16), 0.1, dtype=numpy.float32)
+    meter.update(quiet)
+    numpy.testing.assert_allclose(meter.channel_levels, [0.1, 0.1], rtol=1e-6)
@@ -0,0 +1,26 @@
+import numpy
+
+import presets
+
+from plugins.parallel import ParallelMix, Pool
+
+
+def test_parallel_mix_matches_the_serial_mix():
+    description = presets.load('parallel')
+    serial = presets.build(description, 48000)
+    parallel = presets.build(description, 48000, parallel=True)
+    mix = parallel[1]
+    assert isinstance(mix, ParallelMix) and not isinstance(serial[1], ParallelMix)
+    # Workers even on a single core, and every branch but the costliest dispatched from the start
+    mix.pool = Pool(workers=2)
+    mix.min_dispatch = 0.0
+    mix.replan_blocks = 1
+
+    generator = numpy.random.default_rng(2)
+    for _ in range(64):
+        block = generator.uniform(-0.5, 0.5, (2, 256)).astype(numpy.float32)
+        expected = serial(block, 48000, 256, False)
+        output = parallel(block, 48000, 256, False)
+        # Equal up to the order the branch outputs are summed in
+        numpy.testing.assert_allclose(output, expected, rtol=0, atol=1e-6)
+    assert len(mix.remote) == 2
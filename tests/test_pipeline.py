@@ -0,0 +1,77 @@
+import os
+import numpy
+import pytest
+
+
+from pipeline import DROPPED, OVERRUNS, UNDERRUNS, BlockRing, Pipeline
+
+FRAMES = 16
+
+
+@pytest.fixture
+def engine():
+    # Never started: the test plays the DSP process through its own ring handles
+    engine = Pipeline(channels=2, frames=FRAMES, sample_rate=48000, periods=2, name=f'resobox_test_{os.getpid()}')
+    slots = engine.input.slots
+    source = BlockRing(engine.name + '_in', slots, 2, FRAMES)
+    sink = BlockRing(engine.name + '_out', slots, 2, FRAMES)
+    yield engine, source, sink
+    source.close()
+    sink.close()
+    engine.input.unlink()
+    engine.output.unlink()
+
+
+def period(value):
+    return [numpy.full(FRAMES, value, dtype=numpy.float32) for _ in range(2)]
+
+
+def dsp(source, sink):
+    """Processes every pending block, doubling it, like run_worker."""
+    while source.available() > 0 and sink.free() > 0:
+        for row, processed in zip(sink.write_rows(), source.read_rows()):
+            numpy.multiply(processed, 2, out=row)
+        source.commit_read()
+        sink.commit_write()
+
+
+def test_output_is_delayed_by_the_silent_periods(engine):
+    engine, source, sink = engine
+    played = []
+    for index in range(1, 8):
+        outputs = period(-1)
+        engine.exchange(period(index), outputs)
+        dsp(source, sink)
+        played.append(outputs[0][0])
+    assert played == [0, 0, 2, 4, 6, 8, 10]
+    assert engine.stats()['underruns'] == 0
+    assert engine.latency == 2 * FRAMES
+
+
+def test_underrun_plays_silence_and_is_counted(engine):
+    engine, source, sink = engine
+    outputs = period(-1)
+    for _ in range(2):
+        engine.exchange(period(1), outputs)
+    # The DSP process fell behind: nothing left to play
+    engine.exchange(period(1), outputs)
+    assert not any(buffer.any() for buffer in outputs)
+    assert engine.output.stats[UNDERRUNS] == 1
+
+    # Catching up with more blocks than the slack drops the oldest ones
+    dsp(source, sink)
+    assert sink.available() == 3
+    engine.exchange(period(5), outputs)
+    assert engine.output.stats[DROPPED] == 1
+    assert outputs[0][0] == 2
+    # Back to the pipeline's latency, not one period more
+    assert engine.output.available() == 1
+
+
+def test_full_input_ring_counts_overruns(engine):
+    engine, source, sink = engine
+    outputs = period(0)
+    for _ in range(engine.input.slots + 3):
+        engine.exchange(period(1), outputs)
+    assert engine.input.available() == engine.input.slots
+    assert engine.output.stats[OVERRUNS] == 3
@@ -0,0 +1,28 @@
+import numpy
+import pedalboard
+
+import config
+import presets
+
+
+def test_live_board_is_not_reset():
+    """A cached board still fading out keeps its state when it is switched back to."""
+    bank = presets.PresetBank()
+    delay = pedalboard.Delay(delay_seconds=0.01, feedback=0.9, mix=1.0)
+    board = pedalboard.Pedalboard([delay])
+    board(numpy.ones((2, 512), dtype=numpy.float32), 48000, 512, False)
+    tail = board(numpy.zeros((2, 512), dtype=numpy.float32), 48000, 512, False)
+    assert numpy.abs(tail).max() > 0
+
+    previous, live = config.board, config.live_boards
+    reset = []
+    board.reset = lambda: reset.append(board)
+    bank.remember('default', board)
+    config.live_boards = (previous, board)
+    try:
+        assert bank.switch('default', target=None).result(timeout=5) is board
+        assert reset == []
+    finally:
+        config.board, config.live_boards = previous, live
+        config.controller.prune(previous)
+        bank.shutdown()
@@ -0,0 +1,64 @@
+import threading
+import numpy
+import pedalboard
+
+import effects
+
+from profiling import Profiler
+
+
+def test_sibling_branches_get_their_own_stats():
+    board = pedalboard.Pedalboard([
+        pedalboard.Mix([
+            pedalboard.Chain([pedalboard.Delay(delay_seconds=0.01)]),
+            pedalboard.Chain([pedalboard.Delay(delay_seconds=0.02)]),
+            pedalboard.Gain(),
+        ]),
+    ])
+    profiler = Profiler()
+    profiler.configure(True, True, board)
+    profiler.board(board)(numpy.zeros((2, 128), dtype=numpy.float32), 48000, 128, False)
+
+    assert profiler.plugins.keys() == {'0:Mix/0:Chain/0:Delay', '0:Mix/1:Chain/0:Delay', '0:Mix/2:Gain'}
+    assert all(stats.calls == 1 for stats in profiler.plugins.values())
+    # The same ids as the effects list, so the two can be joined
+    assert profiler.plugins.keys() <= set(effects.Registry(board).ids)
+
+
+def test_callback_never_instruments_or_loses_the_board():
+    board = pedalboard.Pedalboard([pedalboard.Gain(), pedalboard.Delay(delay_seconds=0.01)])
+    profiler = Profiler()
+    profiler.configure(True, True)
+    # Nothing prepared for this board, so it runs as it is
+    assert profiler.board(board) is board
+
+    profiler.prepare(board)
+    instrumented = profiler.board(board)
+    assert instrumented is not board
+    assert profiler.board(pedalboard.Pedalboard([])) is not instrumented
+
+    block = numpy.zeros((2, 64), dtype=numpy.float32)
+    errors = []
+    running = threading.Event()
+    running.set()
+
+    def audio():
+        try:
+            while running.is_set():
+                profiler.board(board)(block, 48000, 64, False)
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=audio)
+    thread.start()
+    for _ in range(200):
+        profiler.reset(board)
+        profiler.configure(per_plugin=False)
+        profiler.configure(per_plugin=True, board=board)
+    running.clear()
+    thread.join()
+
+    assert errors == []
+    # The last copy was built with the stats the profiler reports
+    profiler.board(board)(block, 48000, 64, False)
+    assert all(stats.calls for stats in profiler.plugins.values())
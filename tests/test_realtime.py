@@ -0,0 +1,34 @@
+import asyncio
+import pytest
+
+import realtime
+
+
+class WebSocket:
+    """Closes as soon as the handler starts reading messages."""
+
+    def __init__(self, path):
+        self.path = path
+        self.sent = []
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        raise StopAsyncIteration
+
+    async def send(self, frame):
+        self.sent.append(frame)
+
+
+@pytest.mark.parametrize('path', ['/?rate=x', '/?rate=nan', '/?rate=-1'])
+def test_malformed_query_string_keeps_the_connection(path):
+    asyncio.run(realtime.websocket_handler(WebSocket(path), path))
+    assert not realtime.broadcaster.subscribers
+
+
+def test_malformed_subscription_changes_nothing():
+    subscriber = realtime.Subscriber(None)
+    with pytest.raises(ValueError):
+        subscriber.configure({'fields': 'xruns', 'rate': 'x'})
+    assert subscriber.fields == tuple(realtime.FIELDS)
@@ -0,0 +1,26 @@
+import numpy
+import pytest
+import soundfile
+
+import render
+
+
+@pytest.mark.parametrize('inputs, outputs', [(2, 1), (3, 2), (1, 2)])
+def test_any_channel_count_renders(tmp_path, inputs, outputs):
+    path = tmp_path / 'take.wav'
+    soundfile.write(path, numpy.random.uniform(-0.3, 0.3, (4800, inputs)), 48000)
+    output_path, seconds, _ = render.render_file(str(path), 'default', str(tmp_path / 'out'), chunk_seconds=0.03, channels=outputs, max_tail=0.2)
+    assert soundfile.info(output_path).channels == outputs
+    assert seconds == pytest.approx(0.1)
+
+
+def test_mixing_matrix_averages_extra_inputs():
+    numpy.testing.assert_array_equal(render.mixing_matrix(2, 1), [[0.5, 0.5]])
+    numpy.testing.assert_array_equal(render.mixing_matrix(1, 2), [[1.0], [1.0]])
+
+
+def test_outputs_keep_the_relative_path(tmp_path):
+    names = render.output_names([str(tmp_path / 'a' / 'take.wav'), str(tmp_path / 'b' / 'take.wav')])
+    assert sorted(names.values()) == ['a/take', 'b/take']
+    with pytest.raises(ValueError):
+        render.output_names([str(tmp_path / 'take.wav'), str(tmp_path / 'take.flac')])
@@ -0,0 +1,58 @@
+import time
+import numpy
+import pedalboard
+
+import presets
+
+from shedding import LoadInjector, LoadShedder, Shed
+
+
+def test_shed_crossfades_to_the_fallback_and_back():
+    shed = Shed(pedalboard.Gain(gain_db=0), 'silence', fade_time=0.01)
+    audio = numpy.ones((2, 128), dtype=numpy.float32)
+    fade = int(0.01 * 48000)
+
+    shed.engage()
+    gains = numpy.concatenate([shed(audio, 48000, 128, False)[0].copy() for _ in range(5)])
+    expected = 1 - numpy.minimum(numpy.arange(len(gains)) / fade, 1)
+    numpy.testing.assert_allclose(gains, expected, atol=1e-6)
+    # Once faded only the fallback runs
+    assert shed.fade_length == 0 and not shed(audio, 48000, 128, False).any()
+
+    shed.release()
+    gains = numpy.concatenate([shed(audio, 48000, 128, False)[0].copy() for _ in range(5)])
+    numpy.testing.assert_allclose(gains, 1 - expected, atol=1e-6)
+
+
+def test_shedder_engages_under_load_and_releases_after_it():
+    frames, sample_rate = 128, 44100
+    board = presets.warm(presets.build(presets.load('default'), sample_rate), sample_rate, frames)
+    shedder = LoadShedder(engage_blocks=4, release_blocks=20)
+    shedder.configure(True, board, sample_rate)
+    steps = len(shedder.current.steps)
+    assert steps > 0
+    injector = LoadInjector()
+    period = frames / sample_rate
+    audio = numpy.random.default_rng(4).uniform(-0.3, 0.3, (2, frames)).astype(numpy.float32)
+
+    def run(blocks):
+        levels = []
+        for _ in range(blocks):
+            started = time.perf_counter()
+            output = shedder.board(board)(audio, sample_rate, frames, False)
+            assert numpy.isfinite(output).all()
+            injector.burn(period)
+            shedder.observe((time.perf_counter() - started) / period)
+            levels.append(shedder.level)
+        return levels
+
+    # A whole period burnt on top of the board: every block is over the deadline
+    injector.configure(1.0)
+    levels = run(4 * steps + 4)
+    assert levels[3] == 1 and levels[-1] == steps
+    assert shedder.shed_steps == [step for step, _ in shedder.current.steps]
+
+    injector.configure(0.0)
+    levels = run(20 * steps + 40)
+    assert levels[18] == steps and levels[-1] == 0
+    assert shedder.transitions == 2 * steps
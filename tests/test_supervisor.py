@@ -0,0 +1,33 @@
+import time
+import asyncio
+import threading
+
+import supervisor
+
+
+def test_stop_cancels_services_and_bounds_cleanup():
+    cleaned = []
+
+    async def service():
+        try:
+            await asyncio.Future()
+        finally:
+            cleaned.append('service')
+
+    async def stubborn():
+        try:
+            await asyncio.Future()
+        except asyncio.CancelledError:
+            # Cleanup that never finishes, like a join on a wedged client
+            await asyncio.shield(asyncio.Future())
+
+    async def main(plane):
+        plane.start('service', service)
+        plane.start('stubborn', stubborn)
+        threading.Timer(0.1, plane.stop).start()
+
+    started = time.monotonic()
+    plane = supervisor.run(main, use_uvloop=False, supervisor=supervisor.Supervisor(shutdown_timeout=0.2), handle_signals=False)
+    assert time.monotonic() - started < 2
+    assert cleaned == ['service']
+    assert plane.status()['service']['running'] is False
@@ -0,0 +1,47 @@
+import threading
+import numpy
+
+import telemetry
+
+
+class Meter:
+    def __init__(self):
+        self.average = numpy.zeros(1)
+        self.peak = numpy.zeros(2, dtype=numpy.float32)
+        self.clips = numpy.zeros(2, dtype=numpy.int64)
+
+
+def test_xruns_and_levels_from_two_threads_stay_consistent():
+    segment = telemetry.Telemetry('resobox_telemetry_test', create=True)
+    meter = Meter()
+    blocks = 20000
+    torn = []
+
+    def audio():
+        for block in range(blocks):
+            meter.average[-1] = block
+            segment.publish_levels(meter, meter, block)
+
+    def xruns():
+        for _ in range(blocks):
+            segment.publish_xrun(1.0)
+
+    def reader():
+        for _ in range(2000):
+            record = segment.read()
+            # Both levels are written in the same update
+            if record['input_rms'] != record['output_rms'] or record['dsp_load'] != record['input_rms']:
+                torn.append(record)
+
+    threads = [threading.Thread(target=target) for target in (audio, xruns, reader)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert torn == []
+        assert int(segment._sequence) % 2 == 0
+        assert int(segment._xrun_sequence) % 2 == 0
+        assert segment.snapshot()['xruns'] == blocks
+    finally:
+        segment.unlink()
@@ -0,0 +1,70 @@
+import gzip
+import asyncio
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from ui.assets import AssetTable
+from ui.server import handle_get, handle_static
+
+INDEX = b'<!doctype html><title>ResoBox</title>' + b'<div id="root"></div>' * 40
+SCRIPT = b'console.log("resobox");\n' * 200
+
+
+def build(tmp_path):
+    (tmp_path / 'static' / 'js').mkdir(parents=True, exist_ok=True)
+    (tmp_path / 'index.html').write_bytes(INDEX)
+    (tmp_path / 'static' / 'js' / 'main.3f2a9c1b.js').write_bytes(SCRIPT)
+    return AssetTable.load(str(tmp_path))
+
+
+def get(tmp_path, *requests):
+    """Runs (path, headers) requests against the UI routes; returns the responses' (status, headers, body)."""
+    async def run():
+        app = web.Application()
+        app['assets'] = build(tmp_path)
+        app.router.add_get('/', handle_get)
+        app.router.add_get('/{filename:.*}', handle_static)
+        async with TestClient(TestServer(app), auto_decompress=False) as client:
+            results = []
+            for path, headers in requests:
+                response = await client.get(path, headers=headers)
+                results.append((response.status, response.headers, await response.read()))
+            return results
+
+    return asyncio.run(run())
+
+
+def test_matching_etag_is_not_modified(tmp_path):
+    (status, headers, body), = get(tmp_path, ('/static/js/main.3f2a9c1b.js', {'Accept-Encoding': 'identity'}))
+    assert status == 200 and body == SCRIPT
+    assert headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+
+    (status, again, body), (stale, _, _) = get(tmp_path,
+        ('/static/js/main.3f2a9c1b.js', {'If-None-Match': headers['ETag']}),
+        ('/static/js/main.3f2a9c1b.js', {'If-None-Match': '"something-else"'}))
+    assert status == 304 and body == b''
+    assert again['ETag'] == headers['ETag']
+    assert stale == 200
+
+
+def test_encoding_is_negotiated(tmp_path):
+    (status, headers, body), (_, plain, raw) = get(tmp_path,
+        ('/static/js/main.3f2a9c1b.js', {'Accept-Encoding': 'gzip, deflate'}),
+        ('/static/js/main.3f2a9c1b.js', {'Accept-Encoding': 'identity'}))
+    assert status == 200
+    assert headers['Content-Encoding'] == 'gzip' and headers['Vary'] == 'Accept-Encoding'
+    assert gzip.decompress(body) == SCRIPT
+    assert 'Content-Encoding' not in plain and raw == SCRIPT
+
+
+def test_client_routes_fall_back_to_index(tmp_path):
+    (route, headers, body), (missing, _, _), (root, _, index) = get(tmp_path,
+        ('/presets/default', {'Accept-Encoding': 'identity'}),
+        ('/static/js/missing.js', {}),
+        ('/', {'Accept-Encoding': 'identity'}))
+    assert route == 200 and body == INDEX
+    assert headers['Cache-Control'] == 'no-cache'
+    # Paths that look like files are real 404s
+    assert missing == 404
+    assert root == 200 and index == INDEX
@@ -0,0 +1,42 @@
+import asyncio
+import pytest
+
+import config
+import effects
+import webhost
+
+
+class Request:
+    def __init__(self, data):
+        self.data = data
+
+    async def json(self):
+        return self.data
+
+
+def post(data):
+    return asyncio.run(webhost.handle_post(Request(data)))
+
+
+def mix_effect():
+    return next(entry.id for entry in effects.current(config).entries if hasattr(entry.plugin, 'mix'))
+
+
+@pytest.mark.parametrize('mix', ['abc', True, -0.1, 1.5, [0.5], {}])
+def test_invalid_mix_is_rejected(mix):
+    response = post({'action': 'update_plugin_state', 'effect_id': mix_effect(), 'mix': mix})
+    assert response.status == 400
+
+
+def test_valid_mix_is_queued():
+    response = post({'action': 'update_plugin_state', 'effect_id': mix_effect(), 'mix': 0.25})
+    assert response.status == 200
+
+
+def test_unknown_preset_is_not_found():
+    assert post({'action': 'load_preset', 'preset': 'no-such-preset'}).status == 404
+
+
+@pytest.mark.parametrize('preset', ['../default', 'sub/default', '..\\default', '.hidden', 7])
+def test_unsafe_preset_name_is_rejected(preset):
+    assert post({'action': 'load_preset', 'preset': preset}).status == 400
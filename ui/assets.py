@@ -0,0 +1,107 @@
+import os
+import re
+import gzip
+import hashlib
+import mimetypes
+
+from email.utils import formatdate, parsedate_to_datetime
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Build tools put a content hash in the name, e.g. main.3f2a9c1b.js
+HASHED_NAME = re.compile(r'\.[0-9a-f]{8,}\.(chunk\.)?[a-z0-9]+$')
+COMPRESSIBLE = ('text/', 'application/javascript', 'application/json', 'image/svg+xml', 'application/xml', 'application/manifest+json')
+MIN_COMPRESS_SIZE = 256
+
+mimetypes.add_type('application/javascript', '.js')
+mimetypes.add_type('application/manifest+json', '.webmanifest')
+mimetypes.add_type('font/woff2', '.woff2')
+
+
+class Asset:
+    """One file of the UI build, held in memory with its precomputed variants."""
+
+    def __init__(self, path, body, mtime):
+        content_type, _ = mimetypes.guess_type(path)
+        self.content_type = content_type or 'application/octet-stream'
+        self.body = body
+        self.etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+        self.mtime = int(mtime)
+        self.last_modified = formatdate(self.mtime, usegmt=True)
+
+        if HASHED_NAME.search(os.path.basename(path)):
+            self.cache_control = 'public, max-age=31536000, immutable'
+        else:
+            self.cache_control = 'no-cache'
+
+        self.encodings = {}
+        if self.content_type.startswith(COMPRESSIBLE) and len(body) >= MIN_COMPRESS_SIZE:
+            if brotli is not None:
+                self.keep('br', brotli.compress(body, quality=11))
+            self.keep('gzip', gzip.compress(body, compresslevel=9, mtime=0))
+
+    def keep(self, encoding, body):
+        # Only worth it if it is actually smaller
+        if len(body) < len(self.body):
+            self.encodings[encoding] = body
+
+    def select(self, accept_encoding):
+        """Returns (encoding, body) for the client's Accept-Encoding header."""
+        accepted = {part.split(';')[0].strip() for part in accept_encoding.split(',')}
+        for encoding in ('br', 'gzip'):
+            if encoding in accepted and encoding in self.encodings:
+                return encoding, self.encodings[encoding]
+        return None, self.body
+
+    def not_modified(self, headers):
+        if_none_match = headers.get('If-None-Match')
+        if if_none_match is not None:
+            return if_none_match.strip() == '*' or self.etag in [tag.strip() for tag in if_none_match.split(',')]
+
+        if_modified_since = headers.get('If-Modified-Since')
+        if if_modified_since is not None:
+            try:
+                return parsedate_to_datetime(if_modified_since).timestamp() >= self.mtime
+            except (TypeError, ValueError):
+                return False
+        return False
+
+
+class AssetTable:
+    """Immutable in-memory copy of the UI build directory.
+
+    Everything is read, hashed and compressed once at startup, so serving a
+    request never touches the disk or blocks the event loop.
+    """
+
+    def __init__(self, assets, index='index.html'):
+        self.assets = assets
+        self.index = assets.get(index)
+
+    @classmethod
+    def load(cls, root):
+        assets = {}
+        for directory, _, filenames in os.walk(root):
+            for filename in filenames:
+                full_path = os.path.join(directory, filename)
+                relative = os.path.relpath(full_path, root).replace(os.sep, '/')
+                with open(full_path, 'rb') as f:
+                    assets[relative] = Asset(relative, f.read(), os.path.getmtime(full_path))
+        return cls(assets)
+
+    def __len__(self):
+        return len(self.assets)
+
+    def lookup(self, path):
+        """The asset for a request path, falling back to index.html for client-side routes."""
+        path = path.lstrip('/')
+        asset = self.assets.get(path or 'index.html')
+        if asset is not None:
+            return asset
+        # Paths that look like files are real 404s, everything else is an SPA route
+        if '.' in os.path.basename(path):
+            return None
+        return self.index
@@ -9,45 +9,39 @@ import aiohttp_cors
 import os
 
 from utils import check_port
+from ui.assets import AssetTable
+
+def respond(request, asset):
+    if asset is None:
+        return web.Response(status=404)
+
+    headers = {
+        'ETag': asset.etag,
+        'Last-Modified': asset.last_modified,
+        'Cache-Control': asset.cache_control,
+        'Vary': 'Accept-Encoding',
+    }
+    if asset.not_modified(request.headers):
+        return web.Response(status=304, headers=headers)
+
+    encoding, body = asset.select(request.headers.get('Accept-Encoding', ''))
+    if encoding is not None:
+        headers['Content-Encoding'] = encoding
+    return web.Response(body=body, content_type=asset.content_type, headers=headers)
 
 # Assuming your React app's build directory is copied to "webui" within your project directory
 async def handle_get(request):
     # Serve the index.html for any GET request
-    with open('build/index.html', 'rb') as f:
-        return web.Response(body=f.read(), content_type='text/html')
+    return respond(request, request.app['assets'].index)
 
 async def handle_static(request):
-    # Extract the requested file path from the URL
-    file_path = request.match_info['filename']
-    full_path = os.path.join('build', file_path)
-
-    # Determine content type based on file extension
-    content_type = 'application/octet-stream'  # Default content type
-    if full_path.endswith('.css'):
-        content_type = 'text/css'
-    elif full_path.endswith('.js'):
-        content_type = 'application/javascript'
-    elif full_path.endswith('.html'):
-        content_type = 'text/html'
-    elif full_path.endswith('.json'):
-        content_type = 'application/json'
-    elif full_path.endswith('.png'):
-        content_type = 'image/png'
-    elif full_path.endswith('.jpg') or full_path.endswith('.jpeg'):
-        content_type = 'image/jpeg'
-    elif full_path.endswith('.svg'):
-        content_type = 'image/svg+xml'
-    # Add other file types as needed
-
-    # Check if the file exists, and if so, serve it
-    if os.path.exists(full_path) and os.path.isfile(full_path):
-        with open(full_path, 'rb') as f:
-            return web.Response(body=f.read(), content_type=content_type)
-    else:
-        return web.Response(status=404)
+    # Served from the in-memory table, unknown routes fall back to index.html
+    return respond(request, request.app['assets'].lookup(request.match_info['filename']))
     
 async def host():
     app = web.Application()
+    app['assets'] = AssetTable.load('build')
+    print(f"📦 UI assets loaded into memory: {len(app['assets'])} files\n")
     app.router.add_get('/', handle_get)
     app.router.add_get('/{filename:.*}', handle_static)
     
@@ -1,15 +1,9 @@
 # Utility Functions
 import json
 import socket
-import numpy as np
 import uuid
 
 
-def moving_average(values, window_size):
-    if len(values) < window_size:
-        return np.mean(values)
-    return np.mean(values[-window_size:])
-
 def serialize(obj):
     if isinstance(obj, (str, int, float, bool, type(None))):
         return json.dumps(obj)
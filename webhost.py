@@ -2,12 +2,33 @@
 import asyncio
 import aiohttp_cors
 import config
+import effects
+import looper
+import instances
 
 from aiohttp import web
 
 async def handle_get(request):
     return web.Response(text="🎛 Hi from ResoBox, i'm alive! (maybe)")
 
+async def handle_metrics(request):
+    # Prometheus text exposition format
+    return web.Response(body=config.profiler.prometheus().encode(), headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'})
+
+async def handle_effects(request):
+    # Ids, nesting paths and parameter schemas of a group's board
+    group = instances.target(request.query.get("instance"))
+    if group is None:
+        return web.Response(text=f"Unknown instance {request.query.get('instance')}", status=404)
+    return web.json_response(effects.current(group).describe())
+
+def parse_mix(value):
+    # A JSON number between 0 and 1, booleans are not mixes
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    value = float(value)
+    return value if 0.0 <= value <= 1.0 else None
+
 async def handle_post(request):
     global board
 
@@ -17,27 +38,80 @@ async def handle_post(request):
     effect_id = data.get("effect_id")
     new_mix = data.get("mix")
 
+    # Port group the action is for, the main one unless named
+    group = instances.target(data.get("instance"))
+    if group is None:
+        return web.Response(text=f"Unknown instance {data.get('instance')}", status=404)
+
     if action is not None:
         if action == "update_plugin_state":
             if new_mix is not None and effect_id:
-                for index, effect in enumerate(config.board):
-                    current_id = config.fxchain_ids[index]
-                    if current_id == effect_id and hasattr(effect, 'mix'):
-                        effect.mix = new_mix
-                config.update_effects_status()
-                return web.Response(text=f"Updated {current_id} mix to: {new_mix}")
+                effect = effects.current(group).get(effect_id)
+                if effect is None:
+                    return web.Response(text=f"Unknown effect {effect_id}", status=404)
+                if not hasattr(effect, 'mix'):
+                    return web.Response(text=f"Effect {effect_id} has no mix", status=400)
+                mix = parse_mix(new_mix)
+                if mix is None:
+                    return web.Response(text=f"Mix must be a number from 0 to 1, not {new_mix!r}", status=400)
+                # Applied and smoothed by the audio thread at the next block
+                try:
+                    queued = group.controller.set(effect, 'mix', mix)
+                except OverflowError:
+                    return web.Response(text="Too many controlled parameters", status=503)
+                if not queued:
+                    return web.Response(text="Control queue is full, try again", status=503)
+                group.update_effects_status()
+                return web.Response(text=f"Queued {effect_id} mix change to: {mix}")
             return web.Response(text="Effect type or mix value not provided", status=400)
+        elif action == "load_preset":
+            preset = data.get("preset")
+            if not preset:
+                return web.Response(text="Preset name not provided", status=400)
+            try:
+                if not config.preset_bank.exists(preset):
+                    return web.Response(text=f"Unknown preset {preset}", status=404)
+            except ValueError as e:
+                return web.Response(text=str(e), status=400)
+            # Built and warmed on a worker, swapped in at a block boundary
+            config.preset_bank.switch(preset, data.get("crossfade", True), None if group is config else group)
+            return web.Response(text=f"Loading preset {preset}")
+        elif action == "set_profiling":
+            config.profiler.configure(data.get("enabled"), data.get("per_plugin"), config.board, config.shedder)
+            if data.get("reset"):
+                config.profiler.reset(config.board, config.shedder)
+            return web.Response(text=f"Profiling {'on' if config.profiler.enabled else 'off'}, per plugin {'on' if config.profiler.per_plugin else 'off'}")
+        elif action == "set_load_shedding":
+            config.shedder.configure(data.get("enabled"), config.board, config.sample_rate)
+            # The timed copy has to wrap the board the shedder now hands the callback
+            config.profiler.prepare(config.board, config.shedder)
+            config.load_injector.configure(data.get("inject"), data.get("jitter"))
+            return web.Response(text=f"Load shedding {'on' if config.shedder.enabled else 'off'}, injected load {config.load_injector.fraction:g}")
         elif action == "toggle_recording":
-           print('🛑 Not available yet')
+            # Opening the file and joining the writer thread would block the control plane
+            path = await asyncio.get_running_loop().run_in_executor(None, config.recorder.toggle, config.sample_rate)
+            if config.recorder.active:
+                return web.Response(text=f"Recording to {path}")
+            return web.Response(text=f"Recording saved to {path}")
+        elif action == "looper":
+            command = data.get("command")
+            if command not in looper.COMMANDS:
+                return web.Response(text="Unknown looper command", status=400)
+            # Applied by the audio thread at the next block
+            if not config.looper.command(command):
+                return web.Response(text="Looper queue is full, try again", status=503)
+            return web.Response(text=f"Looper: {command}")
         else:
             return web.Response(text="Action not recognized", status=400)
     else:
         return web.Response(text="Action not provided", status=400)
 
 
-async def start_http_server(loop):
+async def http_server():
     app = web.Application()
     app.router.add_get('/', handle_get)
+    app.router.add_get('/metrics', handle_metrics)
+    app.router.add_get('/effects', handle_effects)
     app.router.add_post('/', handle_post)
     cors = aiohttp_cors.setup(app, defaults={
         "*": aiohttp_cors.ResourceOptions(
@@ -49,11 +123,10 @@ async def start_http_server(loop):
         cors.add(route)
     runner = web.AppRunner(app)
     await runner.setup()
-    site = web.TCPSite(runner, '0.0.0.0', 8766)
-    await site.start()
-    await asyncio.Event().wait()
-
-def start_http_server_in_thread():
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    loop.run_until_complete(start_http_server(loop))
+    try:
+        site = web.TCPSite(runner, '0.0.0.0', 8766)
+        await site.start()
+        await asyncio.Event().wait()
+    finally:
+        # Frees the port, so a restart or the next run can bind it again
+        await runner.cleanup()